@@ -0,0 +1,308 @@
+import json
+import os
+import tempfile
+import typing
+
+import typer
+
+from commands.command import Command
+from commands.exif import Exif, SidecarType
+from commands.process import Process
+from entities.filename import FileName
+from util.config import Config
+from util.constants import Tags
+from util.exiftool import ExifTool, ExifToolPool
+from util.helpers import Util, Printer
+from util.pipeline import ProcessExecutor
+
+
+class Audit(Command):
+    json_key_mismatched = "mismatched"
+    json_key_malformed = "malformed"
+    json_key_missing_sidecars = "missing_sidecars"
+    json_key_orphaned_sidecars = "orphaned_sidecars"
+    json_key_path = "path"
+    json_key_named = "named"
+    json_key_recorded = "recorded"
+    json_key_error = "error"
+
+    # every processed file has these, the optional sidecars are only expected where their folder exists
+    required_sidecars = {
+        Process.meta_simple_destination_name: "txt",
+        Process.meta_full_destination_name: "html",
+        Process.meta_mie_destination_name: Exif.mie_extension
+    }
+    optional_sidecars = {sidecar.value: sidecar.value for sidecar in SidecarType}
+
+    def __init__(
+            self,
+            directory: str,
+            extensions: typing.List[str],
+            report_path: str = None,
+            workers: int = Config.exiftool_pool_size
+    ):
+        extensions = [extension.upper() for extension in extensions]
+
+        super().__init__(directory, None, False, extensions, workers)
+        self.extensions = extensions
+        self.report_path = report_path
+        self.total_steps = 3
+        self.mismatched: list[tuple[str, str, str]] = []
+        self.malformed: list[tuple[str, str]] = []
+        self.missing_sidecars: list[str] = []
+        self.orphaned_sidecars: list[str] = []
+
+    def audit(self):
+        Audit.start_message()
+
+        Util.verify_directory(self.directory)
+
+        media_directories = self.__walk()
+        file_paths = [
+            os.path.join(directory, file_name)
+            for directory, file_names in media_directories.items()
+            for file_name in file_names
+        ]
+
+        if not file_paths:
+            Printer.error_and_abort("There are no files to audit!")
+
+        formatted_paths = self.__decode(file_paths)
+        self.__check_date_times(formatted_paths)
+        self.__check_sidecars(media_directories)
+
+        num_problems = self.__report(len(file_paths))
+
+        Printer.done_all()
+
+        # a nightly job can alert on the exit code alone
+        if num_problems:
+            raise typer.Exit(code=1)
+
+    def __walk(self):
+        Printer.console.print(f"\n{Printer.color_title}🚶 Walking \[{self.directory}]! 🚶\n")
+
+        media_directories: dict[str, list[str]] = {}
+        directories = [self.directory]
+
+        with Printer.progress_spinner() as progress:
+            progress.add_task(self.progress_label(f"Listing files in \[{self.directory}]"))
+
+            while directories:
+                directory = directories.pop()
+
+                file_names = []
+
+                try:
+                    with os.scandir(directory) as entries:
+                        for entry in entries:
+                            if entry.is_dir(follow_symlinks=False):
+                                # meta folders only hold sidecars, which are checked against their media directory
+                                if not entry.name.startswith(".") and entry.name != Process.meta_destination_name:
+                                    directories.append(entry.path)
+                            elif Util.split_extension(entry.name)[1].upper() in self.extensions and entry.is_file():
+                                file_names.append(entry.name)
+                except OSError as error:
+                    Printer.warning(f"Skipping \[{directory}] since it could not be listed ({error.strerror})!")
+                    continue
+
+                if file_names:
+                    media_directories[directory] = sorted(file_names)
+
+        self.step_count += 1
+
+        return media_directories
+
+    def __decode(self, file_paths: list[str]):
+        Printer.console.print(f"\n{Printer.color_title}🔓 Decoding {len(file_paths)} file name(s)! 🔓\n")
+
+        parsed_file_names = ProcessExecutor.map_chunks_if_large(
+            FileName.parse_batch,
+            [os.path.basename(file_path) for file_path in file_paths]
+        )
+
+        formatted_paths: dict[str, str] = {}
+
+        for file_path, (fields, error_message) in zip(file_paths, parsed_file_names):
+            if fields:
+                formatted_paths[file_path] = fields[FileName.date_time_index]
+            else:
+                self.malformed.append((file_path, error_message))
+
+        Printer.waiting(f"Decoded {len(formatted_paths)} formatted name(s), {len(self.malformed)} are malformed.")
+
+        return formatted_paths
+
+    def __check_date_times(self, formatted_paths: dict[str, str]):
+        file_paths = list(formatted_paths)
+        batches = [
+            file_paths[index:index + Config.exiftool_batch_size]
+            for index in range(0, len(file_paths), Config.exiftool_batch_size)
+        ]
+
+        if not batches:
+            return
+
+        pool_size = min(self.workers, len(batches))
+
+        Printer.console.print(f"\n{Printer.color_title}🕰️  Reading {Tags.DateTimeOriginal}! 🕰️\n")
+
+        with Printer.progress_spinner() as progress:
+            progress.add_task(
+                self.progress_label(
+                    f"{len(file_paths)} file(s) in {len(batches)} batch(es) across {pool_size} exiftool(s)"
+                )
+            )
+
+            with ExifToolPool(size=pool_size) as exiftool_pool:
+                date_times = {
+                    file_path: date_time
+                    for batch_date_times in exiftool_pool.map(Audit.__read_date_times, batches)
+                    for file_path, date_time in batch_date_times.items()
+                }
+
+        self.step_count += 1
+
+        # rename falls back to the default date time when the tag is missing, so that is what the name should hold
+        for file_path, named_date_time in formatted_paths.items():
+            recorded_date_time = date_times.get(file_path) or Config.file_name_date_default
+
+            if named_date_time != recorded_date_time:
+                self.mismatched.append((file_path, named_date_time, recorded_date_time))
+
+    @staticmethod
+    def __read_date_times(exiftool: ExifTool, file_paths: list[str]):
+        with tempfile.NamedTemporaryFile("w", suffix=".args", delete=False) as argument_file:
+            for file_path in file_paths:
+                Util.write_with_newline(argument_file, file_path)
+
+        try:
+            return {
+                file_tags[Tags.SourceFile]: file_tags.get(Tags.DateTimeOriginal)
+                for file_tags in Util.deserialize_stream(
+                    exiftool.execute_stream(
+                        f"-{Tags.JSONFormat}",
+                        f"-{Tags.DateTimeOriginal}",
+                        "-d",
+                        Config.file_name_date_format,
+                        "-@",
+                        argument_file.name
+                    )
+                )
+                if Tags.SourceFile in file_tags
+            }
+        finally:
+            os.remove(argument_file.name)
+
+    def __check_sidecars(self, media_directories: dict[str, list[str]]):
+        Printer.console.print(f"\n{Printer.color_title}🧾 Checking sidecars! 🧾\n")
+
+        for directory, file_names in media_directories.items():
+            # stems are grouped by the meta folder they are written to, which is per extension when reprocessing
+            # several extensions in place
+            meta_stems: dict[str, set[str]] = {}
+
+            for file_name in file_names:
+                stem, extension = Util.split_extension(file_name)
+                meta_stems.setdefault(Audit.__meta_destination(directory, extension), set()).add(stem)
+
+            for meta_destination, stems in meta_stems.items():
+                # directories that were never processed have no sidecars to be missing
+                if not os.path.isdir(meta_destination):
+                    continue
+
+                sidecars = dict(Audit.required_sidecars)
+                sidecars.update({
+                    kind: extension for kind, extension in Audit.optional_sidecars.items()
+                    if os.path.isdir(os.path.join(meta_destination, kind))
+                })
+
+                for kind, extension in sidecars.items():
+                    self.__check_sidecar_kind(os.path.join(meta_destination, kind), extension, stems)
+
+        self.step_count += 1
+
+    def __check_sidecar_kind(self, sidecar_directory: str, extension: str, stems: set[str]):
+        sidecar_stems = set()
+
+        if os.path.isdir(sidecar_directory):
+            for sidecar_name in Util.scan_file_names(sidecar_directory, extension):
+                sidecar_stem = Util.split_extension(sidecar_name)[0]
+                sidecar_stems.add(sidecar_stem)
+
+                if sidecar_stem not in stems:
+                    self.orphaned_sidecars.append(os.path.join(sidecar_directory, sidecar_name))
+
+        for stem in sorted(stems.difference(sidecar_stems)):
+            self.missing_sidecars.append(os.path.join(sidecar_directory, f"{stem}.{extension}"))
+
+    @staticmethod
+    def __meta_destination(directory: str, extension: str):
+        meta_destination = os.path.join(directory, Process.meta_destination_name)
+        extension_meta_destination = os.path.join(meta_destination, extension.lower())
+
+        return extension_meta_destination if os.path.isdir(extension_meta_destination) else meta_destination
+
+    def __report(self, num_files: int):
+        Printer.console.print(f"\n{Printer.color_title}📋 Audit of {num_files} file(s)! 📋\n")
+
+        for file_path, named_date_time, recorded_date_time in self.mismatched:
+            Printer.warning(
+                f"\[{file_path}] is named \[{named_date_time}] but was taken \[{recorded_date_time}]!"
+            )
+
+        for file_path, error_message in self.malformed:
+            Printer.warning(f"\[{file_path}] is not a formatted name! {error_message}")
+
+        for sidecar_path in self.missing_sidecars:
+            Printer.warning(f"\[{sidecar_path}] is missing!")
+
+        for sidecar_path in self.orphaned_sidecars:
+            Printer.warning(f"\[{sidecar_path}] has no media file!")
+
+        if self.report_path:
+            with open(self.report_path, "w") as report_file:
+                json.dump(
+                    {
+                        Audit.json_key_mismatched: [
+                            {
+                                Audit.json_key_path: file_path,
+                                Audit.json_key_named: named_date_time,
+                                Audit.json_key_recorded: recorded_date_time
+                            }
+                            for file_path, named_date_time, recorded_date_time in self.mismatched
+                        ],
+                        Audit.json_key_malformed: [
+                            {Audit.json_key_path: file_path, Audit.json_key_error: error_message}
+                            for file_path, error_message in self.malformed
+                        ],
+                        Audit.json_key_missing_sidecars: self.missing_sidecars,
+                        Audit.json_key_orphaned_sidecars: self.orphaned_sidecars
+                    },
+                    report_file,
+                    indent=2
+                )
+
+            Printer.waiting(f"Wrote the audit report to \[{self.report_path}].")
+
+        num_problems = len(self.mismatched) + len(self.malformed) + \
+            len(self.missing_sidecars) + len(self.orphaned_sidecars)
+
+        if not num_problems:
+            Printer.waiting("Every name matches its EXIF and every sidecar is in place!")
+        else:
+            Printer.warning(
+                f"Found {len(self.mismatched)} mismatched date time(s), {len(self.malformed)} malformed name(s), "
+                f"{len(self.missing_sidecars)} missing sidecar(s) and {len(self.orphaned_sidecars)} orphaned "
+                f"sidecar(s)!"
+            )
+
+        Printer.done()
+
+        return num_problems
+
+    @staticmethod
+    def start_message():
+        Printer.divider()
+        Printer.console.print(f"{Printer.color_divider}🕵️  Starting audit! 🕵️")
+        Printer.divider()
@@ -0,0 +1,68 @@
+import contextlib
+import typing
+
+from entities.filter import Filter
+from util.catalog import Catalog
+from util.exiftool import ExifTool
+from util.helpers import Util, Printer
+from util.pipeline import SerialExecutor, ExifToolExecutor
+
+
+class Command:
+    def __init__(
+            self,
+            directory: str,
+            output_directory: str,
+            filter_files: bool,
+            extension: str,
+            workers: int = 1
+    ):
+        self.directory = Util.strip_slashes(directory)
+        self.output_directory = None if not output_directory else Util.strip_slashes(output_directory)
+        self.filter_files = filter_files
+        self.extension = extension
+        self.workers = max(workers, 1)
+        self.incremental = False
+        # commands that update the catalog enter it around their run, nested commands share the parent's
+        self.use_catalog = False
+        self.catalog: typing.Optional[Catalog] = None
+        self.step_count = 1
+        self.total_steps = 2
+
+    def verify_and_filter(
+            self,
+            exiftool: ExifTool,
+            empty_message: str,
+            file_filter: Filter = None,
+            abort_if_empty: bool = True
+    ):
+        Util.verify_directory(self.directory)
+        Util.verify_extensions_in_directory(exiftool, self.extension, self.directory)
+
+        if self.output_directory:
+            Util.create_directory_or_abort(self.output_directory, self.directory, self.incremental)
+
+        file_names = Util.get_valid_file_names(exiftool, self.extension, self.directory)
+
+        file_filter = Filter.build_filter(self.filter_files, self.total_steps) if not file_filter else file_filter
+        filtered_file_names = file_filter.filter(file_names)
+        self.step_count += 1
+
+        if not filtered_file_names:
+            if abort_if_empty:
+                Printer.error_and_abort(empty_message)
+
+            Printer.warning(empty_message)
+
+        return filtered_file_names
+
+    def open_catalog(self):
+        return Catalog() if self.use_catalog else contextlib.nullcontext()
+
+    def build_executor(self, exiftool: ExifTool):
+        if self.workers == 1:
+            return SerialExecutor(exiftool)
+        return ExifToolExecutor(exiftool, self.workers)
+
+    def progress_label(self, label: str):
+        return Printer.progress_label_with_steps(label, self.step_count, self.total_steps)
@@ -0,0 +1,236 @@
+import json
+import os
+
+from util.config import Config
+from util.contentindex import ContentIndex
+from util.helpers import Util, Printer
+from util.pipeline import Stage, StageStatus, ThreadExecutor
+from util.transfer import Transfer
+
+
+class DupesFile:
+    def __init__(self, path: str, size: int, mtime_ns: int, fingerprint: str = None, digest: str = None):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.fingerprint = fingerprint
+        self.digest = digest
+
+
+class Dupes:
+    json_key_sets = "sets"
+    json_key_size = "size"
+    json_key_digest = "digest"
+    json_key_paths = "paths"
+    json_key_wasted_bytes = "wasted_bytes"
+
+    def __init__(
+            self,
+            root: str,
+            report_path: str = None,
+            workers: int = Config.yank_workers,
+            min_size: int = 1
+    ):
+        self.root = Util.strip_slashes(root)
+        self.report_path = report_path
+        self.workers = max(workers, 1)
+        self.min_size = max(min_size, 0)
+        self.step_count = 1
+        self.total_steps = 2
+        # directories that carry a content index, keyed to the entries it held when the walk started
+        self.indexed_directories: dict[str, dict[str, dict]] = {}
+
+    def dupes(self):
+        Dupes.start_message()
+
+        Util.verify_directory(self.root)
+
+        sizes = self.__walk()
+        num_files = sum(len(files) for files in sizes.values())
+
+        # files of a unique size cannot have a duplicate, which usually rules out most of a library without a read
+        candidates = [file for files in sizes.values() if len(files) > 1 for file in files]
+
+        Printer.waiting(f"Found {num_files} file(s), {len(candidates)} share their size with another file.")
+
+        # every file that was read has a fingerprint, the full hashes are filled in on the same objects later
+        hashed_files, candidates = self.__narrow(
+            candidates,
+            "Fingerprint",
+            Dupes.__fingerprint,
+            lambda file: (file.size, file.fingerprint)
+        )
+        _, candidates = self.__narrow(candidates, "Full hash", Dupes.__digest, lambda file: (file.size, file.digest))
+
+        duplicate_sets = Dupes.__group(candidates, lambda file: (file.size, file.digest))
+
+        self.__update_indexes(hashed_files)
+        self.__report(duplicate_sets)
+
+        Printer.done_all()
+
+    def __walk(self):
+        Printer.console.print(f"\n{Printer.color_title}🚶 Walking \[{self.root}]! 🚶\n")
+
+        sizes: dict[int, list[DupesFile]] = {}
+        directories = [self.root]
+
+        with Printer.progress_spinner() as progress:
+            progress.add_task(f"Listing files in \[{self.root}]...")
+
+            while directories:
+                directory = directories.pop()
+                index_entries = ContentIndex.load_entries(directory)
+
+                if index_entries:
+                    self.indexed_directories[directory] = index_entries
+
+                try:
+                    with os.scandir(directory) as directory_entries:
+                        for directory_entry in directory_entries:
+                            if not ContentIndex.is_indexed(directory_entry.name):
+                                continue
+
+                            if directory_entry.is_dir(follow_symlinks=False):
+                                directories.append(directory_entry.path)
+                                continue
+
+                            if not directory_entry.is_file(follow_symlinks=False):
+                                continue
+
+                            stat = directory_entry.stat(follow_symlinks=False)
+
+                            if stat.st_size < self.min_size:
+                                continue
+
+                            fingerprint, digest = ContentIndex.cached_hashes(
+                                index_entries.get(directory_entry.name),
+                                stat.st_size,
+                                stat.st_mtime_ns
+                            )
+
+                            sizes.setdefault(stat.st_size, []).append(
+                                DupesFile(directory_entry.path, stat.st_size, stat.st_mtime_ns, fingerprint, digest)
+                            )
+                except OSError as error:
+                    Printer.warning(f"Skipping \[{directory}] since it could not be listed ({error.strerror})!")
+
+        return sizes
+
+    def __narrow(self, files: list[DupesFile], label: str, closure, key):
+        Printer.console.print(f"\n{Printer.color_title}🔍 {label} of {len(files)} file(s)! 🔍\n")
+
+        stage = Stage(
+            label,
+            closure,
+            executor=ThreadExecutor(self.workers),
+            label=Printer.progress_label_with_steps(label, self.step_count, self.total_steps),
+            total=len(files)
+        )
+        self.step_count += 1
+
+        hashed_files = stage.run(files)
+
+        return hashed_files, [file for files in Dupes.__group(hashed_files, key) for file in files]
+
+    def __update_indexes(self, files: list[DupesFile]):
+        # hashes worked out here are handed back to the indexes they could have come from
+        files_by_directory: dict[str, list[DupesFile]] = {}
+
+        for file in files:
+            directory = os.path.dirname(file.path)
+
+            if directory in self.indexed_directories:
+                files_by_directory.setdefault(directory, []).append(file)
+
+        for directory, directory_files in files_by_directory.items():
+            content_index = ContentIndex.open(directory)
+
+            for file in directory_files:
+                content_index.remember(
+                    os.path.basename(file.path),
+                    file.size,
+                    file.mtime_ns,
+                    file.fingerprint,
+                    file.digest
+                )
+
+            content_index.save()
+
+    def __report(self, duplicate_sets: list[list[DupesFile]]):
+        Printer.console.print(f"\n{Printer.color_title}👯 Duplicates! 👯\n")
+
+        wasted_bytes = 0
+
+        for duplicate_set in duplicate_sets:
+            wasted_bytes += duplicate_set[0].size * (len(duplicate_set) - 1)
+
+            Printer.waiting(f"{len(duplicate_set)} copies of {duplicate_set[0].size} byte(s):")
+            for file in duplicate_set:
+                Printer.print(file.path, prefix=Printer.tab)
+
+        if self.report_path:
+            with open(self.report_path, "w") as report_file:
+                json.dump(
+                    {
+                        Dupes.json_key_wasted_bytes: wasted_bytes,
+                        Dupes.json_key_sets: [
+                            {
+                                Dupes.json_key_size: duplicate_set[0].size,
+                                Dupes.json_key_digest: duplicate_set[0].digest,
+                                Dupes.json_key_paths: [file.path for file in duplicate_set]
+                            }
+                            for duplicate_set in duplicate_sets
+                        ]
+                    },
+                    report_file,
+                    indent=2
+                )
+
+            Printer.waiting(f"Wrote the duplicate report to \[{self.report_path}].")
+
+        if not duplicate_sets:
+            Printer.waiting("There are no duplicates!")
+        else:
+            Printer.warning(
+                f"Found {len(duplicate_sets)} set(s) of duplicates wasting {wasted_bytes / 1024 ** 2:.1f} MiB!"
+            )
+
+        Printer.done()
+
+    @staticmethod
+    def __fingerprint(_, file: DupesFile, emit):
+        try:
+            if not file.fingerprint:
+                file.fingerprint = ContentIndex.fingerprint(file.path, file.size)
+        except OSError as error:
+            Printer.warning(f"Skipping \[{file.path}] since it could not be read ({error.strerror})!")
+            return StageStatus.failed
+
+        emit(file)
+
+    @staticmethod
+    def __digest(_, file: DupesFile, emit):
+        try:
+            if not file.digest:
+                file.digest = Transfer.file_digest(file.path)
+        except OSError as error:
+            Printer.warning(f"Skipping \[{file.path}] since it could not be read ({error.strerror})!")
+            return StageStatus.failed
+
+        emit(file)
+
+    @staticmethod
+    def __group(files: list[DupesFile], key):
+        groups: dict[tuple, list[DupesFile]] = {}
+
+        for file in files:
+            groups.setdefault(key(file), []).append(file)
+
+        return [sorted(group, key=lambda file: file.path) for _, group in sorted(groups.items()) if len(group) > 1]
+
+    @staticmethod
+    def start_message():
+        Printer.divider()
+        Printer.console.print(f"{Printer.color_divider}👯 Starting dupes! 👯")
+        Printer.divider()
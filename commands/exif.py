@@ -1,87 +1,223 @@
 import os
+import typing
+from enum import Enum
 
-from rich.progress import Progress
-
-from entities.filter import Filter
-from util.exiftool import ExifTool
+from commands.command import Command
+from util.config import Config
+from util.constants import Tags
+from util.exiftool import ExifTool, ExifToolPool
 from util.helpers import Util, Printer
+from util.pipeline import Stage, StageStatus
+
+
+class SidecarType(str, Enum):
+    xmp = "xmp"
+    json = "json"
+
 
+class Exif(Command):
+    mie_extension = "mie"
 
-class Exif:
     def __init__(
             self,
             directory: str,
             output_directory: str,
             filter_files: bool,
-            extension: str
+            extension: str,
+            incremental: bool = False,
+            batch: bool = False,
+            sidecars: typing.List[SidecarType] = None,
+            workers: int = 1
     ):
-        self.directory = Util.strip_slashes(directory)
-        self.output_directory = Util.strip_slashes(output_directory)
-        self.filter_files = filter_files
-        self.extension = extension
-        self.step_count = 1
-        self.total_steps = 2
+        super().__init__(directory, output_directory, filter_files, extension, workers)
+        self.incremental = incremental
+        self.batch = batch
+        self.sidecars = [] if not sidecars else [SidecarType(sidecar) for sidecar in sidecars]
+        self.sidecar_directories: dict[SidecarType, str] = {}
 
     def exif(self):
         Exif.start_message()
 
-        Util.verify_directory(self.directory)
-
         with ExifTool() as exiftool:
-            Util.verify_extensions_in_directory(exiftool, self.extension, self.directory)
-
-            Util.create_directory_or_abort(self.output_directory, self.directory)
-
-            file_names = Util.get_valid_file_names(exiftool, self.extension, self.directory)
-
-            formatted_filter = Filter.build_filter(self.filter_files, self.total_steps)
-            filtered_file_names = formatted_filter.filter(file_names)
-            self.step_count += 1
-
-            if not filtered_file_names:
-                Printer.error_and_abort("There are no valid files to generate EXIFs for!")
+            filtered_file_names = self.verify_and_filter(exiftool, "There are no valid files to generate EXIFs for!")
 
             self.do_exif(exiftool, filtered_file_names)
 
         Printer.done_all()
 
     def do_exif(self, exiftool: ExifTool, file_names: list[str]):
+        if self.batch:
+            self.do_exif_batch(exiftool, file_names)
+            return
+
         Printer.console.print("")
-        num_files = len(file_names)
 
-        with Progress(console=Printer.console, auto_refresh=False) as progress:
-            progress_task = progress.add_task(
-                Printer.progress_label_with_steps(
-                    "EXIF sidecar",
-                    self.step_count,
-                    self.total_steps
-                ),
-                total=num_files
-            )
+        def exif_stage(stage_exiftool: ExifTool, file_name: str, _):
+            if self.incremental and self.is_up_to_date(file_name):
+                return StageStatus.up_to_date
+
+            return StageStatus.processed if self.exif_single(stage_exiftool, file_name) else StageStatus.skipped
+
+        Stage(
+            "EXIF sidecar",
+            exif_stage,
+            executor=self.build_executor(exiftool),
+            label=self.progress_label("EXIF sidecar"),
+            total=len(file_names)
+        ).run(file_names)
+
+        Printer.done()
+
+    def output_paths(self, file_name: str):
+        output_paths = {Exif.mie_extension: Util.output_path(self.output_directory, file_name, Exif.mie_extension)}
+
+        for sidecar in self.sidecars:
+            sidecar_directory = self.sidecar_directories.get(sidecar, self.output_directory)
+            output_paths[sidecar.value] = Util.output_path(sidecar_directory, file_name, sidecar.value)
+
+        return output_paths
+
+    def is_up_to_date(self, file_name: str):
+        full_path_from = os.path.join(self.directory, file_name)
+
+        return all(
+            Util.is_output_up_to_date(full_path_from, full_path_to)
+            for full_path_to in self.output_paths(file_name).values()
+        )
+
+    def exif_single(self, exiftool: ExifTool, file_name: str):
+        full_path_from = os.path.join(self.directory, file_name)
+        output_paths = self.output_paths(file_name)
+
+        success = self.mie_single(exiftool, full_path_from, output_paths[Exif.mie_extension])
+
+        for sidecar in self.sidecars:
+            success = self.sidecar_single(exiftool, sidecar, full_path_from, output_paths[sidecar.value]) and success
+
+        self.record_sidecars(full_path_from, output_paths)
+
+        return success
+
+    def record_sidecars(self, full_path_from: str, output_paths: dict[str, str]):
+        if not self.catalog:
+            return
 
-            for count, file_name in enumerate(file_names):
-                progress.update(progress_task, completed=count)
-                progress.refresh()
+        for kind, full_path_to in output_paths.items():
+            if os.path.isfile(full_path_to):
+                self.catalog.record_sidecar(full_path_from, kind, full_path_to)
 
-                file_name_extensionless = os.path.splitext(file_name)[0]
-                full_path_from = os.path.join(self.directory, file_name)
-                full_path_to = f"{os.path.join(self.output_directory, file_name_extensionless)}.mie"
+    def mie_single(self, exiftool: ExifTool, full_path_from: str, full_path_to: str):
+        # exiftool refuses to overwrite existing files, so stale outputs are removed first
+        if os.path.isfile(full_path_to):
+            os.remove(full_path_to)
 
-                Printer.waiting(f"Writing MIE binary dump to \[{full_path_to}]...")
+        Printer.waiting(f"Writing MIE binary dump to \[{full_path_to}]...")
 
+        return ExifTool.parse_files_created(
+            exiftool.execute_with_extension(
+                self.extension,
+                "-o",
+                full_path_to,
+                "-all:all",
+                "-icc_profile",
+                full_path_from
+            )
+        ) > 0
+
+    def sidecar_single(self, exiftool: ExifTool, sidecar: SidecarType, full_path_from: str, full_path_to: str):
+        if os.path.isfile(full_path_to):
+            os.remove(full_path_to)
+
+        if sidecar == SidecarType.xmp:
+            Printer.waiting(f"Writing XMP sidecar to \[{full_path_to}]...", prefix=Printer.tab)
+
+            return ExifTool.parse_files_created(
                 exiftool.execute_with_extension(
                     self.extension,
                     "-o",
                     full_path_to,
+                    full_path_from
+                )
+            ) > 0
+        else:
+            Printer.waiting(f"Writing full JSON sidecar to \[{full_path_to}]...", prefix=Printer.tab)
+
+            return exiftool.execute_to_file(
+                full_path_to,
+                *ExifTool.extension_args(self.extension),
+                f"-{Tags.JSONFormat}",
+                "-G",
+                "-a",
+                full_path_from
+            ) > 0
+
+    def do_exif_batch(self, exiftool: ExifTool, file_names: list[str]):
+        Printer.console.print("")
+        num_files = len(file_names)
+
+        num_files_up_to_date = 0
+        pending_paths: list[str] = []
+
+        for file_name in file_names:
+            full_path_from = os.path.join(self.directory, file_name)
+            full_path_to = Util.output_path(self.output_directory, file_name, Exif.mie_extension)
+
+            if self.incremental and self.is_up_to_date(file_name):
+                num_files_up_to_date += 1
+                continue
+
+            if os.path.isfile(full_path_to):
+                os.remove(full_path_to)
+
+            pending_paths.append(full_path_from)
+
+        batches = [
+            pending_paths[index:index + Config.exiftool_batch_size]
+            for index in range(0, len(pending_paths), Config.exiftool_batch_size)
+        ]
+        pool_size = min(self.workers, len(batches))
+        output_pattern = f"{os.path.join(self.output_directory.replace('%', '%%'), '%f')}.mie"
+
+        def write_batch(batch_exiftool: ExifTool, batch: list[str]):
+            return ExifTool.parse_files_created(
+                batch_exiftool.execute_with_extension(
+                    self.extension,
+                    "-o",
+                    output_pattern,
                     "-all:all",
                     "-icc_profile",
-                    full_path_from
+                    *batch
                 )
+            )
+
+        num_files_created = 0
+
+        if batches:
+            with Printer.progress_spinner() as progress:
+                progress.add_task(
+                    self.progress_label(
+                        f"EXIF sidecar batch of {len(pending_paths)} file(s) across {pool_size} exiftool(s)"
+                    )
+                )
+
+                with ExifToolPool(size=pool_size, exiftool=exiftool) as exiftool_pool:
+                    num_files_created = sum(exiftool_pool.map(write_batch, batches))
+
+        num_files_skipped = len(pending_paths) - num_files_created
+
+        for full_path_from in pending_paths:
+            file_name = os.path.basename(full_path_from)
+            output_paths = self.output_paths(file_name)
+
+            for sidecar in self.sidecars:
+                if not self.sidecar_single(exiftool, sidecar, full_path_from, output_paths[sidecar.value]):
+                    Printer.warning(f"Failed to write \[{output_paths[sidecar.value]}]!")
 
-            progress.update(progress_task, completed=num_files)
+            self.record_sidecars(full_path_from, output_paths)
 
-        num_files_in_directory = Util.num_files_in_directory(self.output_directory)
-        Printer.print_files_skipped(num_files - num_files_in_directory)
+        Printer.waiting(f"Generated {num_files_created} of {num_files} MIE binary dump(s).")
+        Printer.print_files_up_to_date(num_files_up_to_date)
+        Printer.print_files_skipped(num_files_skipped)
 
         Printer.done()
 
@@ -1,16 +1,17 @@
 import os
+import tempfile
 
 from rich.progress import Progress
 
-from entities.filename import FileName
-from entities.filmroll import FilmRoll
-from entities.filter import Filter
+from commands.command import Command
+from entities.filename import FileName, FileNameTypeError
+from entities.filmrollindex import FilmRollIndex, FilmRollIndexError
 from util.constants import Tags
 from util.exiftool import ExifTool
 from util.helpers import Util, Printer
 
 
-class Film:
+class Film(Command):
     output_file_name = "description"
     output_file_placeholder = [
         "description",
@@ -26,33 +27,20 @@ class Film:
             directory: str,
             output_directory: str,
             filter_files: bool,
-            extension: str
+            extension: str,
+            incremental: bool = False
     ):
-        self.directory = Util.strip_slashes(directory)
-        self.output_directory = Util.strip_slashes(output_directory)
-        self.filter_files = filter_files
-        self.extension = extension
-        self.step_count = 1
-        self.total_steps = 2
+        super().__init__(directory, output_directory, filter_files, extension)
+        self.incremental = incremental
 
     def film(self):
         Film.start_message()
 
-        Util.verify_directory(self.directory)
-
         with ExifTool() as exiftool:
-            Util.verify_extensions_in_directory(exiftool, self.extension, self.directory)
-
-            Util.create_directory_or_abort(self.output_directory, self.directory)
-
-            file_names = Util.get_valid_file_names(exiftool, self.extension, self.directory)
-
-            formatted_filter = Filter.build_filter(self.filter_files, self.total_steps)
-            filtered_file_names = formatted_filter.filter(file_names)
-            self.step_count += 1
-
-            if not filtered_file_names:
-                Printer.error_and_abort("There are no valid files to generate metadata for!")
+            filtered_file_names = self.verify_and_filter(
+                exiftool,
+                "There are no valid files to generate metadata for!"
+            )
 
             self.do_film(exiftool, filtered_file_names)
 
@@ -61,111 +49,179 @@ class Film:
     def do_film(self, exiftool: ExifTool, file_names: list[str]):
         Printer.console.print(f"\n{Printer.color_title}📋 Starting film metadata collection! 📋\n")
 
-        num_files = len(file_names)
+        file_names = [str(file_name) for file_name in file_names]
+        film_roll_index = self.__load_film_roll_index()
 
-        required_tags = {
-            Tags.Make,
-            Tags.Model,
-            Tags.Lens,
-            Tags.UserComment
-        }
-        required_tags_formatted = {f"-{tag}" for tag in required_tags}
+        num_files_removed = film_roll_index.remove_missing(set(file_names))
 
-        with Progress(console=Printer.console, auto_refresh=False) as progress:
-            progress_task = progress.add_task(
-                Printer.progress_label_with_steps(
-                    "Film metadata",
-                    self.step_count,
-                    self.total_steps
-                ),
-                total=num_files
-            )
+        pending_fingerprints: dict[str, list[int]] = {}
 
-            num_files_skipped = 0
+        for file_name in file_names:
+            fingerprint = FilmRollIndex.fingerprint(os.path.join(self.directory, file_name))
 
-            film_rolls = {}
+            if not film_roll_index.is_up_to_date(file_name, fingerprint):
+                pending_fingerprints[file_name] = fingerprint
 
-            for count, file_name in enumerate(file_names):
-                progress.update(progress_task, completed=count)
-                progress.refresh()
+        num_files_up_to_date = len(file_names) - len(pending_fingerprints)
+        num_files_skipped = 0
 
-                file_path = os.path.join(self.directory, file_name)
+        if pending_fingerprints:
+            num_files_skipped = self.__read_film_tags(exiftool, pending_fingerprints, film_roll_index)
 
-                Printer.waiting(f"Collecting metadata for \[{file_path}]...")
+        film_rolls, num_rolls_updated = film_roll_index.film_rolls()
 
-                Printer.waiting(f"Building tag JSON...", prefix=Printer.tab)
-                file_tags = Util.deserialize_data(
-                    exiftool.execute_with_extension(
-                        self.extension,
-                        f"-{Tags.JSONFormat}",
-                        file_path,
-                        *required_tags_formatted
-                    )
-                )
+        full_path_to = f"{os.path.join(self.output_directory, Film.output_file_name)}.txt"
 
-                if not file_tags:
-                    Printer.warning(f"Skipping \[{file_path}] due to error!")
-                    num_files_skipped += 1
-                    continue
+        Printer.print("")
+        Printer.waiting(f"Writing combined metadata to \[{full_path_to}]...")
 
-                file_tags = file_tags[0]
+        with open(full_path_to, "w") as output_file:
+            for placeholder in Film.output_file_placeholder:
+                Util.write_with_newline(output_file, placeholder)
 
-                if not required_tags.issubset(file_tags):
-                    Printer.warning(f"Skipping \[{file_path}] since could not find tag(s) {list(required_tags.difference(file_tags))}!")
-                    num_files_skipped += 1
-                    continue
+            for film_roll in film_rolls:
+                Util.write_with_newline(output_file, "")
+                Util.write_with_newline(output_file, film_roll.date)
 
-                file_name_object = FileName.from_string(file_name)
+                for film_type in film_roll.pretty_film_types:
+                    Util.write_with_newline(output_file, film_type)
 
-                film_roll = film_rolls.get(
-                    file_name_object.date_time,
-                    FilmRoll(file_name_object)
-                )
+                for camera in film_roll.pretty_cameras:
+                    Util.write_with_newline(output_file, camera)
 
-                tag_parsing_success = self.__update_film_roll_from_tags(film_roll, file_tags)
+                for lens in film_roll.pretty_lenses:
+                    Util.write_with_newline(output_file, lens)
 
-                if not tag_parsing_success:
-                    Printer.warning(f"Skipping \[{file_path}] since could not parse user comment tag(s)!")
-                    num_files_skipped += 1
-                    continue
+        Printer.done(prefix=Printer.tab)
 
-                film_rolls[file_name_object.date_time] = film_roll
+        index_path = film_roll_index.save(self.output_directory)
 
-            progress.update(progress_task, completed=num_files)
+        Printer.waiting(f"Updated {num_rolls_updated} of {len(film_rolls)} roll(s) in \[{index_path}].")
 
-            full_path_to = f"{os.path.join(self.output_directory, Film.output_file_name)}.txt"
+        if num_files_removed:
+            Printer.waiting(f"Removed {num_files_removed} file(s) that are no longer present from the index.")
 
-            film_roll_list = list(film_rolls.values())
-            film_roll_list.sort(key=lambda x: x.full_date)
+        Printer.print_files_up_to_date(num_files_up_to_date)
+        Printer.print_files_skipped(num_files_skipped)
 
-            Printer.print("")
-            Printer.waiting(f"Writing combined metadata to \[{full_path_to}]...")
+        Printer.done()
 
-            with open(full_path_to, "w") as output_file:
-                for placeholder in Film.output_file_placeholder:
-                    Util.write_with_newline(output_file, placeholder)
+    def __load_film_roll_index(self):
+        # a non incremental run has just emptied the output directory, so there is nothing to load
+        if not self.incremental:
+            return FilmRollIndex(self.extension)
 
-                for film_roll in film_roll_list:
-                    Util.write_with_newline(output_file, "")
-                    Util.write_with_newline(output_file, film_roll.date)
+        try:
+            return FilmRollIndex.load(self.output_directory, self.extension)
+        except FilmRollIndexError as error:
+            Printer.warning(error.message)
+            Printer.warning("Rebuilding the film roll index from scratch!", prefix=Printer.tab)
+            return FilmRollIndex(self.extension)
 
-                    for film_type in film_roll.pretty_film_types:
-                        Util.write_with_newline(output_file, film_type)
+    def __read_film_tags(
+            self,
+            exiftool: ExifTool,
+            pending_fingerprints: dict[str, list[int]],
+            film_roll_index: FilmRollIndex
+    ):
+        required_tags = {
+            Tags.Make,
+            Tags.Model,
+            Tags.Lens,
+            Tags.UserComment
+        }
+        required_tags_formatted = {f"-{tag}" for tag in required_tags}
 
-                    for camera in film_roll.pretty_cameras:
-                        Util.write_with_newline(output_file, camera)
+        num_files = len(pending_fingerprints)
+        skipped_file_names = []
 
-                    for lens in film_roll.pretty_lenses:
-                        Util.write_with_newline(output_file, lens)
+        with Progress(console=Printer.console, auto_refresh=False) as progress:
+            progress_task = progress.add_task(self.progress_label("Film metadata"), total=num_files)
 
-            Printer.done(prefix=Printer.tab)
+            with tempfile.NamedTemporaryFile("w", suffix=".args", delete=False) as argument_file:
+                for file_name in pending_fingerprints:
+                    Util.write_with_newline(argument_file, os.path.join(self.directory, file_name))
 
-        Printer.print_files_skipped(num_files_skipped)
+            Printer.waiting(f"Reading film metadata for {num_files} new or changed file(s) in one pass...")
 
-        Printer.done()
+            try:
+                # exiftool answers in argument order, so the stream follows the already sorted file names
+                files_tags = Util.deserialize_stream(
+                    exiftool.execute_stream(
+                        f"-{Tags.JSONFormat}",
+                        "-@",
+                        argument_file.name,
+                        *required_tags_formatted
+                    )
+                )
+
+                file_names_iterator = iter(pending_fingerprints)
+
+                for file_tags in files_tags:
+                    file_path = file_tags.get(Tags.SourceFile, "")
+
+                    # files exiftool could not read are left out of its output entirely
+                    for file_name in file_names_iterator:
+                        if os.path.join(self.directory, file_name) == file_path:
+                            break
+
+                        Printer.warning(f"Skipping \[{os.path.join(self.directory, file_name)}] due to error!")
+                        skipped_file_names.append(file_name)
+                    else:
+                        break
+
+                    progress.advance(progress_task)
+                    progress.refresh()
+
+                    if not required_tags.issubset(file_tags):
+                        Printer.warning(
+                            f"Skipping \[{file_path}] since could not find tag(s) "
+                            f"{list(required_tags.difference(file_tags))}!"
+                        )
+                        skipped_file_names.append(file_name)
+                        continue
+
+                    try:
+                        file_name_object = FileName.from_string(file_name)
+                    except FileNameTypeError as error:
+                        Printer.warning(f"Skipping \[{file_path}] as it is unformatted!")
+                        Printer.warning(error.message, prefix=Printer.tab)
+                        skipped_file_names.append(file_name)
+                        continue
+
+                    film_type = Film.__parse_film_type(file_tags)
+
+                    if not film_type:
+                        Printer.warning(f"Skipping \[{file_path}] since could not parse user comment tag(s)!")
+                        skipped_file_names.append(file_name)
+                        continue
+
+                    film_roll_index.set_file(
+                        file_name,
+                        file_name_object.date_time,
+                        pending_fingerprints[file_name],
+                        film_type,
+                        (file_tags[Tags.Make], file_tags[Tags.Model]),
+                        file_tags[Tags.Lens]
+                    )
+
+                for file_name in file_names_iterator:
+                    Printer.warning(f"Skipping \[{os.path.join(self.directory, file_name)}] due to error!")
+                    skipped_file_names.append(file_name)
+            finally:
+                os.remove(argument_file.name)
+
+            progress.update(progress_task, completed=num_files)
+            progress.refresh()
+
+        # whatever a skipped file contributed before it changed no longer holds
+        for file_name in skipped_file_names:
+            film_roll_index.remove_file(file_name)
+
+        return len(skipped_file_names)
 
     @staticmethod
-    def __update_film_roll_from_tags(film_roll: FilmRoll, file_tags: dict):
+    def __parse_film_type(file_tags: dict):
         user_comment = file_tags[Tags.UserComment].split("\n")
         film_make = ""
         film_type = ""
@@ -177,19 +233,9 @@ class Film:
                 film_type = line.replace(Film.user_comment_film_type_key, "").strip()
 
         if not film_make or not film_type:
-            return False
-
-        film_roll.film_types.add(
-            (film_make, film_type)
-        )
-        film_roll.cameras.add(
-            (file_tags[Tags.Make], file_tags[Tags.Model])
-        )
-        film_roll.lenses.add(
-            file_tags[Tags.Lens]
-        )
-
-        return True
+            return None
+
+        return film_make, film_type
 
     @staticmethod
     def start_message():
@@ -1,70 +1,269 @@
-from entities.filename import FileName, FileNameTypeError
-from entities.filter import Filter
-from util.exiftool import ExifTool
+import collections
+import csv
+import json
+import sys
+from enum import Enum
+
+from commands.command import Command
+from entities.checker import HiddenChecker
+from entities.filename import FileName
+from entities.filter import FormattedFilter
+from entities.rating import Rating
+from entities.style import Style
 from util.helpers import Util, Printer
+from util.pipeline import ProcessExecutor
+
+
+class InfoFormat(str, Enum):
+    pretty = "pretty"
+    table = "table"
+    csv = "csv"
+    json = "json"
+
+
+class Info(Command):
+    columns = [
+        "file_name",
+        "initials",
+        "date_time",
+        "sequence",
+        "style",
+        "rating",
+        "original"
+    ]
 
+    summary_categories = [
+        "style",
+        "rating",
+        "day",
+        "initials"
+    ]
+
+    table_column_widths = [48, 8, 19, 8, 14, 9, 0]
+    summary_bar_width = 40
+    summary_bar = "█"
 
-class Info:
     def __init__(
             self,
             directory: str,
             filter_files: bool,
-            extension: str
+            extension: str,
+            output_format: InfoFormat = InfoFormat.pretty,
+            summary: bool = False
     ):
-        self.directory = Util.strip_slashes(directory)
-        self.filter_files = filter_files
-        self.extension = extension
-        self.step_count = 1
+        super().__init__(directory, None, filter_files, extension)
         self.total_steps = 1
+        self.output_format = output_format
+        self.summary = summary
+        # csv and json are written to stdout alone so they can be piped, warnings go to stderr
+        self.machine_readable = output_format in (InfoFormat.csv, InfoFormat.json)
 
     def info(self):
-        Info.start_message()
+        if not self.machine_readable:
+            Info.start_message()
+            Util.verify_directory(self.directory)
+        elif not Util.is_directory_valid(self.directory):
+            Printer.error_and_abort(f"Directory \[{self.directory}] does not exist!")
+
+        # names are all info decodes, so the directory is listed without starting exiftool
+        hidden_checker = HiddenChecker()
+        file_names = sorted(
+            file_name for file_name in Util.scan_file_names(self.directory, self.extension)
+            if hidden_checker.check_string(file_name)
+        )
+
+        if not file_names:
+            Printer.error_and_abort("There are no valid files to list information for!")
+
+        if self.filter_files:
+            parsed_file_names = self.__filter(file_names)
+        else:
+            parsed_file_names = zip(file_names, ProcessExecutor.map_chunks_if_large(FileName.parse_batch, file_names))
+
+        if self.summary:
+            self.__do_summary(parsed_file_names)
+        else:
+            self.__do_info(parsed_file_names)
 
-        Util.verify_directory(self.directory)
+        if not self.machine_readable:
+            Printer.done_all()
 
-        with ExifTool() as exiftool:
-            Util.verify_extensions_in_directory(exiftool, self.extension, self.directory)
+    def __filter(self, file_names: list[str]):
+        file_filter = FormattedFilter.build(True, self.total_steps)
+        file_name_objects = file_filter.filter(file_names)
 
-            file_names = Util.get_valid_file_names(exiftool, self.extension, self.directory)
+        return [
+            (file_name, (file_name_object.to_fields(), ""))
+            for file_name, file_name_object in zip(file_filter.filtered_file_names, file_name_objects)
+        ]
 
-            formatted_filter = Filter.build_filter(self.filter_files, self.total_steps)
-            filtered_file_names = formatted_filter.filter(file_names)
-            self.step_count += 1
+    def __do_info(self, parsed_file_names):
+        if not self.machine_readable:
+            Printer.console.print(f"{Printer.color_title}ℹ️  Starting info! ℹ️\n")
 
-            if not filtered_file_names:
-                Printer.error_and_abort("There are no valid files to list information for!")
+        num_files = 0
+        num_processed = 0
+
+        write_row, finish = self.__build_writer()
+
+        for file_name, (fields, error_message) in parsed_file_names:
+            num_files += 1
 
-        self.__do_info(filtered_file_names)
+            if not fields:
+                self.__skip(file_name, error_message)
+                continue
 
-        Printer.done_all()
+            write_row(file_name, FileName.from_fields(fields))
+            num_processed += 1
 
-    def __do_info(self, file_names: list[str]):
-        num_files = len(file_names)
+        finish()
 
-        Printer.console.print(f"{Printer.color_title}ℹ️  Starting info! ℹ️\n")
+        self.__print_skipped(num_files - num_processed)
 
+    def __do_summary(self, parsed_file_names):
+        histograms = {category: collections.Counter() for category in Info.summary_categories}
+        num_files = 0
         num_processed = 0
 
-        for file_name in file_names:
-            Printer.waiting(f"Information for \[{file_name}]:")
+        # one pass over the decoded fields, nothing per file is kept
+        for file_name, (fields, error_message) in parsed_file_names:
+            num_files += 1
+
+            if not fields:
+                self.__skip(file_name, error_message)
+                continue
+
+            initials, date_time, _, style, rating, _ = fields
+            histograms["style"][Style(style).name] += 1
+            histograms["rating"][Rating(rating).name] += 1
+            histograms["day"][date_time[:8]] += 1
+            histograms["initials"][initials.upper()] += 1
+            num_processed += 1
 
-            try:
-                file_name_object = FileName.from_string(file_name)
-                Info.__do_info_single_file(file_name_object)
-                num_processed += 1
-            except FileNameTypeError as error:
-                Printer.warning(f"Skipping \[{file_name}] as it is malformed!", prefix=Printer.tab)
-                Printer.warning(error.message, prefix=Printer.tab)
+        if self.output_format == InfoFormat.json:
+            json.dump(
+                {
+                    "files": num_processed,
+                    "malformed": num_files - num_processed,
+                    **{category: dict(sorted(histogram.items())) for category, histogram in histograms.items()}
+                },
+                sys.stdout,
+                indent=2
+            )
+            sys.stdout.write("\n")
+        elif self.output_format == InfoFormat.csv:
+            writer = csv.writer(sys.stdout)
+            writer.writerow(["category", "value", "count"])
+
+            for category, histogram in histograms.items():
+                writer.writerows((category, value, count) for value, count in sorted(histogram.items()))
+        else:
+            Printer.console.print(f"{Printer.color_title}📊 Summary of {num_processed} file(s)! 📊")
+
+            for category, histogram in histograms.items():
+                Info.__print_histogram(category, histogram)
 
             Printer.print("")
 
-        Printer.print_files_skipped(num_files - num_processed)
+        self.__print_skipped(num_files - num_processed)
+
+    def __build_writer(self):
+        if self.output_format == InfoFormat.pretty:
+            return Info.__write_pretty, lambda: None
+
+        if self.output_format == InfoFormat.csv:
+            writer = csv.writer(sys.stdout)
+            writer.writerow(Info.columns)
+
+            return lambda file_name, file_name_object: writer.writerow(Info.__to_row(file_name, file_name_object)), \
+                lambda: None
+
+        if self.output_format == InfoFormat.json:
+            # the array is written one element at a time so a large directory never sits in memory as one document
+            is_first = [True]
+
+            def write_json(file_name: str, file_name_object: FileName):
+                sys.stdout.write("[\n" if is_first[0] else ",\n")
+                sys.stdout.write(json.dumps(dict(zip(Info.columns, Info.__to_row(file_name, file_name_object)))))
+                is_first[0] = False
+
+            def finish_json():
+                sys.stdout.write("[]\n" if is_first[0] else "\n]\n")
+
+            return write_json, finish_json
+
+        Printer.console.file.flush()
+        sys.stdout.write(Info.__format_table_row(Info.columns))
+
+        def write_table(file_name: str, file_name_object: FileName):
+            pretty = file_name_object.to_pretty()
+            sys.stdout.write(Info.__format_table_row([
+                file_name,
+                pretty.initials,
+                pretty.date_time,
+                pretty.sequence,
+                pretty.style,
+                pretty.rating,
+                f"{pretty.original}{pretty.extension}"
+            ]))
+
+        return write_table, lambda: sys.stdout.write("\n")
+
+    def __skip(self, file_name: str, error_message: str):
+        console = Printer.error_console if self.machine_readable else Printer.console
+
+        console.print(f"{Printer.color_warning}❗ Skipping \[{file_name}] as it is malformed!")
+        console.print(f"{Printer.color_warning}{Printer.tab}❗ {error_message}")
+
+    def __print_skipped(self, num_files_skipped: int):
+        if not self.machine_readable:
+            Printer.print_files_skipped(num_files_skipped)
+            Printer.done()
+        elif num_files_skipped:
+            Printer.error_console.print(f"{Printer.color_warning}❗ Skipped {num_files_skipped} malformed file(s)!")
+
+    @staticmethod
+    def __to_row(file_name: str, file_name_object: FileName):
+        initials, _, sequence, style, rating, original = file_name_object.to_fields()
+
+        return [
+            file_name,
+            initials.upper(),
+            file_name_object.to_pretty().date_time,
+            sequence,
+            Style(style).name,
+            Rating(rating).name,
+            original
+        ]
+
+    @staticmethod
+    def __format_table_row(values: list):
+        return "  ".join(
+            str(value).ljust(width) if width else str(value)
+            for value, width in zip(values, Info.table_column_widths)
+        ) + "\n"
+
+    @staticmethod
+    def __print_histogram(category: str, histogram: collections.Counter):
+        Printer.console.print(f"\n{Printer.color_subtitle}{category.capitalize()}:")
+
+        if not histogram:
+            return
+
+        max_count = max(histogram.values())
+        value_width = max(len(value) for value in histogram)
 
-        Printer.done()
+        for value, count in sorted(histogram.items()):
+            bar = Info.summary_bar * max(1, round(count / max_count * Info.summary_bar_width))
+            Printer.print(
+                f"{value.ljust(value_width)}  {str(count).rjust(len(str(max_count)))}  {bar}",
+                prefix=Printer.tab
+            )
 
     @staticmethod
-    def __do_info_single_file(file_name: FileName):
-        pretty = file_name.to_pretty()
+    def __write_pretty(file_name: str, file_name_object: FileName):
+        Printer.waiting(f"Information for \[{file_name}]:")
+        pretty = file_name_object.to_pretty()
         Printer.print(f"Original filename: {pretty.original}", prefix=Printer.tab)
         Printer.print(f"Extension: {pretty.extension}", prefix=Printer.tab)
         Printer.print(f"Datetime: {pretty.date_time}", prefix=Printer.tab)
@@ -72,6 +271,7 @@ class Info:
         Printer.print(f"Media style: {pretty.style}", prefix=Printer.tab)
         Printer.print(f"Media rating: {pretty.rating}", prefix=Printer.tab)
         Printer.print(f"Initials: {pretty.initials}", prefix=Printer.tab)
+        Printer.print("")
 
     @staticmethod
     def start_message():
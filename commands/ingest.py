@@ -0,0 +1,226 @@
+import contextlib
+import os
+import typing
+
+from rich.progress import Progress
+
+from commands.exif import SidecarType
+from commands.process import Process
+from commands.texif import Preset, Texif
+from util.catalog import Catalog
+from util.config import Config
+from util.exiftool import ExifTool, ExifToolPool
+from util.helpers import Util, Printer
+from util.pipeline import Pipeline, Stage, ExifToolExecutor
+from util.writer import FileWriter
+
+
+class Ingest:
+    manifest_comment = "#"
+
+    def __init__(
+            self,
+            directories: typing.List[str],
+            output_directory: str,
+            keep_original: bool,
+            reprocess: bool,
+            preset: Preset,
+            filter_files: bool,
+            extensions: typing.List[str],
+            incremental: bool = False,
+            sidecars: typing.List[SidecarType] = None,
+            workers: int = None,
+            catalog: bool = False
+    ):
+        self.directories = [Util.strip_slashes(directory) for directory in directories]
+        self.output_directory = Util.strip_slashes(output_directory)
+        self.reprocess = reprocess
+        self.incremental = incremental
+        self.workers = workers or Config.pipeline_workers
+        self.use_catalog = catalog
+        self.step_count = 1
+        self.total_steps = 3 if not reprocess else 2
+        self.processes = [
+            Process(
+                directory=directory,
+                output_directory=source_output_directory,
+                keep_original=keep_original,
+                reprocess=reprocess,
+                preset=preset,
+                filter_files=filter_files,
+                extensions=extensions,
+                incremental=incremental,
+                sidecars=sidecars,
+                stream=True,
+                workers=workers
+            )
+            for directory, source_output_directory in zip(self.directories, self.__source_output_directories())
+        ]
+
+    def ingest(self):
+        Ingest.start_message()
+
+        if not self.reprocess:
+            Util.create_directory_or_abort(self.output_directory, self.directories[0], self.incremental)
+
+        with ExifTool() as exiftool, Catalog() if self.use_catalog else contextlib.nullcontext() as catalog:
+            # sources are prepared one at a time since filtering and preset selection may prompt
+            sources = []
+
+            for process in self.processes:
+                process.catalog = catalog
+                source = self.__prepare_source(exiftool, process)
+
+                if source:
+                    sources.append(source)
+
+            self.step_count += 1
+
+            if not sources:
+                Printer.error_and_abort("There are no valid files to process in any source!")
+
+            self.__do_ingest(exiftool, sources)
+
+        Printer.done_all()
+
+    def __prepare_source(self, exiftool: ExifTool, process: Process):
+        Printer.console.print(f"\n{Printer.color_title}📂 Preparing source \[{process.directory}]! 📂")
+
+        # the valid file name cache belongs to the previous source
+        Util.set_valid_file_names([])
+
+        process.total_steps = self.total_steps
+
+        # one empty card should not throw away the answers already given for the other sources
+        Util.verify_directory(process.directory)
+        if not Util.get_valid_file_names(exiftool, process.extensions, process.directory):
+            Printer.warning(
+                f"Skipping source \[{process.directory}] as it has no files with extension "
+                f"\[{Util.pretty_extension(process.extensions)}]!"
+            )
+            return None
+
+        file_names = process.verify_and_filter(
+            exiftool,
+            f"Skipping source \[{process.directory}] as there are no valid files to process!",
+            abort_if_empty=False
+        )
+
+        if not file_names:
+            return None
+
+        process.create_destinations()
+        process.prepare_stream(exiftool, file_names)
+
+        return process, file_names
+
+    def __do_ingest(self, exiftool: ExifTool, sources: list[tuple[Process, list[str]]]):
+        Printer.console.print(f"\n{Printer.color_title}🚚 Starting ingest! 🚚\n")
+
+        # sources on the same device are read one after another so their reads do not compete for one disk
+        devices: dict[int, list[tuple[Process, list[str]]]] = {}
+        for process, file_names in sources:
+            devices.setdefault(os.stat(process.directory).st_dev, []).append((process, file_names))
+
+        num_devices = len(devices)
+        num_files = sum(len(file_names) for _, file_names in sources)
+
+        Printer.waiting(f"Ingesting {num_files} file(s) from {len(sources)} source(s) on {num_devices} device(s)...")
+
+        def read_device(stage_exiftool: ExifTool, device_sources: list[tuple[Process, list[str]]], emit):
+            for process, file_names in device_sources:
+                def emit_from_source(file_name: str):
+                    emit((process, file_name))
+
+                if self.reprocess:
+                    for file_name in file_names:
+                        emit_from_source(file_name)
+                    continue
+
+                for siblings in Util.group_siblings(file_names).values():
+                    if process.rename_stream_capture(stage_exiftool, siblings, emit_from_source):
+                        num_files_skipped.append(len(siblings))
+
+        def sidecars(stage_exiftool: ExifTool, item: tuple[Process, str], _):
+            process, file_name = item
+            return process.sidecars_stream_single(stage_exiftool, file_name, file_writer)
+
+        num_files_skipped = []
+
+        # one pool serves both stages, sized so sidecar workers never wait on exiftools held by device readers
+        with ExifToolPool(size=self.workers + num_devices, exiftool=exiftool) as exiftool_pool:
+            read_stage = Stage(
+                "Read",
+                read_device,
+                executor=ExifToolExecutor(workers=num_devices, exiftool_pool=exiftool_pool),
+                label=Printer.progress_label_with_steps("Devices", self.step_count, self.total_steps),
+                total=num_devices
+            )
+            self.step_count += 1
+
+            sidecar_stage = Stage(
+                "Sidecars",
+                sidecars,
+                executor=ExifToolExecutor(workers=self.workers, exiftool_pool=exiftool_pool),
+                label=Printer.progress_label_with_steps("Sidecars", self.step_count, self.total_steps),
+                total=num_files
+            )
+
+            with Progress(console=Printer.console, auto_refresh=False) as progress, FileWriter() as file_writer:
+                Pipeline([read_stage, sidecar_stage]).run(devices.values(), progress)
+
+        Printer.waiting(f"Reading took {read_stage.elapsed:.2f}s, sidecars took {sidecar_stage.elapsed:.2f}s.")
+        Printer.print_files_up_to_date(sidecar_stage.num_up_to_date)
+        Printer.print_files_skipped(
+            sum(num_files_skipped)
+            + read_stage.num_skipped
+            + sidecar_stage.num_skipped
+            + Texif.report_failed_writes(file_writer)
+        )
+
+        Printer.done(prefix="\n", suffix=" ingest")
+
+    def __source_output_directories(self):
+        # each source gets its own folder under the output directory, named after the source
+        output_directories = []
+        used_names = set()
+
+        for directory in self.directories:
+            name = os.path.basename(os.path.abspath(directory))
+            unique_name = name
+            suffix = 2
+
+            while unique_name in used_names:
+                unique_name = f"{name}-{suffix}"
+                suffix += 1
+
+            used_names.add(unique_name)
+            output_directories.append(os.path.join(self.output_directory, unique_name))
+
+        return output_directories
+
+    @staticmethod
+    def read_manifest(manifest_path: str):
+        # one source directory per line, relative paths are resolved against the manifest's own directory
+        manifest_directory = os.path.dirname(manifest_path)
+        directories = []
+
+        try:
+            with open(manifest_path) as manifest_file:
+                for line in manifest_file:
+                    line = line.strip()
+
+                    if not line or line.startswith(Ingest.manifest_comment):
+                        continue
+
+                    directories.append(os.path.normpath(os.path.join(manifest_directory, line)))
+        except OSError:
+            Printer.error_and_abort(f"Could not read manifest \[{manifest_path}]!")
+
+        return directories
+
+    @staticmethod
+    def start_message():
+        Printer.divider()
+        Printer.console.print(f"{Printer.color_divider}🚚 Starting ingest! 🚚")
+        Printer.divider()
@@ -1,74 +1,77 @@
 import os.path
+import sys
+from typing import TextIO
 
+from commands.command import Command
 from entities.filter import Filter
-from util.exiftool import ExifTool
+from util.config import Config
 from util.helpers import Util, Printer
 
 
-class List:
+class List(Command):
+    output_file_name = "output.txt"
+
     def __init__(
             self,
             directory: str,
             output_directory: str,
             full_path: bool,
             filter_files: bool,
-            extension: str
+            extension: str,
+            sort: bool = True
     ):
-        self.directory = Util.strip_slashes(directory)
-        self.output_directory = None if not output_directory else Util.strip_slashes(output_directory)
+        super().__init__(directory, output_directory, filter_files, extension)
         self.full_path = full_path
-        self.filter_files = filter_files
-        self.extension = extension
-        self.step_count = 1
+        self.sort = sort
         self.total_steps = 1
 
     def ls(self):
+        # without an output directory only the names are printed so that the list can be piped
+        if not self.output_directory:
+            if not Util.is_directory_valid(self.directory):
+                Printer.error_and_abort(f"Directory \[{self.directory}] does not exist!")
+
+            self.__do_list(sys.stdout)
+            return
+
         List.start_message()
 
         Util.verify_directory(self.directory)
+        Util.create_directory_or_abort(self.output_directory, self.directory)
 
-        with ExifTool() as exiftool:
-            Util.verify_extensions_in_directory(exiftool, self.extension, self.directory)
-
-            if self.output_directory:
-                Util.create_directory_or_abort(self.output_directory, self.directory)
+        full_path_to = os.path.join(self.output_directory, List.output_file_name)
 
-            file_names = Util.get_valid_file_names(exiftool, self.extension, self.directory)
+        Printer.console.print(f"\n{Printer.color_title}📖 Starting list! 📖\n")
+        Printer.waiting(f"Writing list to \[{full_path_to}]...")
 
-            formatted_filter = Filter.build_filter(self.filter_files, self.total_steps)
-            filtered_file_names = formatted_filter.filter(file_names)
-            self.step_count += 1
+        with open(full_path_to, "w", buffering=Config.list_write_buffer_size) as output_file:
+            num_files, num_files_skipped = self.__do_list(output_file)
 
-            if not filtered_file_names:
-                Printer.error_and_abort("There are no valid files to list!")
+        if not num_files:
+            Printer.warning("There are no valid files to list!")
 
-        self.__do_list(filtered_file_names)
+        Printer.waiting(f"Listed {num_files} file(s).")
+        Printer.print_files_skipped(num_files_skipped, warning=True)
 
+        Printer.done()
         Printer.done_all()
 
-    def __do_list(self, file_names: list[str]):
-        if self.output_directory:
-            Printer.print("")
-
-        Printer.console.print(f"{Printer.color_title}📖 Starting list! 📖\n")
+    def __do_list(self, output_file: TextIO):
+        file_filter = Filter.build_filter(self.filter_files, self.total_steps)
 
-        if not self.output_directory:
-            for file_name in file_names:
-                file_name = self.__get_file_name(file_name)
+        # names flow from the directory listing through the filter into the writer without being collected
+        file_names = file_filter.filter_stream(Util.scan_file_names(self.directory, self.extension))
 
-                Printer.print(file_name)
-        else:
-            full_path_to = os.path.join(self.output_directory, "output.txt")
+        if self.sort:
+            file_names = Util.sort_bounded(file_names)
 
-            with open(full_path_to, "w") as output_file:
-                for file_name in file_names:
-                    file_name = self.__get_file_name(file_name)
+        num_files = 0
 
-                    Printer.waiting(f"Writing file \[{file_name}] to \[{full_path_to}]...")
-                    Util.write_with_newline(output_file, file_name)
+        for file_name in file_names:
+            Util.write_with_newline(output_file, self.__get_file_name(file_name))
+            num_files += 1
 
-        Printer.print("")
-        Printer.done()
+        return num_files, file_filter.num_skipped
 
     def __get_file_name(self, file_name):
         return os.path.join(self.directory, file_name) if self.full_path else file_name
@@ -0,0 +1,132 @@
+import glob
+import json
+import os
+
+from commands.process import Process
+from entities.shardmanifest import ShardManifest, ShardManifestError
+from util.helpers import Util, Printer
+
+
+class Merge:
+    def __init__(self, directory: str, check_outputs: bool = True):
+        self.directory = Util.strip_slashes(directory)
+        self.check_outputs = check_outputs
+        self.manifest_directory = Process.shard_manifest_directory(self.directory)
+
+    def merge(self):
+        Merge.start_message()
+
+        Util.verify_directory(self.directory)
+
+        manifests = self.__load_manifests()
+        shard_count = self.__validate_shards(manifests)
+
+        Printer.console.print(f"\n{Printer.color_title}🧩 Merging {len(manifests)} shard manifest(s)! 🧩\n")
+
+        files: dict[str, list[str]] = {}
+        conflicts = []
+
+        for manifest in manifests:
+            for file_name, output_paths in manifest.files.items():
+                if file_name in files:
+                    conflicts.append(file_name)
+                    continue
+
+                if ShardManifest.shard_of(file_name, shard_count) != manifest.shard_index:
+                    Printer.error_and_abort(
+                        f"File \[{file_name}] does not belong to shard {manifest.shard_index}/{shard_count}, "
+                        f"the shards were not partitioned the same way!"
+                    )
+
+                files[file_name] = output_paths
+
+        if conflicts:
+            Printer.error_and_abort(f"{len(conflicts)} file(s) appear in more than one shard, e.g. \[{conflicts[0]}]!")
+
+        num_missing_outputs = self.__count_missing_outputs(files) if self.check_outputs else 0
+
+        merged_path = os.path.join(self.manifest_directory, ShardManifest.merged_file_name)
+
+        with open(merged_path, "w") as merged_file:
+            json.dump(
+                {
+                    ShardManifest.json_key_version: ShardManifest.version,
+                    ShardManifest.json_key_shard_count: shard_count,
+                    ShardManifest.json_key_shards: [manifest.file_name for manifest in manifests],
+                    ShardManifest.json_key_extensions: manifests[0].extensions,
+                    ShardManifest.json_key_files: dict(sorted(files.items()))
+                },
+                merged_file,
+                indent=2
+            )
+
+        Printer.waiting(f"Merged {len(files)} file(s) from {shard_count} shard(s) into \[{merged_path}].")
+
+        if num_missing_outputs:
+            Printer.warning(f"{num_missing_outputs} expected output file(s) are missing!")
+
+        Printer.done()
+        Printer.done_all()
+
+    def __load_manifests(self):
+        manifest_paths = sorted(
+            path for path in glob.glob(os.path.join(glob.escape(self.manifest_directory), "shard-*-of-*.json"))
+            if ShardManifest.file_name_pattern.match(os.path.basename(path))
+        )
+
+        if not manifest_paths:
+            Printer.error_and_abort(f"There are no shard manifests in \[{self.manifest_directory}]!")
+
+        manifests = []
+
+        for manifest_path in manifest_paths:
+            Printer.waiting(f"Reading shard manifest \[{manifest_path}]...")
+
+            try:
+                manifests.append(ShardManifest.load(manifest_path))
+            except ShardManifestError as error:
+                Printer.error_and_abort(error.message)
+
+        return sorted(manifests, key=lambda manifest: manifest.shard_index)
+
+    @staticmethod
+    def __validate_shards(manifests: list[ShardManifest]):
+        shard_counts = {manifest.shard_count for manifest in manifests}
+
+        if len(shard_counts) > 1:
+            Printer.error_and_abort(f"Shard manifests disagree on the number of shards {sorted(shard_counts)}!")
+
+        shard_count = shard_counts.pop()
+        extensions = {tuple(manifest.extensions) for manifest in manifests}
+
+        if len(extensions) > 1:
+            Printer.error_and_abort(f"Shard manifests were processed with different extensions {sorted(extensions)}!")
+
+        shard_indices = [manifest.shard_index for manifest in manifests]
+        missing_shards = sorted(set(range(1, shard_count + 1)).difference(shard_indices))
+
+        if missing_shards:
+            Printer.error_and_abort(f"Shard(s) {missing_shards} of {shard_count} have not written a manifest yet!")
+
+        # hosts may mount the shared directory at different paths so this is only worth a warning
+        if len({manifest.directory for manifest in manifests}) > 1:
+            Printer.warning("Shard manifests were written from different source directory paths!")
+
+        return shard_count
+
+    def __count_missing_outputs(self, files: dict[str, list[str]]):
+        num_missing_outputs = 0
+
+        for file_name, output_paths in files.items():
+            for output_path in output_paths:
+                if not os.path.isfile(os.path.join(self.directory, output_path)):
+                    Printer.warning(f"Missing output \[{output_path}] for \[{file_name}]!", prefix=Printer.tab)
+                    num_missing_outputs += 1
+
+        return num_missing_outputs
+
+    @staticmethod
+    def start_message():
+        Printer.divider()
+        Printer.console.print(f"{Printer.color_divider}🧩 Starting merge! 🧩")
+        Printer.divider()
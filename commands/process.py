@@ -1,17 +1,26 @@
 import os.path
+import typing
 
-from commands.exif import Exif
+from rich.progress import Progress
+
+from commands.command import Command
+from commands.exif import Exif, SidecarType
 from commands.rename import Rename
 from commands.texif import Texif, Preset, TexifType, TexifLevel
-from entities.filter import Filter
-from util.exiftool import ExifTool
+from entities.shardmanifest import ShardManifest, ShardManifestError
+from util.config import Config
+from util.exiftool import ExifTool, ExifToolPool
 from util.helpers import Util, Printer
+from util.pipeline import Pipeline, Stage, StageStatus, SerialExecutor, ThreadExecutor, ExifToolExecutor
+from util.writer import FileWriter
 
 
-class Process:
+class Process(Command):
     meta_destination_name = "meta"
-
-    total_steps = 6
+    meta_simple_destination_name = "simple"
+    meta_full_destination_name = "full"
+    meta_mie_destination_name = "mie"
+    shard_manifest_destination_name = "shards"
 
     def __init__(
             self,
@@ -21,67 +30,189 @@ class Process:
             reprocess: bool,
             preset: Preset,
             filter_files: bool,
-            extension: str
+            extensions: typing.List[str],
+            incremental: bool = False,
+            batch: bool = False,
+            bundle: bool = False,
+            sidecars: typing.List[SidecarType] = None,
+            stream: bool = False,
+            workers: int = None,
+            shard: str = None,
+            catalog: bool = False
     ):
-        self.directory = Util.strip_slashes(directory)
-        self.output_directory = Util.strip_slashes(output_directory)
+        extensions = [extension.upper() for extension in extensions]
+        # only streaming keeps a warm exiftool per worker busy, the staged path would just start more of them
+        workers = workers or (Config.pipeline_workers if stream else 1)
+
+        # reprocessing works in place so there is no output directory to create
+        super().__init__(directory, None if reprocess else output_directory, filter_files, extensions, workers)
         self.keep_original = keep_original
         self.reprocess = reprocess
         self.preset = preset
-        self.filter_files = filter_files
-        self.extension = extension
-        self.step_count = 1
+        self.extensions = extensions
+        self.incremental = incremental
+        self.batch = batch
+        self.bundle = bundle
+        self.sidecars = [] if not sidecars else sidecars
+        self.stream = stream
+        self.shard = shard
+        self.use_catalog = catalog
+        # shards run on several hosts at once so existing meta folders must never be wiped
+        self.keep_directories = incremental or shard is not None
+        self.destinations: dict[str, tuple[str, str]] = {}
+        self.stream_texifs: dict[str, Texif] = {}
+        self.stream_exifs: dict[str, Exif] = {}
+        self.stream_rename: Rename = None
+        self.stream_exiftool_pool: ExifToolPool = None
+        self.total_steps = 3 + 3 * len(self.extensions) if not reprocess else 1 + 3 * len(self.extensions)
 
     def process(self):
         Process.start_message()
 
-        Util.verify_directory(self.directory)
+        shard_index, shard_count = self.__parse_shard() if self.shard else (None, None)
+
+        with ExifTool() as exiftool, self.open_catalog() as self.catalog:
+            filtered_file_names = self.verify_and_filter(exiftool, "There are no valid files to process!")
+
+            if self.shard:
+                filtered_file_names = self.__select_shard(filtered_file_names, shard_index, shard_count)
+
+            if filtered_file_names:
+                self.create_destinations()
+
+                if self.stream:
+                    self.stream_files(exiftool, filtered_file_names)
+                else:
+                    self.__process_stages(exiftool, filtered_file_names)
+
+        if self.shard:
+            self.__save_shard_manifest(filtered_file_names, shard_index, shard_count)
+
+        Printer.done_all()
+
+    def __process_stages(self, exiftool: ExifTool, filtered_file_names: list[str]):
+        destinations = self.destinations
 
-        with ExifTool() as exiftool:
-            Util.verify_extensions_in_directory(exiftool, self.extension, self.directory)
+        if not self.reprocess:
+            media_destinations = {
+                extension: media_destination for extension, (media_destination, _) in destinations.items()
+            }
+            filtered_file_names = self.__rename(exiftool, media_destinations, filtered_file_names)
 
-            if self.reprocess:
-                media_destination = self.directory
-                meta_destination = os.path.join(self.directory, Process.meta_destination_name)
+        for extension, (media_destination, meta_destination) in destinations.items():
+            extension_file_names = Util.filter_by_extension(filtered_file_names, extension)
+
+            if not extension_file_names:
+                Printer.warning(f"There are no files with extension \[{extension}] to process!")
+                self.step_count += 3
+                continue
+
+            if self.bundle:
+                self.__bundle(exiftool, extension, media_destination, meta_destination, extension_file_names)
             else:
-                Util.create_directory_or_abort(self.output_directory, self.directory)
+                self.__texif(exiftool, extension, media_destination, meta_destination, extension_file_names)
+                self.__exif(exiftool, extension, media_destination, meta_destination, extension_file_names)
+
+    def __parse_shard(self):
+        if not self.reprocess:
+            Printer.error_and_abort(
+                "Sharding is only supported with \[--reprocess] since rename sequence numbers depend on "
+                "neighbouring captures!"
+            )
+
+        try:
+            return ShardManifest.parse_shard(self.shard)
+        except ShardManifestError as error:
+            Printer.error_and_abort(error.message)
+
+    def __select_shard(self, file_names: list[str], shard_index: int, shard_count: int):
+        shard_file_names = [
+            file_name for file_name in file_names
+            if ShardManifest.shard_of(str(file_name), shard_count) == shard_index
+        ]
+
+        Printer.waiting(
+            f"Shard {shard_index}/{shard_count} has {len(shard_file_names)} of {len(file_names)} file(s)..."
+        )
 
-                media_destination = os.path.join(self.output_directory, self.extension.lower())
-                meta_destination = os.path.join(media_destination, Process.meta_destination_name)
+        return shard_file_names
 
-                Util.create_directory_or_abort(media_destination, self.directory)
+    def __save_shard_manifest(self, file_names: list[str], shard_index: int, shard_count: int):
+        manifest = ShardManifest(
+            shard_index,
+            shard_count,
+            os.path.abspath(self.directory),
+            self.extensions,
+            {str(file_name): self.output_paths(str(file_name)) for file_name in file_names}
+        )
 
-            file_names = Util.get_valid_file_names(exiftool, self.extension, self.directory)
+        manifest_path = manifest.save(self.shard_manifest_directory(self.directory))
+        Printer.waiting(f"Wrote shard manifest to \[{manifest_path}].")
 
-            formatted_filter = Filter.build_filter(self.filter_files, self.total_steps)
-            filtered_file_names = formatted_filter.filter(file_names)
-            self.step_count += 1
+    def output_paths(self, file_name: str):
+        # paths are relative to the source directory so that hosts mounting it elsewhere still agree
+        extension = Util.split_extension(file_name)[1].upper()
+        _, meta_destination = self.destinations.get(extension, self.__get_destinations(extension))
 
-            if not filtered_file_names:
-                Printer.error_and_abort("There are no valid files to process!")
+        output_paths = [
+            Util.output_path(Process.__meta_simple_destination(meta_destination), file_name, "txt"),
+            Util.output_path(Process.__meta_full_destination(meta_destination), file_name, "html"),
+            Util.output_path(
+                os.path.join(meta_destination, Process.meta_mie_destination_name),
+                file_name,
+                Exif.mie_extension
+            )
+        ]
 
-            if not self.reprocess:
-                self.__rename(exiftool, media_destination, filtered_file_names)
+        for sidecar in self.sidecars:
+            output_paths.append(
+                Util.output_path(os.path.join(meta_destination, sidecar.value), file_name, sidecar.value)
+            )
 
-            self.__texif(exiftool, media_destination, meta_destination, filtered_file_names)
-            self.__exif(exiftool, media_destination, meta_destination, filtered_file_names)
+        return [os.path.relpath(output_path, self.directory) for output_path in output_paths]
 
-        Printer.done_all()
+    @staticmethod
+    def shard_manifest_directory(directory: str):
+        return os.path.join(directory, Process.meta_destination_name, Process.shard_manifest_destination_name)
 
-    def __rename(self, exiftool: ExifTool, media_destination: str, file_names: list[str]):
+    def create_destinations(self):
+        self.destinations = {extension: self.__get_destinations(extension) for extension in self.extensions}
+
+        if not self.reprocess:
+            for media_destination, _ in self.destinations.values():
+                Util.create_directory_or_abort(media_destination, self.directory, self.keep_directories)
+
+        return self.destinations
+
+    def __get_destinations(self, extension: str):
+        if self.reprocess:
+            media_destination = self.directory
+            meta_destination = os.path.join(self.directory, Process.meta_destination_name)
+
+            if len(self.extensions) > 1:
+                meta_destination = os.path.join(meta_destination, extension.lower())
+        else:
+            media_destination = os.path.join(self.output_directory, extension.lower())
+            meta_destination = os.path.join(media_destination, Process.meta_destination_name)
+
+        return media_destination, meta_destination
+
+    def __rename(self, exiftool: ExifTool, media_destinations: dict[str, str], file_names: list[str]):
         Rename.start_message()
 
         rename = Rename(
             directory=self.directory,
-            output_directory=media_destination,
+            output_directory=self.output_directory,
             keep_original=self.keep_original,
             edit_types=[],
             filter_files=False,
-            extension=self.extension
+            extensions=self.extensions
         )
 
+        rename.output_directories = media_destinations
+        rename.catalog = self.catalog
         rename.step_count = self.step_count
-        rename.total_steps = Process.total_steps
+        rename.total_steps = self.total_steps
 
         if self.keep_original:
             rename.do_rename(exiftool, file_names, Rename.do_rename_copy)
@@ -91,14 +222,251 @@ class Process:
         self.step_count += 2
         Printer.done(prefix="\n", suffix=" rename")
 
-    def __texif(self, exiftool: ExifTool, media_destination: str, meta_destination: str, file_names: list[str]):
+        return rename.renamed_file_names
+
+    def __texif(
+            self,
+            exiftool: ExifTool,
+            extension: str,
+            media_destination: str,
+            meta_destination: str,
+            file_names: list[str]
+    ):
         Texif.start_message()
 
-        meta_simple_destination = os.path.join(meta_destination, "simple")
-        meta_full_destination = os.path.join(meta_destination, "full")
+        texif = self.__build_texif(extension, media_destination, meta_destination)
+        texif.step_count = self.step_count
+        texif.total_steps = self.total_steps
+
+        texif.do_texif_simple(exiftool, file_names, Process.__meta_simple_destination(meta_destination))
+
+        self.step_count += 1
+        texif.step_count = self.step_count
+        texif.do_texif_full(exiftool, file_names, Process.__meta_full_destination(meta_destination))
+
+        self.step_count += 1
+        Printer.done(prefix="\n", suffix=" TEXIF")
+
+    def __exif(
+            self,
+            exiftool: ExifTool,
+            extension: str,
+            media_destination: str,
+            meta_destination: str,
+            file_names: list[str]
+    ):
+        Exif.start_message()
+
+        exif = self.__build_exif(extension, media_destination, meta_destination)
+
+        exif.step_count = self.step_count
+        exif.total_steps = self.total_steps
+
+        exif.do_exif(exiftool, file_names)
+
+        self.step_count += 1
+
+        Printer.done(prefix="\n", suffix=" EXIF")
+
+    def __bundle(
+            self,
+            exiftool: ExifTool,
+            extension: str,
+            media_destination: str,
+            meta_destination: str,
+            file_names: list[str]
+    ):
+        Printer.console.print(f"\n{Printer.color_title}📦 Starting sidecar bundle! 📦\n")
+
+        texif = self.__build_texif(extension, media_destination, meta_destination)
+        exif = self.__build_exif(extension, media_destination, meta_destination)
+
+        texif.prepare_simple(exiftool, file_names)
+        texif.stamp_simple_settings(Process.__meta_simple_destination(meta_destination))
+
+        def bundle_stage(stage_exiftool: ExifTool, file_name: str, _):
+            return Process.__sidecars_single(
+                stage_exiftool,
+                texif,
+                exif,
+                meta_destination,
+                file_name,
+                file_writer
+            )
+
+        stage = Stage(
+            "Sidecar bundle",
+            bundle_stage,
+            executor=self.build_executor(exiftool),
+            label=self.progress_label("Sidecar bundle"),
+            total=len(file_names)
+        )
+
+        with FileWriter() as file_writer:
+            stage.run(file_names, report=False)
+
+        stage.counts[StageStatus.failed] += Texif.report_failed_writes(file_writer)
+        stage.report()
+
+        self.step_count += 3
+        Printer.done(prefix="\n", suffix=" sidecar bundle")
+
+    def stream_files(self, exiftool: ExifTool, file_names: list[str]):
+        Printer.console.print(f"\n{Printer.color_title}🌊 Starting streaming process! 🌊\n")
+
+        self.prepare_stream(exiftool, file_names)
+
+        def rename_stage(stage_exiftool: ExifTool, siblings: list[str], emit):
+            return self.rename_stream_capture(stage_exiftool, siblings, emit)
+
+        def sidecar_stage(stage_exiftool: ExifTool, file_name: str, _):
+            return self.sidecars_stream_single(stage_exiftool, file_name, file_writer)
+
+        stages = []
+
+        if self.reprocess:
+            items = file_names
+        else:
+            items = Util.group_siblings(file_names).values()
+
+            # renaming stays serial as each sequence number depends on the previous capture
+            stages.append(
+                Stage(
+                    "Rename",
+                    rename_stage,
+                    executor=SerialExecutor(exiftool),
+                    label=self.progress_label("Rename"),
+                    total=len(items)
+                )
+            )
+            self.step_count += 2
+
+        stages.append(
+            Stage(
+                "Sidecars",
+                sidecar_stage,
+                executor=self.__build_stream_executor(),
+                label=self.progress_label("Sidecars"),
+                total=len(file_names)
+            )
+        )
+
+        with Progress(console=Printer.console, auto_refresh=False) as progress, FileWriter() as file_writer:
+            Pipeline(stages).run(items, progress)
+
+        num_files_skipped = Texif.report_failed_writes(file_writer)
+
+        for stage in stages:
+            num_files_skipped += stage.num_skipped
+            Printer.print_files_up_to_date(stage.num_up_to_date)
+
+        Printer.print_files_skipped(num_files_skipped)
+
+        self.step_count = self.total_steps
+        Printer.done(prefix="\n", suffix=" streaming process")
+
+    def prepare_stream(self, exiftool: ExifTool, file_names: list[str]):
+        # texifs, exifs and the rename sequence are kept between calls so that repeated batches continue where
+        # the previous one stopped
+        for extension, (media_destination, meta_destination) in self.destinations.items():
+            extension_file_names = Util.filter_by_extension(file_names, extension)
+
+            if not extension_file_names or extension in self.stream_texifs:
+                continue
+
+            self.stream_texifs[extension] = self.__build_texif(extension, media_destination, meta_destination)
+            self.stream_exifs[extension] = self.__build_exif(extension, media_destination, meta_destination)
+
+            # the preset is selected from the source file since renamed files do not exist yet
+            self.stream_texifs[extension].prepare_simple(exiftool, extension_file_names, self.directory)
+            self.stream_texifs[extension].stamp_simple_settings(Process.__meta_simple_destination(meta_destination))
+
+        if not self.reprocess and not self.stream_rename:
+            self.stream_rename = Rename(
+                directory=self.directory,
+                output_directory=self.output_directory,
+                keep_original=self.keep_original,
+                edit_types=[],
+                filter_files=False,
+                extensions=self.extensions
+            )
+            self.stream_rename.output_directories = {
+                extension: media_destination for extension, (media_destination, _) in self.destinations.items()
+            }
+            self.stream_rename.catalog = self.catalog
+            self.stream_rename.reset_sequence()
+
+    def rename_stream_capture(self, exiftool: ExifTool, siblings: list[str], emit):
+        file_modification_closure = Rename.do_rename_copy if self.keep_original else Rename.do_rename_move
+        renamed_siblings = self.stream_rename.rename_capture(exiftool, siblings, file_modification_closure)
+
+        if renamed_siblings is None:
+            return StageStatus.skipped
+
+        for renamed_sibling in renamed_siblings:
+            emit(renamed_sibling)
+
+    def sidecars_stream_single(self, exiftool: ExifTool, file_name: str, file_writer: FileWriter):
+        extension = Util.split_extension(file_name)[1].upper()
+        _, meta_destination = self.destinations[extension]
+
+        return Process.__sidecars_single(
+            exiftool,
+            self.stream_texifs[extension],
+            self.stream_exifs[extension],
+            meta_destination,
+            file_name,
+            file_writer
+        )
 
-        Util.create_directory_or_abort(meta_simple_destination, self.directory)
-        Util.create_directory_or_abort(meta_full_destination, self.directory)
+    def __build_stream_executor(self):
+        if self.stream_exiftool_pool:
+            return ExifToolExecutor(workers=self.workers, exiftool_pool=self.stream_exiftool_pool)
+        return ThreadExecutor(self.workers, ExifTool)
+
+    @staticmethod
+    def __sidecars_single(
+            exiftool: ExifTool,
+            texif: Texif,
+            exif: Exif,
+            meta_destination: str,
+            file_name: str,
+            file_writer: FileWriter
+    ):
+        # every sidecar is generated back to back so the source is still in the page cache
+        file_path = os.path.join(texif.directory, file_name)
+        simple_path_to = Util.output_path(Process.__meta_simple_destination(meta_destination), file_name, "txt")
+        full_path_to = Util.output_path(Process.__meta_full_destination(meta_destination), file_name, "html")
+
+        simple_up_to_date = texif.is_simple_up_to_date(file_path, simple_path_to)
+        full_up_to_date = texif.incremental and Util.is_output_up_to_date(file_path, full_path_to)
+        exif_up_to_date = exif.incremental and exif.is_up_to_date(file_name)
+
+        if simple_up_to_date and full_up_to_date and exif_up_to_date:
+            return StageStatus.up_to_date
+
+        success = True
+
+        if not simple_up_to_date:
+            success = texif.texif_simple_single(exiftool, file_path, simple_path_to, file_writer) and success
+        if not full_up_to_date:
+            success = texif.texif_full_single(exiftool, file_path, full_path_to) and success
+        if not exif_up_to_date:
+            success = exif.exif_single(exiftool, file_name) and success
+
+        return StageStatus.processed if success else StageStatus.skipped
+
+    def __build_texif(self, extension: str, media_destination: str, meta_destination: str):
+        Util.create_directory_or_abort(
+            Process.__meta_simple_destination(meta_destination),
+            self.directory,
+            self.keep_directories
+        )
+        Util.create_directory_or_abort(
+            Process.__meta_full_destination(meta_destination),
+            self.directory,
+            self.keep_directories
+        )
 
         texif = Texif(
             directory=media_destination,
@@ -107,41 +475,46 @@ class Process:
             level=TexifLevel.high,
             preset=self.preset,
             filter_files=False,
-            extension=self.extension
+            extension=extension,
+            incremental=self.incremental,
+            batch=self.batch,
+            workers=self.workers
         )
+        texif.catalog = self.catalog
 
-        texif.step_count = self.step_count
-        texif.total_steps = Process.total_steps
+        return texif
 
-        texif.do_texif_simple(exiftool, file_names, meta_simple_destination)
+    def __build_exif(self, extension: str, media_destination: str, meta_destination: str):
+        meta_mie_destination = os.path.join(meta_destination, Process.meta_mie_destination_name)
 
-        self.step_count += 1
-        texif.step_count = self.step_count
-        texif.do_texif_full(exiftool, file_names, meta_full_destination)
-
-        self.step_count += 1
-        Printer.done(prefix="\n", suffix=" TEXIF")
-
-    def __exif(self, exiftool: ExifTool, media_destination: str, meta_destination: str, file_names: list[str]):
-        Exif.start_message()
-
-        meta_mie_destination = os.path.join(meta_destination, "mie")
-
-        Util.create_directory_or_abort(meta_mie_destination, self.directory)
+        Util.create_directory_or_abort(meta_mie_destination, self.directory, self.keep_directories)
 
         exif = Exif(
             directory=media_destination,
             output_directory=meta_mie_destination,
             filter_files=False,
-            extension=self.extension
+            extension=extension,
+            incremental=self.incremental,
+            batch=self.batch,
+            sidecars=self.sidecars,
+            workers=self.workers
         )
+        exif.catalog = self.catalog
 
-        exif.step_count = self.step_count
-        exif.total_steps = Process.total_steps
+        for sidecar in exif.sidecars:
+            meta_sidecar_destination = os.path.join(meta_destination, sidecar.value)
+            Util.create_directory_or_abort(meta_sidecar_destination, self.directory, self.keep_directories)
+            exif.sidecar_directories[sidecar] = meta_sidecar_destination
 
-        exif.do_exif(exiftool, file_names)
+        return exif
 
-        Printer.done(prefix="\n", suffix=" EXIF")
+    @staticmethod
+    def __meta_simple_destination(meta_destination: str):
+        return os.path.join(meta_destination, Process.meta_simple_destination_name)
+
+    @staticmethod
+    def __meta_full_destination(meta_destination: str):
+        return os.path.join(meta_destination, Process.meta_full_destination_name)
 
     @staticmethod
     def start_message():
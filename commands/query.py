@@ -0,0 +1,143 @@
+import csv
+import json
+import sys
+import typing
+from enum import Enum
+
+from entities.rating import Rating
+from entities.style import Style
+from util.catalog import Catalog
+from util.config import Config
+from util.helpers import Printer
+
+
+class QueryFormat(str, Enum):
+    paths = "paths"
+    csv = "csv"
+    json = "json"
+
+
+class Query:
+    tag_separator = "="
+
+    def __init__(
+            self,
+            initials: str = None,
+            styles: typing.List[str] = None,
+            ratings: typing.List[str] = None,
+            min_rating: str = None,
+            year: int = None,
+            after: str = None,
+            before: str = None,
+            extension: str = None,
+            tags: typing.List[str] = None,
+            output_format: QueryFormat = QueryFormat.paths,
+            limit: int = None,
+            catalog_path: str = Config.catalog_path
+    ):
+        self.initials = initials
+        self.styles = [Query.__parse_name(Style, style) for style in styles or []]
+        self.ratings = [Query.__parse_name(Rating, rating) for rating in ratings or []]
+        self.min_rating = None if not min_rating else Query.__parse_name(Rating, min_rating)
+        # date times sort as text, so a bare year or date bounds them without parsing
+        self.after = after if not year else max(after or "", str(year))
+        self.before = before if not year else min(before or str(year + 1), str(year + 1))
+        self.extension = extension
+        self.tags = [] if not tags else tags
+        self.output_format = output_format
+        self.limit = limit
+        self.catalog_path = catalog_path
+
+    def query(self):
+        where, parameters = self.__build_where()
+
+        # results go to stdout alone so they can be piped, everything else goes to stderr
+        num_files = 0
+
+        with Catalog(self.catalog_path, read_only=True) as catalog:
+            write_row, finish = Query.build_writer(self.output_format)
+
+            for row in catalog.query(where, parameters, self.limit):
+                write_row(row)
+                num_files += 1
+
+            finish()
+
+        Printer.error_console.print(f"{Printer.color_waiting}Found {num_files} file(s) in \[{self.catalog_path}].")
+
+    def __build_where(self):
+        where = []
+        parameters = []
+
+        if self.initials:
+            where.append("initials = ?")
+            parameters.append(self.initials.upper())
+
+        if self.styles:
+            where.append(f"style IN ({', '.join('?' for _ in self.styles)})")
+            parameters.extend(style.name for style in self.styles)
+
+        if self.ratings:
+            where.append(f"rating IN ({', '.join('?' for _ in self.ratings)})")
+            parameters.extend(rating.value for rating in self.ratings)
+
+        if self.min_rating is not None:
+            where.append("rating >= ?")
+            parameters.append(self.min_rating.value)
+
+        if self.after:
+            where.append("date_time >= ?")
+            parameters.append(self.after)
+
+        if self.before:
+            where.append("date_time < ?")
+            parameters.append(self.before)
+
+        if self.extension:
+            where.append("extension = ?")
+            parameters.append(self.extension.upper())
+
+        for tag in self.tags:
+            name, separator, value = tag.partition(Query.tag_separator)
+
+            if not separator:
+                Printer.error_and_abort(f"Tag filter \[{tag}] is not in format [Tag{Query.tag_separator}Value]!")
+
+            where.append("path IN (SELECT path FROM tags WHERE tag = ? AND value = ?)")
+            parameters.extend((name, value))
+
+        return where, parameters
+
+    @staticmethod
+    def __parse_name(enum: typing.Type[typing.Union[Style, Rating]], name: str):
+        try:
+            return enum[name.lower()]
+        except KeyError:
+            Printer.error_and_abort(
+                f"{enum.__name__} \[{name}] is not one of \[{', '.join(member.name for member in enum)}]!"
+            )
+
+    @staticmethod
+    def build_writer(output_format: QueryFormat):
+        columns = Catalog.file_columns[:-1]
+
+        if output_format == QueryFormat.csv:
+            writer = csv.writer(sys.stdout)
+            writer.writerow(columns)
+
+            return writer.writerow, lambda: None
+
+        if output_format == QueryFormat.json:
+            is_first = [True]
+
+            def write_json(row: tuple):
+                sys.stdout.write("[\n" if is_first[0] else ",\n")
+                sys.stdout.write(json.dumps(dict(zip(columns, row))))
+                is_first[0] = False
+
+            def finish_json():
+                sys.stdout.write("[]\n" if is_first[0] else "\n]\n")
+
+            return write_json, finish_json
+
+        return lambda row: sys.stdout.write(f"{row[0]}\n"), lambda: None
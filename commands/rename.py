@@ -4,17 +4,21 @@ import typing
 
 from rich.progress import Progress
 
+from commands.command import Command
 from entities.checker import InitialsChecker, DateTimeChecker, SequenceChecker, StyleChecker, RatingChecker, \
     OriginalChecker
 from entities.filename import FileName, FileNameTypeError, FileNameChunk
 from entities.filter import Filter, FilterType
 from util.config import Config
 from util.constants import Tags
+from util.contentindex import ContentIndex
 from util.exiftool import ExifTool
 from util.helpers import Util, Printer
+from util.pipeline import Stage, StageStatus, SerialExecutor
+from util.transfer import Transfer
 
 
-class Rename:
+class Rename(Command):
     edit_types: list[FileNameChunk] = [edit_type for edit_type in FileNameChunk]
     __edit_type_map = None
     edit_type_default_map = {
@@ -33,28 +37,30 @@ class Rename:
             keep_original: bool,
             edit_types: typing.List[FileNameChunk],
             filter_files: bool,
-            extension: str
+            extensions: typing.List[str],
+            skip_duplicates: bool = False,
+            catalog: bool = False
     ):
-        self.directory = Util.strip_slashes(directory)
-        self.output_directory = Util.strip_slashes(output_directory)
+        super().__init__(directory, output_directory, filter_files, extensions)
+        self.output_directories: dict[str, str] = {}
         self.keep_original = keep_original
         self.edit_types = edit_types
-        self.filter_files = filter_files
-        self.extension = extension
-        self.step_count = 1
-        self.total_steps = 2
+        self.extensions = extensions
+        self.renamed_file_names: list[str] = []
+        self.previous_date_time = ""
+        self.sequence_number = 0
+        # renaming in place has no separate library to compare against, and editing names never copies new content
+        self.skip_duplicates = skip_duplicates and not edit_types and \
+            Util.strip_slashes(output_directory) != Util.strip_slashes(directory)
+        self.incremental = self.skip_duplicates
+        self.content_index: typing.Optional[ContentIndex] = None
+        self.num_files_duplicate = 0
+        self.use_catalog = catalog
 
     def rename(self):
         Rename.start_message()
 
-        Util.verify_directory(self.directory)
-
-        with ExifTool() as exiftool:
-            Util.verify_extensions_in_directory(exiftool, self.extension, self.directory)
-
-            Util.create_directory_or_abort(self.output_directory, self.directory)
-
-            file_names = Util.get_valid_file_names(exiftool, self.extension, self.directory)
+        with ExifTool() as exiftool, self.open_catalog() as self.catalog:
             filter_type = FilterType.UnformattedFilter if not self.edit_types else FilterType.FormattedFilter
 
             file_filter = Filter.build_filter_by_type(filter_type)
@@ -63,11 +69,14 @@ class Rename:
             if filter_type == FilterType.FormattedFilter and self.filter_files:
                 file_filter.prompt_build_checkers()
 
-            filtered_file_names = file_filter.filter(file_names)
-            self.step_count += 1
+            filtered_file_names = self.verify_and_filter(
+                exiftool,
+                "There are no valid files to rename!",
+                file_filter
+            )
 
-            if not filtered_file_names:
-                Printer.error_and_abort("There are no valid files to rename!")
+            if self.skip_duplicates:
+                self.content_index = ContentIndex.open(self.output_directory)
 
             if self.keep_original:
                 self.do_rename(exiftool, filtered_file_names, Rename.do_rename_copy)
@@ -161,103 +170,174 @@ class Rename:
                 new_file_name = str(file_name)
                 new_file_names.append(new_file_name)
 
-                full_path_to = os.path.join(self.output_directory, new_file_name)
+                full_path_to = os.path.join(self.__get_output_directory(new_file_name), new_file_name)
                 file_modification_closure(file_path, full_path_to)
+                self.__record_file(file_path, full_path_to)
 
                 files_processed += 1
 
             progress.update(progress_task, completed=num_files)
 
-        num_files_in_directory = Util.num_files_in_directory(self.output_directory)
-
-        num_files_skipped = max(
-            num_files - num_files_in_directory,
-            num_files - files_processed
-        )
-        Printer.print_files_skipped(num_files_skipped)
+        Printer.print_files_skipped(num_files - files_processed)
 
         Printer.done()
 
+        self.renamed_file_names = new_file_names
         Util.set_valid_file_names(new_file_names)
 
     def __do_rename(self, exiftool: ExifTool, file_modification_closure, file_names: list[str]):
-        new_file_names = []
-
-        num_files = len(file_names)
+        captures = Util.group_siblings(file_names)
 
         Printer.console.print(f"{Printer.color_title}✍️  Starting rename! ✍️\n")
 
-        with Progress(console=Printer.console, auto_refresh=False) as progress:
-            progress_task = progress.add_task(
-                Printer.progress_label_with_steps(
-                    "Rename",
-                    self.step_count,
-                    self.total_steps
-                ),
-                total=num_files
-            )
+        self.reset_sequence()
 
-            previous_date_time = ""
-            sequence_number = 0
-            num_files_skipped = 0
+        def rename_stage(stage_exiftool: ExifTool, siblings: list[str], emit):
+            renamed_siblings = self.rename_capture(stage_exiftool, siblings, file_modification_closure)
 
-            for count, file_name in enumerate(file_names):
-                progress.update(progress_task, completed=count)
-                progress.refresh()
+            if renamed_siblings is None:
+                return StageStatus.skipped
 
-                file_path = os.path.join(self.directory, file_name)
+            for renamed_sibling in renamed_siblings:
+                emit(renamed_sibling)
 
-                Printer.waiting(f"Renaming \[{file_path}]...")
-                Printer.waiting(f"Generating formatted datetime for \[{file_path}]...", prefix=Printer.tab)
+        new_file_names = Stage(
+            "Rename",
+            rename_stage,
+            executor=SerialExecutor(exiftool),
+            label=self.progress_label("Rename"),
+            total=len(captures)
+        ).run(captures.values(), report=False)
 
-                file_tags = Util.deserialize_data(
-                    exiftool.execute_with_extension(
-                        self.extension,
-                        f"-{Tags.JSONFormat}",
-                        f"-{Tags.DateTimeOriginal}",
-                        "-d",
-                        Config.file_name_date_format,
-                        file_path
-                    )
-                )
+        # a skipped capture skips all of its siblings
+        num_files_skipped = len(file_names) - len(new_file_names) - self.num_files_duplicate
 
-                if not file_tags:
-                    Printer.warning(f"Skipping \[{file_path}] due to error!", prefix=Printer.tab)
-                    num_files_skipped += 1
-                    continue
+        if self.content_index:
+            self.content_index.save()
 
-                try:
-                    formatted_date_time = file_tags[0][Tags.DateTimeOriginal]
-                    FileName.validate_date_time(formatted_date_time)
-                except (KeyError, FileNameTypeError):
-                    formatted_date_time = Config.file_name_date_default
+        Printer.print_files_duplicate(self.num_files_duplicate)
 
-                if formatted_date_time == previous_date_time:
-                    sequence_number += 1
-                else:
-                    previous_date_time = formatted_date_time
-                    sequence_number = 0
-
-                full_filename = str(
-                    FileName(
-                        date_time=formatted_date_time,
-                        sequence=sequence_number,
-                        original=file_name
-                    )
+        Printer.print_files_skipped(num_files_skipped)
+
+        Printer.done()
+
+        self.renamed_file_names = new_file_names
+        Util.set_valid_file_names(new_file_names)
+
+    def reset_sequence(self):
+        self.previous_date_time = ""
+        self.sequence_number = 0
+
+    def rename_capture(self, exiftool: ExifTool, siblings: list[str], file_modification_closure):
+        # captures must be renamed in sorted order since sequence numbers depend on the previous capture
+        metadata_file_name = Util.select_sibling(siblings)
+        metadata_file_path = os.path.join(self.directory, metadata_file_name)
+
+        Printer.waiting(f"Renaming \[{metadata_file_path}]...")
+        if len(siblings) > 1:
+            Printer.waiting(f"Sharing metadata with sibling(s) {siblings}...", prefix=Printer.tab)
+        Printer.waiting(f"Generating formatted datetime for \[{metadata_file_path}]...", prefix=Printer.tab)
+
+        file_tags = Util.deserialize_data(
+            exiftool.execute_with_extension(
+                self.extensions,
+                f"-{Tags.JSONFormat}",
+                f"-{Tags.DateTimeOriginal}",
+                "-d",
+                Config.file_name_date_format,
+                metadata_file_path
+            )
+        )
+
+        if not file_tags:
+            Printer.warning(f"Skipping {siblings} due to error!", prefix=Printer.tab)
+            return None
+
+        try:
+            formatted_date_time = file_tags[0][Tags.DateTimeOriginal]
+            FileName.validate_date_time(formatted_date_time)
+        except (KeyError, FileNameTypeError):
+            formatted_date_time = Config.file_name_date_default
+
+        if formatted_date_time == self.previous_date_time:
+            self.sequence_number += 1
+        else:
+            self.previous_date_time = formatted_date_time
+            self.sequence_number = 0
+
+        renamed_siblings = []
+
+        for file_name in siblings:
+            file_path = os.path.join(self.directory, file_name)
+            full_filename = str(
+                FileName(
+                    date_time=formatted_date_time,
+                    sequence=self.sequence_number,
+                    original=file_name
                 )
+            )
+            full_path_to = os.path.join(self.__get_output_directory(full_filename), full_filename)
 
-                new_file_names.append(full_filename)
+            # siblings that were already renamed are still returned, so later stages and the catalog know about them
+            try:
+                if not self.__is_free(file_path, full_path_to):
+                    continue
 
-                full_path_to = os.path.join(self.output_directory, full_filename)
                 file_modification_closure(file_path, full_path_to)
+            except OSError as error:
+                Printer.warning(
+                    f"Skipping \[{file_path}] since it could not be renamed ({error.strerror})!",
+                    prefix=Printer.tab
+                )
+                continue
 
-            progress.update(progress_task, completed=num_files)
+            renamed_siblings.append(full_filename)
+            self.__record_file(file_path, full_path_to)
 
-        Printer.print_files_skipped(num_files_skipped)
+            if self.content_index:
+                self.content_index.add(full_filename)
 
-        Printer.done()
+        return renamed_siblings
 
-        Util.set_valid_file_names(new_file_names)
+    def __is_free(self, file_path: str, full_path_to: str):
+        duplicate_file_name = self.content_index.find_duplicate(file_path) if self.content_index else None
+
+        # the sequence number was still taken so that later captures are named as they were the first time
+        if duplicate_file_name:
+            Printer.warning(
+                f"Skipping \[{file_path}] as its content is already in \[{duplicate_file_name}]!",
+                prefix=Printer.tab
+            )
+            self.num_files_duplicate += 1
+            return False
+
+        # a kept destination may hold another capture under the same name, for example once the default date time
+        # and rolled over original names meet again, and that capture is never overwritten
+        if not os.path.exists(full_path_to) or os.path.samefile(file_path, full_path_to):
+            return True
+
+        if Transfer.same_content(file_path, full_path_to):
+            Printer.warning(
+                f"Skipping \[{file_path}] as its content is already in \[{full_path_to}]!",
+                prefix=Printer.tab
+            )
+            self.num_files_duplicate += 1
+        else:
+            Printer.warning(
+                f"Skipping \[{file_path}] as \[{full_path_to}] already exists with different content!",
+                prefix=Printer.tab
+            )
+
+        return False
+
+    def __record_file(self, file_path: str, full_path_to: str):
+        # a moved file takes its catalog row along, a copy gets a row of its own
+        if self.catalog:
+            self.catalog.record_file(full_path_to, file_path)
+
+    def __get_output_directory(self, file_name: str):
+        extension = Util.split_extension(file_name)[1].upper()
+        return self.output_directories.get(extension, self.output_directory)
 
     @staticmethod
     def edit_type_map():
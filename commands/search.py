@@ -0,0 +1,40 @@
+import sqlite3
+
+from commands.query import Query, QueryFormat
+from util.catalog import Catalog
+from util.config import Config
+from util.helpers import Printer
+
+
+class Search:
+    def __init__(
+            self,
+            terms: list[str],
+            output_format: QueryFormat = QueryFormat.paths,
+            limit: int = None,
+            catalog_path: str = Config.catalog_path
+    ):
+        # terms are joined into one FTS5 query, so quoted phrases, AND, OR, NOT and prefix* all work
+        self.match = " ".join(terms)
+        self.output_format = output_format
+        self.limit = limit
+        self.catalog_path = catalog_path
+
+    def search(self):
+        num_files = 0
+
+        with Catalog(self.catalog_path, read_only=True) as catalog:
+            write_row, finish = Query.build_writer(self.output_format)
+
+            try:
+                for row in catalog.search(self.match, self.limit):
+                    write_row(row)
+                    num_files += 1
+            except sqlite3.OperationalError as error:
+                Printer.error_and_abort(f"Search \[{self.match}] is not a valid query ({error})!")
+
+            finish()
+
+        Printer.error_console.print(
+            f"{Printer.color_waiting}Found {num_files} file(s) matching \[{self.match}] in \[{self.catalog_path}]."
+        )
@@ -1,17 +1,23 @@
+import collections
 import json
 import os
+import tempfile
 import traceback
 from datetime import datetime
 from enum import Enum
-from typing import TextIO
 
 import typer
 from rich.progress import Progress
 
-from entities.filter import Filter
+from commands.command import Command
+from entities.compiledpreset import CompiledPreset
+from util.catalog import Catalog
 from util.constants import Tags
+from util.config import Config
 from util.exiftool import ExifTool
 from util.helpers import Util, Printer
+from util.pipeline import Stage, StageStatus, ProcessExecutor
+from util.writer import FileWriter
 
 
 class Preset(str, Enum):
@@ -37,19 +43,8 @@ class TexifLevel(str, Enum):
     high = "high"
 
 
-class Texif:
+class Texif(Command):
     json_level_map = {TexifLevel.low.value: 1, TexifLevel.medium.value: 2, TexifLevel.high.value: 3}
-    json_level_required_tags = "0"
-    json_level_highest = 3
-
-    json_key_tag = "tag"
-    json_key_name = "name"
-    json_key_prefix = "prefix"
-    json_key_suffix = "suffix"
-    json_key_delimiter = "delimiter"
-
-    file_break_begin_level = "================ BEGIN LEVEL {} ================"
-    file_break_end_level = "================= END LEVEL {} ================="
 
     preset_make_map = {
         "FUJIFILM": "fujifilm"
@@ -73,37 +68,32 @@ class Texif:
             level: TexifLevel,
             preset: Preset,
             filter_files: bool,
-            extension: str
+            extension: str,
+            incremental: bool = False,
+            batch: bool = False,
+            workers: int = 1,
+            catalog: bool = False,
+            search: bool = False
     ):
-        self.directory = Util.strip_slashes(directory)
-        self.output_directory = Util.strip_slashes(output_directory)
+        super().__init__(directory, output_directory, filter_files, extension, workers)
         self.type = type.value.lower()
         self.level = Texif.json_level_map[level.value]
         self.preset = preset.value
-        self.filter_files = filter_files
-        self.extension = extension
-        self.compiled_presets: list[list[tuple[str, list[str]]]] = []
-        self.step_count = 1
+        self.incremental = incremental
+        self.batch = batch
+        self.use_catalog = catalog or search
+        self.search = search
+        self.compiled_preset: CompiledPreset = None
+        self.simple_settings_changed_at = 0
+        self.required_tags_ordered: list[str] = []
+        self.required_tags_formatted: list[str] = []
         self.total_steps = 3 if self.type == "both" else 2
 
     def texif(self):
         Texif.start_message()
 
-        Util.verify_directory(self.directory)
-
-        with ExifTool() as exiftool:
-            Util.verify_extensions_in_directory(exiftool, self.extension, self.directory)
-
-            Util.create_directory_or_abort(self.output_directory, self.directory)
-
-            file_names = Util.get_valid_file_names(exiftool, self.extension, self.directory)
-
-            formatted_filter = Filter.build_filter(self.filter_files, self.total_steps)
-            filtered_file_names = formatted_filter.filter(file_names)
-            self.step_count += 1
-
-            if not filtered_file_names:
-                Printer.error_and_abort("There are no valid files to generate TEXIFs for!")
+        with ExifTool() as exiftool, self.open_catalog() as self.catalog:
+            filtered_file_names = self.verify_and_filter(exiftool, "There are no valid files to generate TEXIFs for!")
 
             type_caught = False
             if self.type == "simple" or self.type == "both":
@@ -120,158 +110,397 @@ class Texif:
         Printer.done_all()
 
     def do_texif_full(self, exiftool: ExifTool, file_names: list[str], output_directory: str = None):
+        if self.batch:
+            self.do_texif_full_batch(exiftool, file_names, output_directory)
+            return
+
         Printer.console.print(f"\n{Printer.color_title}🌐 Starting TEXIF full (HTML)! 🌐\n")
 
+        output_directory_override = self.output_directory if not output_directory else output_directory
+
+        def texif_full_stage(stage_exiftool: ExifTool, file_name: str, _):
+            file_path = os.path.join(self.directory, file_name)
+            full_path_to = Util.output_path(output_directory_override, file_name, "html")
+
+            if self.incremental and Util.is_output_up_to_date(file_path, full_path_to):
+                return StageStatus.up_to_date
+
+            if not self.texif_full_single(stage_exiftool, file_path, full_path_to):
+                return StageStatus.skipped
+
+        Stage(
+            "TEXIF full",
+            texif_full_stage,
+            executor=self.build_executor(exiftool),
+            label=self.progress_label("TEXIF full"),
+            total=len(file_names)
+        ).run(file_names)
+
+        Printer.done()
+
+    def do_texif_full_batch(self, exiftool: ExifTool, file_names: list[str], output_directory: str = None):
+        Printer.console.print(f"\n{Printer.color_title}🌐 Starting TEXIF full (HTML) batch! 🌐\n")
+
         num_files = len(file_names)
 
         output_directory_override = self.output_directory if not output_directory else output_directory
 
-        with Progress(console=Printer.console, auto_refresh=False) as progress:
-            progress_task = progress.add_task(
-                Printer.progress_label_with_steps(
-                    "TEXIF full",
-                    self.step_count,
-                    self.total_steps
-                ),
-                total=num_files
+        num_files_up_to_date = 0
+        pending_paths: dict[str, str] = {}
+
+        for file_name in file_names:
+            file_path = os.path.join(self.directory, file_name)
+            full_path_to = Util.output_path(output_directory_override, file_name, "html")
+
+            if self.incremental and Util.is_output_up_to_date(file_path, full_path_to):
+                num_files_up_to_date += 1
+                continue
+
+            # exiftool refuses to overwrite existing files, so stale outputs are removed up front
+            if os.path.isfile(full_path_to):
+                os.remove(full_path_to)
+
+            pending_paths[file_path] = full_path_to
+
+        if pending_paths:
+            with Printer.progress_spinner() as progress:
+                progress.add_task(self.progress_label(f"TEXIF full batch of {len(pending_paths)} file(s)"))
+
+                with tempfile.NamedTemporaryFile("w", suffix=".args", delete=False) as argument_file:
+                    for file_path in pending_paths:
+                        Util.write_with_newline(argument_file, file_path)
+
+                try:
+                    output_pattern = os.path.join(output_directory_override.replace("%", "%%"), "%f.html")
+                    exiftool.execute_with_extension(
+                        self.extension,
+                        f"-{Tags.HTMLDump}",
+                        "-w",
+                        output_pattern,
+                        "-@",
+                        argument_file.name
+                    )
+                finally:
+                    os.remove(argument_file.name)
+
+        num_files_skipped = 0
+
+        for file_path, full_path_to in pending_paths.items():
+            if not os.path.isfile(full_path_to):
+                Printer.warning(f"Skipping \[{file_path}] as no data was found!")
+                num_files_skipped += 1
+            elif self.catalog:
+                self.catalog.record_sidecar(file_path, Catalog.sidecar_texif_full, full_path_to)
+
+        Printer.waiting(f"Generated {len(pending_paths) - num_files_skipped} of {num_files} full HTML dump(s).")
+        Printer.print_files_up_to_date(num_files_up_to_date)
+        Printer.print_files_skipped(num_files_skipped)
+
+        Printer.done()
+
+    def do_texif_simple(self, exiftool: ExifTool, file_names: list[str], output_directory: str = None):
+        Printer.console.print(f"\n{Printer.color_title}📋 Starting TEXIF simple (TXT)! 📋\n")
+
+        output_directory_override = self.output_directory if not output_directory else output_directory
+        self.prepare_simple(exiftool, file_names)
+        self.stamp_simple_settings(output_directory_override)
+
+        if self.batch:
+            self.do_texif_simple_batch(exiftool, file_names, output_directory_override)
+            return
+
+        def texif_simple_stage(stage_exiftool: ExifTool, file_name: str, _):
+            file_path = os.path.join(self.directory, file_name)
+            full_path_to = Util.output_path(output_directory_override, file_name, "txt")
+
+            if self.is_simple_up_to_date(file_path, full_path_to):
+                return StageStatus.up_to_date
+
+            if not self.texif_simple_single(stage_exiftool, file_path, full_path_to, file_writer):
+                return StageStatus.skipped
+
+        texif_simple = Stage(
+            "TEXIF simple",
+            texif_simple_stage,
+            executor=self.build_executor(exiftool),
+            label=self.progress_label("TEXIF simple"),
+            total=len(file_names)
+        )
+
+        with FileWriter() as file_writer:
+            texif_simple.run(file_names, report=False)
+
+        texif_simple.counts[StageStatus.failed] += Texif.report_failed_writes(file_writer)
+        texif_simple.report()
+
+        Printer.done()
+
+    def do_texif_simple_batch(self, exiftool: ExifTool, file_names: list[str], output_directory: str):
+        # tags are read with one exiftool call per chunk while worker processes decode and render earlier chunks
+        stale_file_names = [
+            file_name for file_name in file_names
+            if not self.is_simple_up_to_date(
+                os.path.join(self.directory, file_name),
+                Util.output_path(output_directory, file_name, "txt")
             )
+        ]
+        num_stale_files = len(stale_file_names)
+        num_files_skipped = 0
+
+        preset_state = self.compiled_preset.to_state()
+        generation_date_time = Texif.generation_date_time()
+        pending = collections.deque()
+        # small runs render inline like map_chunks_if_large, a pool only pays off for large ones
+        workers = Config.process_pool_workers if num_stale_files >= Config.process_pool_threshold else 1
+
+        with Progress(console=Printer.console, auto_refresh=False) as progress, \
+                ProcessExecutor(workers) as process_executor, \
+                FileWriter() as file_writer:
+            progress_task = progress.add_task(self.progress_label("TEXIF simple"), total=num_stale_files)
+
+            def write_rendered(chunk: list[str], future):
+                rendered = future.result()
+                num_skipped = 0
+
+                for file_name, text, missing_tags, file_tags, error_message in rendered:
+                    if text is None:
+                        Printer.warning(f"Skipping \[{file_name}] due to error! {error_message}")
+                        num_skipped += 1
+                        continue
+
+                    full_path_to = Util.output_path(output_directory, file_name, "txt")
+
+                    for missing_tag in missing_tags:
+                        Printer.warning(f"Warning: could not find tag \[{missing_tag}] for \[{file_name}]!")
+
+                    Printer.waiting(f"Writing TEXIF to \[{full_path_to}]...", prefix=Printer.tab)
+                    file_writer.write(full_path_to, text)
+
+                    if file_tags is not None:
+                        self.__record_simple(os.path.join(self.directory, file_name), full_path_to, file_tags)
 
-            num_files_skipped = 0
+                # exiftool leaves files it could not read out of the JSON entirely
+                rendered_file_names = {file_name for file_name, *_ in rendered}
 
-            for count, file_name in enumerate(file_names):
-                progress.update(progress_task, completed=count)
+                for file_name in chunk:
+                    if file_name not in rendered_file_names:
+                        Printer.warning(f"Skipping \[{file_name}] as no tags could be read!")
+                        num_skipped += 1
+
+                progress.advance(progress_task, len(chunk))
                 progress.refresh()
 
-                file_path = os.path.join(self.directory, file_name)
+                return num_skipped
 
-                Printer.waiting(f"Generating full HTML dump for \[{file_path}]...")
+            for index in range(0, num_stale_files, Config.exiftool_batch_size):
+                chunk = stale_file_names[index:index + Config.exiftool_batch_size]
 
-                full_html_dump = exiftool.execute_with_extension(
+                Printer.waiting(f"Building tag JSON for {len(chunk)} file(s) in \[{self.directory}]...")
+                json_data = exiftool.execute_with_extension(
                     self.extension,
-                    f"-{Tags.HTMLDump}",
-                    file_path
+                    f"-{Tags.JSONFormat}",
+                    *[os.path.join(self.directory, file_name) for file_name in chunk],
+                    *self.required_tags_formatted
                 )
 
-                if not full_html_dump:
-                    Printer.warning(f"Skipping \[{file_path}] as no data was found!")
-                    num_files_skipped += 1
-                    continue
-
-                file_name_extensionless = os.path.splitext(file_name)[0]
-                full_path_to = f"{os.path.join(output_directory_override, file_name_extensionless)}.html"
-
-                Printer.waiting(f"Writing full HTML dump to \[{full_path_to}]...", prefix=Printer.tab)
+                pending.append((
+                    chunk,
+                    process_executor.submit(
+                        Texif.render_simple_batch,
+                        preset_state,
+                        self.preset,
+                        self.level,
+                        generation_date_time,
+                        chunk,
+                        json_data,
+                        self.catalog is not None
+                    )
+                ))
 
-                with open(full_path_to, "w") as texif_file:
-                    texif_file.write(full_html_dump)
+                if len(pending) > process_executor.workers:
+                    num_files_skipped += write_rendered(*pending.popleft())
 
-                Printer.done(prefix=Printer.tab)
+            while pending:
+                num_files_skipped += write_rendered(*pending.popleft())
 
-            progress.update(progress_task, completed=num_files)
+        num_files_skipped += Texif.report_failed_writes(file_writer)
 
+        Printer.print_files_up_to_date(len(file_names) - num_stale_files)
         Printer.print_files_skipped(num_files_skipped)
 
         Printer.done()
 
-    def do_texif_simple(self, exiftool: ExifTool, file_names: list[str], output_directory: str = None):
-        Printer.console.print(f"\n{Printer.color_title}📋 Starting TEXIF simple (TXT)! 📋\n")
+    @staticmethod
+    def render_simple_batch(
+            preset_state: tuple,
+            preset: str,
+            level: int,
+            generation_date_time: str,
+            file_names: list[str],
+            json_data: str,
+            keep_tags: bool = False
+    ):
+        # runs in worker processes so only plain tuples of strings are sent back, the tags only when asked for,
+        # files that could not be rendered come back without text and with the reason instead
+        compiled_preset = CompiledPreset.from_state(preset_state)
 
-        num_files = len(file_names)
+        try:
+            files_tags = json.loads(json_data) if json_data else []
+        except ValueError as error:
+            return [(file_name, None, (), None, f"Could not parse tag JSON ({error})!") for file_name in file_names]
 
-        output_directory_override = self.output_directory if not output_directory else output_directory
+        rendered = []
+
+        for file_tags in files_tags:
+            file_name = file_tags.get(Tags.FileName) or os.path.basename(file_tags.get(Tags.SourceFile, ""))
+
+            try:
+                text = Texif.render_simple(compiled_preset, preset, level, generation_date_time, file_tags)
+            except KeyError as error:
+                rendered.append((file_name, None, (), None, f"Could not find tag \[{error.args[0]}]!"))
+                continue
+
+            missing_tags = tuple(tag for tag in sorted(compiled_preset.required_tags) if tag not in file_tags)
+            rendered.append((file_name, text, missing_tags, file_tags if keep_tags else None, None))
+
+        return rendered
+
+    def prepare_simple(self, exiftool: ExifTool, file_names: list[str], directory: str = None):
         preset_directory = os.path.abspath(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'presets'))
         presets = {os.path.splitext(preset_path)[0] for preset_path in os.listdir(preset_directory)}
 
         if self.preset == Preset.auto.value:
-            self.__automatically_select_preset(exiftool, file_names)
+            directory_override = self.directory if not directory else directory
+            self.__automatically_select_preset(exiftool, os.path.join(directory_override, file_names[0]))
 
         if self.preset not in presets:
             Printer.error_and_abort(f"Cannot find preset \[{self.preset}]!")
 
         required_tags = self.__compile_preset(preset_directory)
+        self.required_tags_ordered = sorted(required_tags)
         required_tags_formatted = {f"-{tag}" for tag in required_tags}
         required_tags_formatted.add(f"-{Tags.FileName}")
         required_tags_formatted.add(f"-{Tags.DateTimeOriginal}")
         required_tags_formatted.add(f"-{Tags.OffsetTimeOriginal}")
-        required_tags_formatted = list(required_tags_formatted)
-
-        with Progress(console=Printer.console, auto_refresh=False) as progress:
-            progress_task = progress.add_task(
-                Printer.progress_label_with_steps(
-                    "TEXIF simple",
-                    self.step_count,
-                    self.total_steps
-                ),
-                total=num_files
+        self.required_tags_formatted = list(required_tags_formatted)
+
+    def texif_simple_single(self, exiftool: ExifTool, file_path: str, full_path_to: str, file_writer: FileWriter):
+        Printer.waiting(f"Generating simple TEXIF for \[{file_path}]...")
+
+        Printer.waiting(f"Building tag JSON...", prefix=Printer.tab)
+        file_tags = Util.deserialize_data(
+            exiftool.execute_with_extension(
+                self.extension,
+                f"-{Tags.JSONFormat}",
+                file_path,
+                *self.required_tags_formatted
             )
+        )
 
-            num_files_skipped = 0
+        if not file_tags:
+            Printer.warning(f"Skipping \[{file_path}] due to error!")
+            return False
 
-            for count, file_name in enumerate(file_names):
-                progress.update(progress_task, completed=count)
-                progress.refresh()
+        file_tags = file_tags[0]
 
-                file_path = os.path.join(self.directory, file_name)
+        for required_tag in self.required_tags_ordered:
+            if required_tag not in file_tags:
+                Printer.warning(f"Warning: could not find tag \[{required_tag}]!", prefix=Printer.tab)
 
-                Printer.waiting(f"Generating simple TEXIF for \[{file_path}]...")
+        Printer.waiting(f"Writing TEXIF to \[{full_path_to}]...", prefix=Printer.tab)
 
-                Printer.waiting(f"Building tag JSON...", prefix=Printer.tab)
-                file_tags = Util.deserialize_data(
-                    exiftool.execute_with_extension(
-                        self.extension,
-                        f"-{Tags.JSONFormat}",
-                        file_path,
-                        *required_tags_formatted
-                    )
-                )
+        file_writer.write(
+            full_path_to,
+            Texif.render_simple(
+                self.compiled_preset,
+                self.preset,
+                self.level,
+                Texif.generation_date_time(),
+                file_tags
+            )
+        )
 
-                if not file_tags:
-                    Printer.warning(f"Skipping \[{file_path}] due to error!")
-                    num_files_skipped += 1
-                    continue
+        self.__record_simple(file_path, full_path_to, file_tags)
 
-                file_tags = file_tags[0]
+        Printer.done(prefix=Printer.tab)
+        return True
 
-                for required_tag in required_tags:
-                    if required_tag not in file_tags:
-                        Printer.warning(f"Warning: could not find tag \[{required_tag}]!", prefix=Printer.tab)
+    def texif_full_single(self, exiftool: ExifTool, file_path: str, full_path_to: str):
+        Printer.waiting(f"Generating full HTML dump for \[{file_path}]...")
 
-                file_name_extensionless = os.path.splitext(file_name)[0]
-                full_path_to = f"{os.path.join(output_directory_override, file_name_extensionless)}.txt"
+        Printer.waiting(f"Streaming full HTML dump to \[{full_path_to}]...", prefix=Printer.tab)
 
-                Printer.waiting(f"Writing TEXIF to \[{full_path_to}]...", prefix=Printer.tab)
+        num_bytes_written = exiftool.execute_to_file(
+            full_path_to,
+            *ExifTool.extension_args(self.extension),
+            f"-{Tags.HTMLDump}",
+            file_path
+        )
 
-                with open(full_path_to, "w") as texif_file:
-                    Util.write_with_newline(texif_file, f"Media filename: {file_tags[Tags.FileName]}")
-                    Util.write_with_newline(
-                        texif_file,
-                        f"Media created: {file_tags[Tags.DateTimeOriginal]}{file_tags[Tags.OffsetTimeOriginal]}"
-                    )
+        if not num_bytes_written:
+            Printer.warning(f"Skipping \[{file_path}] as no data was found!")
+            return False
 
-                    generation_date_time = datetime.now().astimezone()
-                    generation_offset = generation_date_time.strftime("%z")
-                    generation_offset_formatted = f"{generation_offset[:3]}:{generation_offset[3:]}"
-                    generation_date_time_formatted = \
-                        generation_date_time.strftime("%Y:%m:%d %H:%M:%S") + generation_offset_formatted
-                    Util.write_with_newline(texif_file, f"TEXIF created: {generation_date_time_formatted}")
-                    Util.write_with_newline(texif_file, f"TEXIF preset: {self.preset}")
-                    Util.write_with_newline(texif_file)
+        if self.catalog:
+            self.catalog.record_sidecar(file_path, Catalog.sidecar_texif_full, full_path_to)
 
-                    for level in range(1, Texif.json_level_highest + 1):
-                        if self.level >= level:
-                            self.__process_level(level, file_tags, texif_file)
+        Printer.done(prefix=Printer.tab)
+        return True
 
-                Printer.done(prefix=Printer.tab)
+    def stamp_simple_settings(self, output_directory: str):
+        # simple TEXIFs written with another preset or level are out of date however new they are
+        self.simple_settings_changed_at = Util.stamp_settings(
+            output_directory,
+            {"preset": self.preset, "preset_fingerprint": self.compiled_preset.fingerprint(), "level": self.level}
+        )
 
-            progress.update(progress_task, completed=num_files)
+    def is_simple_up_to_date(self, file_path: str, full_path_to: str):
+        # a sidecar written before searching was turned on still has to be indexed once
+        return self.incremental and \
+            Util.is_output_up_to_date(file_path, full_path_to, self.simple_settings_changed_at) and \
+            (not self.search or self.catalog.is_searchable(file_path))
 
-        Printer.print_files_skipped(num_files_skipped)
+    def __record_simple(self, file_path: str, full_path_to: str, file_tags: dict):
+        if self.catalog:
+            self.catalog.record_tags(file_path, file_tags)
+            self.catalog.record_sidecar(file_path, Catalog.sidecar_texif_simple, full_path_to)
 
-        Printer.done()
+            if self.search:
+                self.catalog.record_search(file_path, file_tags)
+
+    @staticmethod
+    def generation_date_time():
+        generation_date_time = datetime.now().astimezone()
+        generation_offset = generation_date_time.strftime("%z")
+        generation_offset_formatted = f"{generation_offset[:3]}:{generation_offset[3:]}"
 
-    def __automatically_select_preset(self, exiftool: ExifTool, file_names: list[str]):
-        file_path = os.path.join(self.directory, file_names[0])
+        return generation_date_time.strftime("%Y:%m:%d %H:%M:%S") + generation_offset_formatted
 
+    @staticmethod
+    def render_simple(
+            compiled_preset: CompiledPreset,
+            preset: str,
+            level: int,
+            generation_date_time: str,
+            file_tags: dict
+    ):
+        return "\n".join([
+            f"Media filename: {file_tags[Tags.FileName]}",
+            f"Media created: {file_tags[Tags.DateTimeOriginal]}{file_tags[Tags.OffsetTimeOriginal]}",
+            f"TEXIF created: {generation_date_time}",
+            f"TEXIF preset: {preset}",
+            "",
+            ""
+        ]) + compiled_preset.render(file_tags, level)
+
+    @staticmethod
+    def report_failed_writes(file_writer: FileWriter):
+        for failed_path in file_writer.failed_paths:
+            Printer.warning(f"Failed to write \[{failed_path}]!")
+
+        return len(file_writer.failed_paths)
+
+    def __automatically_select_preset(self, exiftool: ExifTool, file_path: str):
         try:
             file_tags = Util.deserialize_data(
                 exiftool.execute_with_extension(
@@ -317,71 +546,21 @@ class Texif:
     def __decode_preset_chunk_error(decode_from: str):
         Printer.error_and_abort(f"Failed to decode preset chunk \[{decode_from}]!")
 
-    def __process_level(self, level: int, file_tags: dict, texif_file: TextIO):
-        compiled_preset = self.compiled_presets[level - 1]
-
-        Util.write_with_newline(texif_file, Texif.file_break_begin_level.format(level))
-        Util.write_with_newline(texif_file, file_tags[Tags.FileName])
-
-        for format_string, argument_order in compiled_preset:
-            arguments = [file_tags.get(argument, "") for argument in argument_order]
-            Util.write_with_newline(texif_file, format_string.format(*arguments))
-
-        Util.write_with_newline(texif_file, Texif.file_break_end_level.format(level))
-        Util.write_with_newline(texif_file)
-
     def __compile_preset(self, preset_directory: str):
         try:
             Printer.waiting(f"Compiling preset \[{self.preset}]...")
-            with open(f"{os.path.join(preset_directory, self.preset)}.json") as preset_file:
-                preset_json = json.load(preset_file)
-                required_tags = set()
+            self.compiled_preset = CompiledPreset.load(preset_directory, self.preset)
 
-                for level in range(1, Texif.json_level_highest + 1):
-                    required_tags |= self.__compile_preset_level(level, preset_json[str(level)])
+            required_tags = self.compiled_preset.required_tags
 
-                Printer.waiting("Requiring the following tags:")
-                Printer.console.print(f"{Printer.color_waiting}{required_tags}\n")
-                return required_tags
+            Printer.waiting("Requiring the following tags:")
+            Printer.console.print(f"{Printer.color_waiting}{required_tags}\n")
+            return required_tags
         except Exception:
             Printer.error(f"Error while compiling preset \[{self.preset}]!")
             traceback.print_exc()
             raise typer.Abort()
 
-    def __compile_preset_level(self, level, preset_level: list[list[dict]]):
-        required_tags = set()
-
-        self.compiled_presets.append([])
-        for preset_line in preset_level:
-            required_tags |= self.__compile_preset_line(level, preset_line)
-
-        return required_tags
-
-    def __compile_preset_line(self, level, preset_line: list[dict]):
-        required_tags = []
-
-        if not preset_line:
-            return set()
-
-        first_tag = preset_line[0]
-        delimiter = first_tag[Texif.json_key_delimiter] if Texif.json_key_delimiter in first_tag else ""
-        compiled_tags = []
-
-        for tag in preset_line:
-            required_tags.append(tag[Texif.json_key_tag])
-            name = tag.get(Texif.json_key_name, "")
-            name = "" if not name else f"{name}: "
-            prefix = tag.get(Texif.json_key_prefix, "")
-            suffix = tag.get(Texif.json_key_suffix, "")
-
-            compiled_tags.append(f"{prefix}{name}{{}}{suffix}")
-
-        self.compiled_presets[level - 1].append(
-            (delimiter.join(compiled_tags), required_tags)
-        )
-
-        return set(required_tags)
-
     @staticmethod
     def start_message():
         Printer.divider()
@@ -0,0 +1,104 @@
+import os
+import typing
+
+from commands.command import Command
+from commands.exif import SidecarType
+from commands.process import Process
+from commands.texif import Preset
+from entities.checker import HiddenChecker
+from util.exiftool import ExifTool, ExifToolPool
+from util.helpers import Util, Printer
+from util.watcher import Watcher
+
+
+class Watch(Command):
+    def __init__(
+            self,
+            directory: str,
+            output_directory: str,
+            keep_original: bool,
+            preset: Preset,
+            extensions: typing.List[str],
+            sidecars: typing.List[SidecarType] = None,
+            workers: int = 1,
+            poll: bool = False,
+            existing: bool = False
+    ):
+        extensions = [extension.upper() for extension in extensions]
+
+        super().__init__(directory, output_directory, False, extensions, workers)
+        self.extensions = extensions
+        self.poll = poll
+        self.existing = existing
+        self.incremental = True
+        self.hidden_checker = HiddenChecker()
+        # output is kept between batches and restarts so every destination is created incrementally
+        self.process = Process(
+            directory=directory,
+            output_directory=output_directory,
+            keep_original=keep_original,
+            reprocess=False,
+            preset=preset,
+            filter_files=False,
+            extensions=extensions,
+            incremental=True,
+            sidecars=sidecars,
+            stream=True,
+            workers=workers
+        )
+
+    def watch(self):
+        Watch.start_message()
+
+        Util.verify_directory(self.directory)
+        Util.create_directory_or_abort(self.output_directory, self.directory, self.incremental)
+        self.process.create_destinations()
+
+        watcher = Watcher.build(self.directory, self.poll)
+
+        Printer.waiting(
+            f"Watching \[{self.directory}] for files with extension \[{Util.pretty_extension(self.extensions)}] "
+            f"using {type(watcher).__name__}, press Ctrl+C to stop..."
+        )
+
+        # exiftool processes stay warm between batches so a new file only pays for its own metadata reads
+        with watcher, ExifTool() as exiftool, ExifToolPool(size=self.workers) as exiftool_pool:
+            self.process.stream_exiftool_pool = exiftool_pool
+
+            try:
+                if self.existing:
+                    self.__process_batch(exiftool, os.listdir(self.directory))
+
+                for names in watcher.batches():
+                    self.__process_batch(exiftool, names)
+            except KeyboardInterrupt:
+                Printer.warning("Stopping watch!", prefix="\n")
+
+        Printer.done_all()
+
+    def __process_batch(self, exiftool: ExifTool, names: list[str]):
+        file_names = self.__select_file_names(names)
+
+        if not file_names:
+            return
+
+        Printer.waiting(f"Found {len(file_names)} new file(s) in \[{self.directory}]...", prefix="\n")
+
+        self.process.step_count = 1
+        self.process.total_steps = 3
+        self.process.stream_files(exiftool, file_names)
+
+    def __select_file_names(self, names: list[str]):
+        # files may have been moved away by a previous batch or be partial downloads with another extension
+        return sorted(
+            name for name in names
+            if Util.split_extension(name)[1].upper() in self.extensions
+            and self.hidden_checker.check_string(name)
+            and os.path.isfile(os.path.join(self.directory, name))
+        )
+
+    @staticmethod
+    def start_message():
+        Printer.divider()
+        Printer.console.print(f"{Printer.color_divider}👀 Starting watch! 👀")
+        Printer.divider()
@@ -1,86 +1,163 @@
 import os
 
-from rich.progress import Progress
-
-from commands.rename import Rename
-from entities.filter import Filter
+from commands.command import Command
+from util.config import Config
+from util.contentindex import ContentIndex
 from util.exiftool import ExifTool
-from util.helpers import Util, Printer
+from util.helpers import Printer
+from util.pipeline import Stage, StageStatus, ThreadExecutor
+from util.transfer import Transfer
 
 
-class Yank:
+class Yank(Command):
     def __init__(
             self,
             directory: str,
             output_directory: str,
             keep_original: bool,
             filter_files: bool,
-            extension: str
+            extension: str,
+            verify: bool = False,
+            workers: int = Config.yank_workers,
+            skip_duplicates: bool = False,
+            catalog: bool = False
     ):
-        self.directory = Util.strip_slashes(directory)
-        self.output_directory = Util.strip_slashes(output_directory)
+        super().__init__(directory, output_directory, filter_files, extension, workers)
         self.keep_original = keep_original
-        self.filter_files = filter_files
-        self.extension = extension
-        self.step_count = 1
-        self.total_steps = 2
+        self.verify = verify
+        self.skip_duplicates = skip_duplicates
+        self.use_catalog = catalog
+        # a card offloaded before leaves its files in the destination, so those are kept rather than wiped
+        self.incremental = skip_duplicates
 
     def yank(self):
         Yank.start_message()
 
-        Util.verify_directory(self.directory)
-
         with ExifTool() as exiftool:
-            Util.verify_extensions_in_directory(exiftool, self.extension, self.directory)
-
-            Util.create_directory_or_abort(self.output_directory, self.directory)
-
-            file_names = Util.get_valid_file_names(exiftool, self.extension, self.directory)
-
-            formatted_filter = Filter.build_filter(self.filter_files, self.total_steps)
-            filtered_file_names = formatted_filter.filter(file_names)
-            self.step_count += 1
-
-            if not filtered_file_names:
-                Printer.error_and_abort("There are no valid files to yank!")
+            filtered_file_names = self.verify_and_filter(exiftool, "There are no valid files to yank!")
 
-            if self.keep_original:
-                self.__do_yank(filtered_file_names, Rename.do_rename_copy)
-            else:
-                self.__do_yank(filtered_file_names, Rename.do_rename_move)
+        with self.open_catalog() as self.catalog:
+            self.__do_yank([str(file_name) for file_name in filtered_file_names])
 
         Printer.done_all()
 
-    def __do_yank(self, file_names: list[str], file_modification_closure):
+    def __do_yank(self, file_names: list[str]):
         num_files = len(file_names)
 
         Printer.console.print(f"\n{Printer.color_title}📥 Starting yank! 📥\n")
 
-        with Progress(console=Printer.console, auto_refresh=False) as progress:
-            progress_task = progress.add_task(
-                Printer.progress_label_with_steps(
-                    "Yank",
-                    self.step_count,
-                    self.total_steps
-                ),
-                total=num_files
-            )
-
-            for count, file_name in enumerate(file_names):
-                progress.update(progress_task, completed=count)
-                progress.refresh()
-
-                file_path = os.path.join(self.directory, file_name)
-
-                Printer.waiting(f"Yanking \[{file_path}]...")
-
-                full_path_to = os.path.join(self.output_directory, file_name)
-                file_modification_closure(file_path, full_path_to)
-
-            progress.update(progress_task, completed=num_files)
-
-        num_files_in_directory = Util.num_files_in_directory(self.output_directory)
-        Printer.print_files_skipped(num_files - num_files_in_directory)
+        # each worker only ever sets its own file name so the dict needs no lock
+        digests: dict[str, str] = {}
+        content_index = ContentIndex.open(self.output_directory) if self.skip_duplicates else None
+
+        def yank_single(_, file_name: str, __):
+            file_path = os.path.join(self.directory, file_name)
+
+            Printer.waiting(f"Yanking \[{file_path}]...")
+
+            if not content_index:
+                return yank_file(file_name, file_path)
+
+            try:
+                claim = content_index.claim(file_path)
+            except OSError as error:
+                Printer.warning(
+                    f"Skipping \[{file_path}] since it could not be read ({error.strerror})!",
+                    prefix=Printer.tab
+                )
+                return StageStatus.failed
+
+            # the claim is held until the file is in the index, so an identical source waits and is then skipped
+            try:
+                return yank_file(file_name, file_path)
+            finally:
+                content_index.release(claim)
+
+        def yank_file(file_name: str, file_path: str):
+            full_path_to = os.path.join(self.output_directory, file_name)
+
+            if os.path.exists(full_path_to) and os.path.samefile(file_path, full_path_to):
+                Printer.warning(f"Skipping copying \[{file_path}] as it would change nothing!", prefix=Printer.tab)
+                return StageStatus.skipped
+
+            try:
+                duplicate_file_name = content_index.find_duplicate(file_path) if content_index else None
+
+                if duplicate_file_name:
+                    Printer.warning(
+                        f"Skipping \[{file_path}] as its content is already in \[{duplicate_file_name}]!",
+                        prefix=Printer.tab
+                    )
+                    return StageStatus.up_to_date
+
+                # a kept destination may hold another file under the same name, which is never overwritten
+                if os.path.exists(full_path_to):
+                    if Transfer.same_content(file_path, full_path_to):
+                        Printer.warning(
+                            f"Skipping \[{file_path}] as its content is already in \[{full_path_to}]!",
+                            prefix=Printer.tab
+                        )
+                        return StageStatus.up_to_date
+
+                    Printer.warning(
+                        f"Skipping \[{file_path}] as \[{full_path_to}] already exists with different content!",
+                        prefix=Printer.tab
+                    )
+                    return StageStatus.skipped
+
+                if self.keep_original:
+                    digest, copied = Transfer.copy_with_digest(file_path, full_path_to), True
+                else:
+                    digest, copied = Transfer.move_with_digest(file_path, full_path_to)
+
+                # a rename leaves the data where it was, so there is nothing to verify
+                if self.verify and copied and Transfer.file_digest(full_path_to, drop_cache=True) != digest:
+                    Printer.warning(f"Skipping \[{file_path}] since its copy did not match!", prefix=Printer.tab)
+                    os.remove(full_path_to)
+                    return StageStatus.failed
+
+                if copied and not self.keep_original:
+                    os.remove(file_path)
+            except OSError as error:
+                # a partial copy must not be mistaken for a yanked file, the source is still there to retry from
+                if os.path.exists(file_path) and os.path.exists(full_path_to):
+                    os.remove(full_path_to)
+
+                Printer.warning(
+                    f"Skipping \[{file_path}] since it could not be yanked ({error.strerror})!",
+                    prefix=Printer.tab
+                )
+                return StageStatus.failed
+
+            digests[file_name] = digest
+
+            # the digest was already taken while copying, so the catalog gets the content hash for free
+            if self.catalog:
+                self.catalog.record_file(full_path_to, file_path, digest)
+
+            if content_index:
+                content_index.add(file_name, digest)
+
+        yank_stage = Stage(
+            "Yank",
+            yank_single,
+            executor=ThreadExecutor(self.workers),
+            label=self.progress_label("Yank"),
+            total=num_files
+        )
+        yank_stage.run(file_names, report=False)
+
+        if digests:
+            manifest_path = Transfer.update_manifest(self.output_directory, digests)
+            Printer.waiting(f"Wrote {len(digests)} checksum(s) to \[{manifest_path}].")
+
+        if content_index:
+            content_index.save()
+
+        Printer.print_files_duplicate(yank_stage.num_up_to_date)
+
+        Printer.waiting(f"Yanking took {yank_stage.elapsed:.2f}s.")
+        Printer.print_files_skipped(yank_stage.num_skipped)
 
         Printer.done()
 
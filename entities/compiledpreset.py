@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+
+from util.constants import Tags
+
+
+class CompiledPreset:
+    json_level_highest = 3
+
+    json_key_tag = "tag"
+    json_key_name = "name"
+    json_key_prefix = "prefix"
+    json_key_suffix = "suffix"
+    json_key_delimiter = "delimiter"
+
+    file_break_begin_level = "================ BEGIN LEVEL {} ================"
+    file_break_end_level = "================= END LEVEL {} ================="
+
+    render_function_name = "render"
+
+    __loaded: dict[str, "CompiledPreset"] = {}
+    __from_state: dict[tuple, "CompiledPreset"] = {}
+
+    def __init__(self, name: str, required_tags: list[str], level_sources: list[str]):
+        self.name = name
+        self.required_tags = set(required_tags)
+        self.level_sources = level_sources
+        self.level_renderers = [CompiledPreset.__build_renderer(source) for source in level_sources]
+
+    def render(self, file_tags: dict, level: int):
+        return "".join(self.level_renderers[index](file_tags) for index in range(level))
+
+    def to_state(self):
+        # compiled render functions cannot be pickled so worker processes rebuild them from the sources
+        return self.name, tuple(sorted(self.required_tags)), tuple(self.level_sources)
+
+    def fingerprint(self):
+        # changes whenever the preset renders differently, including edits to a preset json under the same name
+        return hashlib.sha256(repr(self.to_state()).encode()).hexdigest()
+
+    @staticmethod
+    def from_state(state: tuple):
+        if state not in CompiledPreset.__from_state:
+            name, required_tags, level_sources = state
+            CompiledPreset.__from_state[state] = CompiledPreset(name, list(required_tags), list(level_sources))
+
+        return CompiledPreset.__from_state[state]
+
+    @staticmethod
+    def load(preset_directory: str, preset: str):
+        preset_path = f"{os.path.join(preset_directory, preset)}.json"
+
+        with open(preset_path, "rb") as preset_file:
+            preset_bytes = preset_file.read()
+
+        preset_hash = hashlib.sha256(preset_bytes).hexdigest()
+        loaded_key = f"{preset}-{preset_hash}"
+
+        # always compiled from the preset json, only the in-process result is reused
+        if loaded_key not in CompiledPreset.__loaded:
+            CompiledPreset.__loaded[loaded_key] = CompiledPreset.compile(preset, json.loads(preset_bytes))
+
+        return CompiledPreset.__loaded[loaded_key]
+
+    @staticmethod
+    def compile(name: str, preset_json: dict):
+        required_tags = []
+        level_sources = []
+
+        for level in range(1, CompiledPreset.json_level_highest + 1):
+            level_required_tags, level_source = CompiledPreset.__compile_level(level, preset_json[str(level)])
+
+            required_tags.extend(tag for tag in level_required_tags if tag not in required_tags)
+            level_sources.append(level_source)
+
+        return CompiledPreset(name, required_tags, level_sources)
+
+    @staticmethod
+    def __compile_level(level: int, preset_level: list[list[dict]]):
+        required_tags = []
+        line_expressions = [
+            repr(CompiledPreset.file_break_begin_level.format(level)),
+            f"format(file_tags.get({Tags.FileName!r}, ''))"
+        ]
+
+        for preset_line in preset_level:
+            if not preset_line:
+                continue
+
+            line_required_tags, line_expression = CompiledPreset.__compile_line(preset_line)
+
+            required_tags.extend(line_required_tags)
+            line_expressions.append(line_expression)
+
+        line_expressions.append(repr(CompiledPreset.file_break_end_level.format(level)))
+        line_expressions.append(repr(""))
+
+        source = f"def {CompiledPreset.render_function_name}(file_tags):\n" \
+                 f"    get = file_tags.get\n" \
+                 f"    return \"\\n\".join((\n" \
+                 + "".join(f"        {line_expression},\n" for line_expression in line_expressions) + \
+                 f"    )) + \"\\n\"\n"
+
+        return required_tags, source
+
+    @staticmethod
+    def __compile_line(preset_line: list[dict]):
+        required_tags = []
+
+        first_tag = preset_line[0]
+        delimiter = first_tag.get(CompiledPreset.json_key_delimiter, "")
+        parts = []
+
+        for index, tag in enumerate(preset_line):
+            tag_name = tag[CompiledPreset.json_key_tag]
+            required_tags.append(tag_name)
+
+            name = tag.get(CompiledPreset.json_key_name, "")
+            name = "" if not name else f"{name}: "
+            prefix = tag.get(CompiledPreset.json_key_prefix, "")
+            suffix = tag.get(CompiledPreset.json_key_suffix, "")
+
+            if index > 0 and delimiter:
+                parts.append(repr(delimiter))
+            if prefix or name:
+                parts.append(repr(f"{prefix}{name}"))
+            parts.append(f"format(get({tag_name!r}, ''))")
+            if suffix:
+                parts.append(repr(suffix))
+
+        return required_tags, f"\"\".join(({', '.join(parts)},))"
+
+    @staticmethod
+    def __build_renderer(source: str):
+        namespace = {}
+        exec(compile(source, "<compiled preset>", "exec"), namespace)
+        return namespace[CompiledPreset.render_function_name]
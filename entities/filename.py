@@ -65,8 +65,9 @@ class FileName:
         original_split = original.split('.')
         self.__original = original_split[0]
         self.__extension = original_split[1]
-        self.__changed = False
-        self.__formatted = self.__format()
+        # formatting is deferred since most parsed names are only filtered and never printed
+        self.__changed = True
+        self.__formatted = ""
 
     def __str__(self):
         if self.__changed:
@@ -191,6 +192,42 @@ class FileName:
             original=chunks[FileName.original_index]
         )
 
+    @staticmethod
+    def parse_batch(file_names: list[str]):
+        # returns picklable tuples of (fields, error message) so batches can be parsed in worker processes
+        parsed = []
+
+        for file_name in file_names:
+            try:
+                parsed.append((FileName.from_string(file_name).to_fields(), ""))
+            except FileNameTypeError as error:
+                parsed.append((None, error.message))
+
+        return parsed
+
+    def to_fields(self):
+        return (
+            self.__initials,
+            self.__date_time,
+            self.__sequence,
+            self.__style.value,
+            self.__rating.value,
+            f"{self.__original}.{self.__extension}"
+        )
+
+    @staticmethod
+    def from_fields(fields: tuple):
+        initials, date_time, sequence, style, rating, original = fields
+
+        return FileName(
+            initials=initials,
+            date_time=date_time,
+            sequence=sequence,
+            style=Style(style),
+            rating=Rating(rating),
+            original=original
+        )
+
     @staticmethod
     def __chunk_filename(file_name: str):
         chunks = file_name.split(Config.file_name_delimiter)
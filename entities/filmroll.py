@@ -1,17 +1,16 @@
-from entities.filename import FileName
 from util.config import Config
 
 
 class FilmRoll:
-    def __init__(self, file_name_object: FileName):
-        self.full_date = file_name_object.date_time,
-        self.date = file_name_object.date_time.split(Config.file_name_delimiter)[0]
+    def __init__(self, full_date: str):
+        self.full_date = full_date
+        self.date = full_date.split(Config.file_name_delimiter)[0]
         self.film_types = set()
         self.cameras = set()
         self.lenses = set()
 
     def __hash__(self):
-        return self.full_date
+        return hash(self.full_date)
 
     def __eq__(self, other):
         if isinstance(other, FilmRoll):
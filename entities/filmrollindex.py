@@ -0,0 +1,175 @@
+import json
+import os
+
+from entities.filmroll import FilmRoll
+
+
+class FilmRollIndexError(ValueError):
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(self.message)
+
+
+class FilmRollIndex:
+    version = 1
+
+    file_name = "film-index.json"
+
+    json_key_version = "version"
+    json_key_extension = "extension"
+    json_key_rolls = "rolls"
+    json_key_files = "files"
+    json_key_fingerprint = "fingerprint"
+    json_key_film_type = "film_type"
+    json_key_camera = "camera"
+    json_key_lens = "lens"
+    json_key_film_types = "film_types"
+    json_key_cameras = "cameras"
+    json_key_lenses = "lenses"
+
+    def __init__(self, extension: str, rolls: dict[str, dict] = None):
+        self.extension = extension.upper()
+        # roll full date to its aggregated tags and member files, each with the tags it contributed
+        self.rolls = {} if rolls is None else rolls
+        self.file_rolls = {
+            file_name: full_date
+            for full_date, roll in self.rolls.items()
+            for file_name in roll[FilmRollIndex.json_key_files]
+        }
+        self.dirty_rolls = set()
+
+    def __len__(self):
+        return len(self.file_rolls)
+
+    def is_up_to_date(self, file_name: str, fingerprint: list[int]):
+        full_date = self.file_rolls.get(file_name)
+
+        if full_date is None:
+            return False
+
+        entry = self.rolls[full_date][FilmRollIndex.json_key_files][file_name]
+
+        return entry[FilmRollIndex.json_key_fingerprint] == fingerprint
+
+    def set_file(
+            self,
+            file_name: str,
+            full_date: str,
+            fingerprint: list[int],
+            film_type: tuple[str, str],
+            camera: tuple[str, str],
+            lens: str
+    ):
+        # a rename may have moved the file into another roll
+        self.remove_file(file_name)
+
+        roll = self.rolls.setdefault(full_date, {FilmRollIndex.json_key_files: {}})
+        roll[FilmRollIndex.json_key_files][file_name] = {
+            FilmRollIndex.json_key_fingerprint: fingerprint,
+            FilmRollIndex.json_key_film_type: list(film_type),
+            FilmRollIndex.json_key_camera: list(camera),
+            FilmRollIndex.json_key_lens: lens
+        }
+
+        self.file_rolls[file_name] = full_date
+        self.dirty_rolls.add(full_date)
+
+    def remove_file(self, file_name: str):
+        full_date = self.file_rolls.pop(file_name, None)
+
+        if full_date is None:
+            return
+
+        files = self.rolls[full_date][FilmRollIndex.json_key_files]
+        del files[file_name]
+        self.dirty_rolls.add(full_date)
+
+        if not files:
+            del self.rolls[full_date]
+
+    def remove_missing(self, file_names: set[str]):
+        missing_file_names = [file_name for file_name in self.file_rolls if file_name not in file_names]
+
+        for file_name in missing_file_names:
+            self.remove_file(file_name)
+
+        return len(missing_file_names)
+
+    def film_rolls(self):
+        # only rolls whose members changed are aggregated again, the rest reuse what was stored
+        for full_date in self.dirty_rolls:
+            if full_date in self.rolls:
+                self.__aggregate_roll(self.rolls[full_date])
+
+        num_rolls_updated = len(self.dirty_rolls.intersection(self.rolls))
+        self.dirty_rolls.clear()
+
+        film_rolls = []
+
+        for full_date, roll in sorted(self.rolls.items()):
+            film_roll = FilmRoll(full_date)
+            film_roll.film_types.update(tuple(film_type) for film_type in roll[FilmRollIndex.json_key_film_types])
+            film_roll.cameras.update(tuple(camera) for camera in roll[FilmRollIndex.json_key_cameras])
+            film_roll.lenses.update(roll[FilmRollIndex.json_key_lenses])
+            film_rolls.append(film_roll)
+
+        return film_rolls, num_rolls_updated
+
+    def save(self, directory: str):
+        path = os.path.join(directory, FilmRollIndex.file_name)
+
+        with open(path, "w") as index_file:
+            json.dump(
+                {
+                    FilmRollIndex.json_key_version: FilmRollIndex.version,
+                    FilmRollIndex.json_key_extension: self.extension,
+                    FilmRollIndex.json_key_rolls: dict(sorted(self.rolls.items()))
+                },
+                index_file,
+                indent=2
+            )
+
+        return path
+
+    @staticmethod
+    def load(directory: str, extension: str):
+        path = os.path.join(directory, FilmRollIndex.file_name)
+
+        if not os.path.isfile(path):
+            return FilmRollIndex(extension)
+
+        try:
+            with open(path) as index_file:
+                index_json = json.load(index_file)
+
+            version = index_json[FilmRollIndex.json_key_version]
+            index = FilmRollIndex(
+                index_json[FilmRollIndex.json_key_extension],
+                index_json[FilmRollIndex.json_key_rolls]
+            )
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            raise FilmRollIndexError(f"Could not read film roll index \[{path}]!")
+
+        if version != FilmRollIndex.version:
+            raise FilmRollIndexError(f"Film roll index \[{path}] has unsupported version \[{version}]!")
+
+        if index.extension != extension.upper():
+            raise FilmRollIndexError(f"Film roll index \[{path}] was built for extension \[{index.extension}]!")
+
+        return index
+
+    @staticmethod
+    def fingerprint(file_path: str):
+        # size and modification time are enough to notice a rescan or re-tag without reading the file
+        stat = os.stat(file_path)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    @staticmethod
+    def __aggregate_roll(roll: dict):
+        files = roll[FilmRollIndex.json_key_files].values()
+
+        roll[FilmRollIndex.json_key_film_types] = sorted(
+            {tuple(entry[FilmRollIndex.json_key_film_type]) for entry in files}
+        )
+        roll[FilmRollIndex.json_key_cameras] = sorted({tuple(entry[FilmRollIndex.json_key_camera]) for entry in files})
+        roll[FilmRollIndex.json_key_lenses] = sorted({entry[FilmRollIndex.json_key_lens] for entry in files})
@@ -1,3 +1,4 @@
+import typing
 from enum import Enum
 
 from rich.progress import Progress
@@ -5,6 +6,7 @@ from rich.progress import Progress
 from entities.checker import HiddenChecker, Checker
 from entities.filename import FileName, FileNameTypeError
 from util.helpers import Printer, Util
+from util.pipeline import ProcessExecutor
 
 
 class FilterType(Enum):
@@ -19,6 +21,7 @@ class Filter:
             HiddenChecker()
         ]
         self.filtered_file_names = []
+        self.num_skipped = 0
         self.step_count = 1
         self.total_steps = 1
 
@@ -59,6 +62,16 @@ class Filter:
 
         return self.filtered_file_names
 
+    def filter_stream(self, file_names: typing.Iterable[str]):
+        # yields passing names in the order given without printing or keeping them, for very large listings
+        self.num_skipped = 0
+
+        for file_name in file_names:
+            if self._check_string_name(file_name)[0]:
+                yield file_name
+            else:
+                self.num_skipped += 1
+
     def _check_string_name(self, file_name: str):
         for checker in self.checkers:
             if checker.checks_strings and not checker.check_string(file_name):
@@ -106,6 +119,8 @@ class FormattedFilter(Filter):
 
         Printer.console.print(f"\n{Printer.color_title}✂️  Filtering for formatted file names! ✂️\n")
 
+        parsed_file_names = ProcessExecutor.map_chunks_if_large(FileName.parse_batch, sorted_file_names)
+
         with Progress(console=Printer.console, auto_refresh=False) as progress:
             progress_task = progress.add_task(
                 Printer.progress_label_with_steps(
@@ -116,24 +131,27 @@ class FormattedFilter(Filter):
                 total=num_files
             )
 
-            for count, file_name in enumerate(sorted_file_names):
+            for count, (file_name, (fields, error_message)) in enumerate(zip(sorted_file_names, parsed_file_names)):
                 progress.update(progress_task, completed=count)
                 progress.refresh()
-                try:
-                    Printer.waiting(f"Checking file \[{file_name}]...")
-                    file_name_object = FileName.from_string(file_name)
-
-                    checks_pass, message = self.__check_formatted_name(file_name_object)
 
-                    if not checks_pass:
-                        Filter.print_skip(file_name, message)
-                        continue
+                Printer.waiting(f"Checking file \[{file_name}]...")
 
-                    self.filtered_file_names.append(file_name)
-                    self.filtered_file_name_objects.append(file_name_object)
-                except FileNameTypeError as error:
+                if not fields:
                     Printer.warning(f"Skipping \[{file_name}] as it is unformatted!", prefix=Printer.tab)
-                    Printer.warning(error.message, prefix=Printer.tab)
+                    Printer.warning(error_message, prefix=Printer.tab)
+                    continue
+
+                file_name_object = FileName.from_fields(fields)
+
+                checks_pass, message = self.__check_formatted_name(file_name_object)
+
+                if not checks_pass:
+                    Filter.print_skip(file_name, message)
+                    continue
+
+                self.filtered_file_names.append(file_name)
+                self.filtered_file_name_objects.append(file_name_object)
 
             progress.update(progress_task, completed=num_files)
 
@@ -143,6 +161,21 @@ class FormattedFilter(Filter):
 
         return self.filtered_file_name_objects
 
+    def filter_stream(self, file_names: typing.Iterable[str]):
+        self.num_skipped = 0
+
+        for file_name in file_names:
+            try:
+                file_name_object = FileName.from_string(file_name)
+            except FileNameTypeError:
+                self.num_skipped += 1
+                continue
+
+            if self.__check_formatted_name(file_name_object)[0]:
+                yield file_name
+            else:
+                self.num_skipped += 1
+
     def __check_formatted_name(self, file_name_object: FileName):
         for checker in self.checkers:
             if not checker.check(file_name_object):
@@ -188,6 +221,8 @@ class UnformattedFilter(Filter):
 
         Printer.console.print(f"\n{Printer.color_title}✂️  Filtering for unformatted file names! ✂️\n")
 
+        parsed_file_names = ProcessExecutor.map_chunks_if_large(FileName.parse_batch, sorted_file_names)
+
         with Progress(console=Printer.console, auto_refresh=False) as progress:
             progress_task = progress.add_task(
                 Printer.progress_label_with_steps(
@@ -198,7 +233,7 @@ class UnformattedFilter(Filter):
                 total=num_files
             )
 
-            for count, file_name in enumerate(sorted_file_names):
+            for count, (file_name, (fields, _)) in enumerate(zip(sorted_file_names, parsed_file_names)):
                 progress.update(progress_task, completed=count)
                 progress.refresh()
 
@@ -208,12 +243,13 @@ class UnformattedFilter(Filter):
                     Filter.print_skip(file_name, message)
                     continue
 
-                try:
-                    Printer.waiting(f"Checking file \[{file_name}]...")
-                    FileName.from_string(file_name)
+                Printer.waiting(f"Checking file \[{file_name}]...")
+
+                if fields:
                     Printer.warning(f"Skipping \[{file_name}] as it is formatted!", prefix=Printer.tab)
-                except FileNameTypeError:
-                    self.filtered_file_names.append(file_name)
+                    continue
+
+                self.filtered_file_names.append(file_name)
 
             progress.update(progress_task, completed=num_files)
 
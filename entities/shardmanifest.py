@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import re
+
+from util.helpers import Util
+
+
+class ShardManifestError(ValueError):
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(self.message)
+
+
+class ShardManifest:
+    version = 1
+
+    file_name_format = "shard-{}-of-{}.json"
+    file_name_pattern = re.compile(r"^shard-(\d+)-of-(\d+)\.json$")
+    merged_file_name = "merged.json"
+
+    json_key_version = "version"
+    json_key_shard_index = "shard_index"
+    json_key_shard_count = "shard_count"
+    json_key_directory = "directory"
+    json_key_extensions = "extensions"
+    json_key_files = "files"
+    json_key_shards = "shards"
+
+    def __init__(
+            self,
+            shard_index: int,
+            shard_count: int,
+            directory: str,
+            extensions: list[str],
+            files: dict[str, list[str]] = None
+    ):
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.directory = directory
+        self.extensions = sorted(extension.upper() for extension in extensions)
+        # source file name to its output paths relative to the directory
+        self.files = {} if files is None else files
+
+    @property
+    def file_name(self):
+        return ShardManifest.file_name_format.format(self.shard_index, self.shard_count)
+
+    def save(self, manifest_directory: str):
+        os.makedirs(manifest_directory, exist_ok=True)
+        path = os.path.join(manifest_directory, self.file_name)
+
+        with open(path, "w") as manifest_file:
+            json.dump(
+                {
+                    ShardManifest.json_key_version: ShardManifest.version,
+                    ShardManifest.json_key_shard_index: self.shard_index,
+                    ShardManifest.json_key_shard_count: self.shard_count,
+                    ShardManifest.json_key_directory: self.directory,
+                    ShardManifest.json_key_extensions: self.extensions,
+                    ShardManifest.json_key_files: dict(sorted(self.files.items()))
+                },
+                manifest_file,
+                indent=2
+            )
+
+        return path
+
+    @staticmethod
+    def load(path: str):
+        try:
+            with open(path) as manifest_file:
+                manifest_json = json.load(manifest_file)
+
+            version = manifest_json[ShardManifest.json_key_version]
+            manifest = ShardManifest(
+                manifest_json[ShardManifest.json_key_shard_index],
+                manifest_json[ShardManifest.json_key_shard_count],
+                manifest_json[ShardManifest.json_key_directory],
+                manifest_json[ShardManifest.json_key_extensions],
+                manifest_json[ShardManifest.json_key_files]
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            raise ShardManifestError(f"Could not read shard manifest \[{path}]!")
+
+        if version != ShardManifest.version:
+            raise ShardManifestError(f"Shard manifest \[{path}] has unsupported version \[{version}]!")
+
+        return manifest
+
+    @staticmethod
+    def parse_shard(shard: str):
+        # shards are written as i/n and numbered from one so that 1/4 to 4/4 cover the whole run
+        try:
+            shard_index, shard_count = (int(part) for part in shard.split("/"))
+        except ValueError:
+            raise ShardManifestError(f"Shard \[{shard}] should be in the form \[i/n]!")
+
+        if not 1 <= shard_index <= shard_count:
+            raise ShardManifestError(f"Shard \[{shard}] should have an index between 1 and {shard_count}!")
+
+        return shard_index, shard_count
+
+    @staticmethod
+    def shard_of(file_name: str, shard_count: int):
+        # siblings hash by their shared stem so a capture is never split across shards, and the hash does not
+        # depend on the interpreter like the builtin hash does
+        stem = Util.split_extension(file_name)[0]
+        digest = hashlib.blake2b(stem.encode("utf-8"), digest_size=8).digest()
+
+        return int.from_bytes(digest, "big") % shard_count + 1
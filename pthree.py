@@ -2,15 +2,24 @@ import typing
 
 import typer
 
-from commands.exif import Exif
+from commands.audit import Audit
+from commands.dupes import Dupes
+from commands.exif import Exif, SidecarType
 from commands.film import Film
-from commands.info import Info
+from commands.info import Info, InfoFormat
+from commands.ingest import Ingest
 from commands.list import List
+from commands.merge import Merge
 from commands.process import Process
+from commands.query import Query, QueryFormat
 from commands.rename import Rename
+from commands.search import Search
 from commands.texif import Texif, Preset, TexifType, TexifLevel
+from commands.watch import Watch
 from commands.yank import Yank
 from entities.filename import FileNameChunk
+from util.config import Config
+from util.helpers import Printer
 
 app = typer.Typer(help="Utility scripts to assist in renaming and generating metadata files for digital photos.")
 
@@ -38,6 +47,44 @@ def process(
             "-r",
             help="Assuming the specified directory is a previous output folder, regenerates meta folder and files."
         ),
+        incremental: bool = typer.Option(
+            False,
+            "--incremental",
+            "-i",
+            help="Keep existing output and only regenerate missing or out of date files."
+        ),
+        batch: bool = typer.Option(
+            False,
+            "--batch",
+            "-b",
+            help="Render simple TEXIFs from chunked tag reads, and batch exiftool calls for full TEXIFs and EXIFs."
+        ),
+        bundle: bool = typer.Option(
+            False,
+            "--bundle",
+            help="Generate every sidecar for a file back to back instead of one stage at a time."
+        ),
+        stream: bool = typer.Option(
+            False,
+            "--stream",
+            help="Stream each file through rename and sidecar generation instead of one stage at a time."
+        ),
+        workers: typing.Optional[int] = typer.Option(
+            None,
+            "--workers",
+            "-w",
+            min=1,
+            show_default=False,
+            help="The number of concurrent workers for sidecar generation, the exiftool pool size when streaming "
+                 "and 1 otherwise by default."
+        ),
+        sidecars: typing.Optional[typing.List[SidecarType]] = typer.Option(
+            [],
+            "--sidecar",
+            "-s",
+            case_sensitive=False,
+            help="Additional sidecar(s) to generate next to the MIE sidecar."
+        ),
         preset: typing.Optional[Preset] = typer.Option(
             Preset.auto,
             "--preset",
@@ -52,15 +99,328 @@ def process(
             "-f",
             help="Add filter(s) to determine which files to process."
         ),
+        extensions: typing.Optional[typing.List[str]] = typer.Option(
+            ["JPG"],
+            "--extension",
+            "--ext",
+            "-x",
+            help="The extension(s) of files to process, siblings sharing a name are renamed together."
+        ),
+        sources: typing.Optional[typing.List[str]] = typer.Option(
+            [],
+            "--source",
+            "-S",
+            help="Additional source directories to ingest alongside the directory argument, each into its own "
+                 "output folder."
+        ),
+        manifest: typing.Optional[str] = typer.Option(
+            None,
+            "--manifest",
+            "-m",
+            help="A file listing additional source directories, one per line."
+        ),
+        shard: typing.Optional[str] = typer.Option(
+            None,
+            "--shard",
+            help="Only reprocess shard i/n of the files, partitioned by a stable hash of the file name."
+        ),
+        catalog: bool = typer.Option(
+            False,
+            "--catalog",
+            help="Record processed files, their tags and sidecars in the SQLite catalog used by the query command."
+        )
+):
+    directories = [directory, *sources, *(Ingest.read_manifest(manifest) if manifest else [])]
+
+    if len(directories) > 1:
+        if shard:
+            Printer.error_and_abort("Sharding is not supported when ingesting several sources!")
+        # several sources are always streamed, which has no batched or bundled stages
+        if batch or bundle:
+            Printer.error_and_abort("\[--batch] and \[--bundle] are not supported when ingesting several sources!")
+
+        Ingest(
+            directories,
+            output_directory,
+            keep_original,
+            reprocess,
+            preset,
+            filter_files,
+            extensions,
+            incremental,
+            sidecars,
+            workers,
+            catalog
+        ).ingest()
+        return
+
+    Process(
+        directory,
+        output_directory,
+        keep_original,
+        reprocess,
+        preset,
+        filter_files,
+        extensions,
+        incremental,
+        batch,
+        bundle,
+        sidecars,
+        stream,
+        workers,
+        shard,
+        catalog
+    ).process()
+
+
+@app.command(help="Watches an inbox and processes new photos as soon as they are fully written.")
+def watch(
+        directory: str = typer.Argument(
+            "./",
+            help="The inbox directory to watch for new photos."
+        ),
+        output_directory: str = typer.Argument(
+            "output",
+            help="The directory to output the results of processing."
+        ),
+        keep_original: bool = typer.Option(
+            False,
+            "--keep-original",
+            "--keep",
+            "-k",
+            help="Leave original files untouched, copy then rename."
+        ),
+        existing: bool = typer.Option(
+            False,
+            "--existing",
+            "-e",
+            help="Also process files that are already in the inbox when watching starts."
+        ),
+        poll: bool = typer.Option(
+            False,
+            "--poll",
+            help="Poll the inbox for changes instead of using inotify."
+        ),
+        workers: int = typer.Option(
+            Config.pipeline_workers,
+            "--workers",
+            "-w",
+            min=1,
+            help="The number of warm exiftool workers to use for sidecar generation."
+        ),
+        sidecars: typing.Optional[typing.List[SidecarType]] = typer.Option(
+            [],
+            "--sidecar",
+            "-s",
+            case_sensitive=False,
+            help="Additional sidecar(s) to generate next to the MIE sidecar."
+        ),
+        preset: typing.Optional[Preset] = typer.Option(
+            Preset.auto,
+            "--preset",
+            "-p",
+            case_sensitive=False,
+            help="The TEXIF file format preset to use."
+        ),
+        extensions: typing.Optional[typing.List[str]] = typer.Option(
+            ["JPG"],
+            "--extension",
+            "--ext",
+            "-x",
+            help="The extension(s) of files to process, siblings sharing a name are renamed together."
+        )
+):
+    Watch(
+        directory,
+        output_directory,
+        keep_original,
+        preset,
+        extensions,
+        sidecars,
+        workers,
+        poll,
+        existing
+    ).watch()
+
+
+@app.command(help="Validates and combines the shard manifests written by process --shard.")
+def merge_shards(
+        directory: str = typer.Argument(
+            "./",
+            help="The directory that was reprocessed in shards."
+        ),
+        check_outputs: bool = typer.Option(
+            True,
+            "--check-outputs/--no-check-outputs",
+            help="Check that every output file listed in the manifests exists."
+        )
+):
+    Merge(directory, check_outputs).merge()
+
+
+@app.command(help="Checks renamed files against their EXIF date time and their sidecars across an archive.")
+def audit(
+        directory: str = typer.Argument(
+            "./",
+            help="The archive directory to audit recursively."
+        ),
+        extensions: typing.Optional[typing.List[str]] = typer.Option(
+            ["JPG"],
+            "--extension",
+            "--ext",
+            "-x",
+            help="The extension(s) of files to audit."
+        ),
+        report_path: typing.Optional[str] = typer.Option(
+            None,
+            "--report",
+            "-r",
+            help="Also write the problems found to this JSON file."
+        ),
+        workers: int = typer.Option(
+            Config.exiftool_pool_size,
+            "--workers",
+            "-w",
+            min=1,
+            help="The number of exiftool processes reading date times at once."
+        )
+):
+    Audit(directory, extensions, report_path, workers).audit()
+
+
+@app.command(help="Finds files with identical content anywhere under a library.")
+def dupes(
+        root: str = typer.Argument(
+            "./",
+            help="The library directory to search recursively."
+        ),
+        report_path: typing.Optional[str] = typer.Option(
+            None,
+            "--report",
+            "-r",
+            help="Also write the duplicate sets to this JSON file."
+        ),
+        workers: int = typer.Option(
+            Config.yank_workers,
+            "--workers",
+            "-w",
+            min=1,
+            help="The number of files to hash at once."
+        ),
+        min_size: int = typer.Option(
+            1,
+            "--min-size",
+            help="Ignore files smaller than this many bytes."
+        )
+):
+    Dupes(root, report_path, workers, min_size).dupes()
+
+
+@app.command(help="Queries the catalog of renamed and processed files.")
+def query(
+        initials: typing.Optional[str] = typer.Option(
+            None,
+            "--initials",
+            help="Only files with these initials."
+        ),
+        styles: typing.Optional[typing.List[str]] = typer.Option(
+            [],
+            "--style",
+            "-s",
+            help="Only files with one of these style names."
+        ),
+        ratings: typing.Optional[typing.List[str]] = typer.Option(
+            [],
+            "--rating",
+            "-r",
+            help="Only files with one of these rating names."
+        ),
+        min_rating: typing.Optional[str] = typer.Option(
+            None,
+            "--min-rating",
+            help="Only files rated at least this rating name."
+        ),
+        year: typing.Optional[int] = typer.Option(
+            None,
+            "--year",
+            "-y",
+            help="Only files taken in this year."
+        ),
+        after: typing.Optional[str] = typer.Option(
+            None,
+            "--after",
+            help="Only files taken on or after this date, as YYYYMMDD."
+        ),
+        before: typing.Optional[str] = typer.Option(
+            None,
+            "--before",
+            help="Only files taken before this date, as YYYYMMDD."
+        ),
         extension: typing.Optional[str] = typer.Option(
-            "JPG",
+            None,
             "--extension",
             "--ext",
             "-x",
-            help="The extension of files to process."
+            help="Only files with this extension."
+        ),
+        tags: typing.Optional[typing.List[str]] = typer.Option(
+            [],
+            "--tag",
+            "-t",
+            help="Only files whose catalogued tag has this value, as Tag=Value."
+        ),
+        output_format: QueryFormat = typer.Option(
+            QueryFormat.paths,
+            "--format",
+            "-F",
+            case_sensitive=False,
+            help="Print matching paths, or every catalogued column as csv or json."
+        ),
+        limit: typing.Optional[int] = typer.Option(
+            None,
+            "--limit",
+            "-n",
+            min=1,
+            help="Print at most this many files."
         )
 ):
-    Process(directory, output_directory, keep_original, reprocess, preset, filter_files, extension).process()
+    Query(
+        initials,
+        styles,
+        ratings,
+        min_rating,
+        year,
+        after,
+        before,
+        extension,
+        tags,
+        output_format,
+        limit
+    ).query()
+
+
+@app.command(help="Searches the tags indexed from simple TEXIFs.")
+def search(
+        terms: typing.List[str] = typer.Argument(
+            ...,
+            help="An FTS5 query, e.g. '\"Classic Chrome\" \"FNumber 1.4\"'."
+        ),
+        output_format: QueryFormat = typer.Option(
+            QueryFormat.paths,
+            "--format",
+            "-F",
+            case_sensitive=False,
+            help="Print matching paths, or every catalogued column as csv or json."
+        ),
+        limit: typing.Optional[int] = typer.Option(
+            None,
+            "--limit",
+            "-n",
+            min=1,
+            help="Print at most this many files, best matches first."
+        )
+):
+    Search(terms, output_format, limit).search()
 
 
 @app.command(help="Rename photos into a consistent format.")
@@ -94,15 +454,34 @@ def rename(
             "-f",
             help="Add filter(s) to determine which files to rename."
         ),
-        extension: typing.Optional[str] = typer.Option(
-            "JPG",
+        extensions: typing.Optional[typing.List[str]] = typer.Option(
+            ["JPG"],
             "--extension",
             "--ext",
             "-x",
-            help="The extension of files to rename."
+            help="The extension(s) of files to rename, siblings sharing a name are renamed together."
+        ),
+        skip_duplicates: bool = typer.Option(
+            False,
+            "--skip-duplicates",
+            help="Keep the output directory and skip files whose content it holds, tracked in content-index.json."
+        ),
+        catalog: bool = typer.Option(
+            False,
+            "--catalog",
+            help="Record renamed files in the SQLite catalog used by the query command."
         )
 ):
-    Rename(directory, output_directory, keep_original, edit, filter_files, extension).rename()
+    Rename(
+        directory,
+        output_directory,
+        keep_original,
+        edit,
+        filter_files,
+        extensions,
+        skip_duplicates,
+        catalog
+    ).rename()
 
 
 @app.command(help="Generates text EXIF files for photos.")
@@ -143,15 +522,57 @@ def texif(
             "-f",
             help="Add filter(s) to determine which files to generate TEXIFs for."
         ),
+        incremental: bool = typer.Option(
+            False,
+            "--incremental",
+            "-i",
+            help="Keep existing output and only regenerate missing or out of date files."
+        ),
+        batch: bool = typer.Option(
+            False,
+            "--batch",
+            "-b",
+            help="Render simple TEXIFs from chunked tag reads, and generate full TEXIFs in one exiftool call."
+        ),
+        workers: int = typer.Option(
+            1,
+            "--workers",
+            "-w",
+            min=1,
+            help="The number of concurrent exiftool workers to use."
+        ),
         extension: typing.Optional[str] = typer.Option(
             "JPG",
             "--extension",
             "--ext",
             "-x",
             help="The extension of files to generate TEXIFs for."
+        ),
+        catalog: bool = typer.Option(
+            False,
+            "--catalog",
+            help="Record files, their tags and TEXIFs in the SQLite catalog used by the query command."
+        ),
+        search: bool = typer.Option(
+            False,
+            "--search",
+            help="Also index the tags of each simple TEXIF for the search command, implies --catalog."
         )
 ):
-    Texif(directory, output_directory, type, level, preset, filter_files, extension).texif()
+    Texif(
+        directory,
+        output_directory,
+        type,
+        level,
+        preset,
+        filter_files,
+        extension,
+        incremental,
+        batch,
+        workers,
+        catalog,
+        search
+    ).texif()
 
 
 @app.command(help="Generates EXIF files for photos.")
@@ -171,6 +592,32 @@ def exif(
             "-f",
             help="Add filter(s) to determine which files to generate EXIFs for."
         ),
+        incremental: bool = typer.Option(
+            False,
+            "--incremental",
+            "-i",
+            help="Keep existing output and only regenerate missing or out of date files."
+        ),
+        batch: bool = typer.Option(
+            False,
+            "--batch",
+            "-b",
+            help="Generate EXIFs with batched exiftool invocations split across an exiftool pool."
+        ),
+        sidecars: typing.Optional[typing.List[SidecarType]] = typer.Option(
+            [],
+            "--sidecar",
+            "-s",
+            case_sensitive=False,
+            help="Additional sidecar(s) to generate next to the MIE sidecar."
+        ),
+        workers: int = typer.Option(
+            1,
+            "--workers",
+            "-w",
+            min=1,
+            help="The number of concurrent exiftool workers to use."
+        ),
         extension: typing.Optional[str] = typer.Option(
             "JPG",
             "--extension",
@@ -179,7 +626,7 @@ def exif(
             help="The extension of files to generate EXIFs for."
         )
 ):
-    Exif(directory, output_directory, filter_files, extension).exif()
+    Exif(directory, output_directory, filter_files, extension, incremental, batch, sidecars, workers).exif()
 
 
 @app.command(help="Decodes and displays information of renamed files.")
@@ -201,9 +648,21 @@ def info(
             "--ext",
             "-x",
             help="The extension of files to list information for."
+        ),
+        output_format: InfoFormat = typer.Option(
+            InfoFormat.pretty,
+            "--format",
+            "-F",
+            case_sensitive=False,
+            help="How to print the decoded file names, csv and json are written to stdout alone for piping."
+        ),
+        summary: bool = typer.Option(
+            False,
+            "--summary",
+            help="Print counts per style, rating, day and initials instead of one entry per file."
         )
 ):
-    Info(directory, filter_files, extension).info()
+    Info(directory, filter_files, extension, output_format, summary).info()
 
 
 @app.command(help="Moves or copies files to a different location.")
@@ -236,9 +695,41 @@ def yank(
             "--ext",
             "-x",
             help="The extension of files to yank."
+        ),
+        verify: bool = typer.Option(
+            False,
+            "--verify",
+            help="Re-read every copied file and compare it against the checksum taken while copying."
+        ),
+        workers: int = typer.Option(
+            Config.yank_workers,
+            "--workers",
+            "-w",
+            min=1,
+            help="The number of files to transfer at once."
+        ),
+        skip_duplicates: bool = typer.Option(
+            False,
+            "--skip-duplicates",
+            help="Keep the output directory and skip files whose content it holds, tracked in content-index.json."
+        ),
+        catalog: bool = typer.Option(
+            False,
+            "--catalog",
+            help="Record yanked files and their content hashes in the SQLite catalog used by the query command."
         )
 ):
-    Yank(directory, output_directory, keep_original, filter_files, extension).yank()
+    Yank(
+        directory,
+        output_directory,
+        keep_original,
+        filter_files,
+        extension,
+        verify,
+        workers,
+        skip_duplicates,
+        catalog
+    ).yank()
 
 
 @app.command(help="Lists files in the specified directory.")
@@ -252,7 +743,7 @@ def list(
             "--output-directory",
             "--output",
             "-o",
-            help="The directory to output a text file containing the list of photos."
+            help="The directory to output a text file containing the list of photos, otherwise names are printed alone."
         ),
         complete_path: bool = typer.Option(
             False,
@@ -274,9 +765,14 @@ def list(
             "--ext",
             "-x",
             help="The extension of files to list."
+        ),
+        sort: bool = typer.Option(
+            True,
+            "--sort/--no-sort",
+            help="Sort the list by name, or keep directory order to start output immediately."
         )
 ):
-    List(directory, output_directory, complete_path, filter_files, extension).ls()
+    List(directory, output_directory, complete_path, filter_files, extension, sort).ls()
 
 
 @app.command(help="Generates human readable metadata from EXIF tagged film photos for Instagram.")
@@ -302,9 +798,15 @@ def film(
             "--ext",
             "-x",
             help="The extension of files to generate metadata for."
+        ),
+        incremental: bool = typer.Option(
+            False,
+            "--incremental",
+            "-i",
+            help="Keep the existing film roll index and only read metadata for new or changed files."
         )
 ):
-    Film(directory, output_directory, filter_files, extension).film()
+    Film(directory, output_directory, filter_files, extension, incremental).film()
 
 
 def main():
@@ -0,0 +1,356 @@
+import hashlib
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+import typing
+
+from entities.filename import FileName, FileNameTypeError
+from util.config import Config
+from util.helpers import Util, Printer
+
+
+class Catalog:
+    # bump whenever a table changes shape, tables that are only added are created when an older catalog is opened
+    schema_version = 1
+
+    sidecar_texif_simple = "texif_simple"
+    sidecar_texif_full = "texif_full"
+
+    file_columns = [
+        "path",
+        "directory",
+        "file_name",
+        "extension",
+        "initials",
+        "date_time",
+        "sequence",
+        "style",
+        "rating",
+        "original",
+        "size",
+        "mtime_ns",
+        "digest",
+        "updated_at"
+    ]
+
+    schema = [
+        """
+        CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY,
+            directory TEXT NOT NULL,
+            file_name TEXT NOT NULL,
+            extension TEXT NOT NULL,
+            initials TEXT,
+            date_time TEXT,
+            sequence INTEGER,
+            style TEXT,
+            rating INTEGER,
+            original TEXT,
+            size INTEGER,
+            mtime_ns INTEGER,
+            digest TEXT,
+            updated_at REAL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS files_date_time ON files (date_time)",
+        "CREATE INDEX IF NOT EXISTS files_style ON files (style, date_time)",
+        "CREATE INDEX IF NOT EXISTS files_rating ON files (rating, date_time)",
+        "CREATE INDEX IF NOT EXISTS files_initials ON files (initials, date_time)",
+        """
+        CREATE TABLE IF NOT EXISTS tags (
+            path TEXT NOT NULL REFERENCES files (path) ON DELETE CASCADE ON UPDATE CASCADE,
+            tag TEXT NOT NULL,
+            value TEXT,
+            PRIMARY KEY (path, tag)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS tags_tag_value ON tags (tag, value)",
+        """
+        CREATE TABLE IF NOT EXISTS sidecars (
+            path TEXT NOT NULL REFERENCES files (path) ON DELETE CASCADE ON UPDATE CASCADE,
+            kind TEXT NOT NULL,
+            sidecar_path TEXT NOT NULL,
+            PRIMARY KEY (path, kind)
+        ) WITHOUT ROWID
+        """,
+        # search rows are linked through documents so that they follow a moved file like its tags do
+        """
+        CREATE TABLE IF NOT EXISTS search_documents (
+            id INTEGER PRIMARY KEY,
+            path TEXT NOT NULL UNIQUE REFERENCES files (path) ON DELETE CASCADE ON UPDATE CASCADE,
+            fingerprint TEXT NOT NULL
+        )
+        """,
+        # values like 1.4 or 1/250 are split into tokens, a quoted phrase still matches them in order
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search USING fts5 (document)",
+        """
+        CREATE TRIGGER IF NOT EXISTS search_documents_delete AFTER DELETE ON search_documents BEGIN
+            DELETE FROM search WHERE rowid = old.id;
+        END
+        """
+    ]
+
+    def __init__(
+            self,
+            path: str = Config.catalog_path,
+            commit_interval: int = Config.catalog_commit_interval,
+            read_only: bool = False
+    ):
+        self.path = path
+        self.read_only = read_only
+        self.commit_interval = commit_interval
+        self.connection: sqlite3.Connection = None
+        self.__num_pending = 0
+        # stages write from several threads so every statement goes through one lock and one connection
+        self.__lock = threading.RLock()
+
+    def __enter__(self):
+        if self.read_only:
+            return self.__open_read_only()
+
+        directory = os.path.dirname(self.path)
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.execute("BEGIN")
+        self.__check_version(newer_only=True)
+
+        for statement in Catalog.schema:
+            self.connection.execute(statement)
+
+        self.connection.execute(f"PRAGMA user_version = {Catalog.schema_version}")
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        with self.__lock:
+            if not self.read_only:
+                self.connection.execute("COMMIT")
+
+            self.connection.close()
+            self.connection = None
+
+    def __open_read_only(self):
+        # queries never create, migrate or otherwise touch the catalog they read
+        if not os.path.isfile(self.path):
+            Printer.error_and_abort(
+                f"There is no catalog at \[{self.path}], run rename, texif, process or yank with \[--catalog] first!"
+            )
+
+        self.connection = sqlite3.connect(
+            f"{pathlib.Path(os.path.abspath(self.path)).as_uri()}?mode=ro",
+            uri=True,
+            check_same_thread=False
+        )
+        self.__check_version(newer_only=False)
+
+        return self
+
+    def __check_version(self, newer_only: bool):
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+
+        if version > Catalog.schema_version:
+            message = f"Catalog \[{self.path}] was written by a newer version of pthree, refusing to use it!"
+        elif version < Catalog.schema_version and not newer_only:
+            message = f"Catalog \[{self.path}] is out of date, run a command with \[--catalog] to upgrade it!"
+        else:
+            return
+
+        self.connection.close()
+        self.connection = None
+        Printer.error_and_abort(message)
+
+    def record_file(self, path: str, previous_path: str = None, digest: str = None):
+        path = os.path.abspath(path)
+
+        with self.__lock:
+            # a moved file keeps its tags and sidecars, the foreign keys follow the new path
+            if previous_path and not os.path.exists(previous_path):
+                self.connection.execute(
+                    "UPDATE OR REPLACE files SET path = ? WHERE path = ?",
+                    (path, os.path.abspath(previous_path))
+                )
+
+            updated_columns = [column for column in Catalog.file_columns[1:] if column != "digest"]
+
+            # a digest is only kept while the file still has the size and modification time it was taken at
+            self.connection.execute(
+                f"""
+                INSERT INTO files ({", ".join(Catalog.file_columns)})
+                VALUES ({", ".join("?" for _ in Catalog.file_columns)})
+                ON CONFLICT (path) DO UPDATE SET
+                {", ".join(f"{column} = excluded.{column}" for column in updated_columns)},
+                digest = CASE
+                    WHEN excluded.digest IS NOT NULL THEN excluded.digest
+                    WHEN files.size IS excluded.size AND files.mtime_ns IS excluded.mtime_ns THEN files.digest
+                END
+                """,
+                Catalog.__file_row(path, digest)
+            )
+            self.__count_write()
+
+    def record_tags(self, path: str, file_tags: dict):
+        path = self.__ensure_file(path)
+
+        with self.__lock:
+            self.connection.execute("DELETE FROM tags WHERE path = ?", (path,))
+            self.connection.executemany(
+                "INSERT INTO tags (path, tag, value) VALUES (?, ?, ?)",
+                ((path, tag, str(value)) for tag, value in file_tags.items())
+            )
+            self.__count_write()
+
+    def record_sidecar(self, path: str, kind: str, sidecar_path: str):
+        path = self.__ensure_file(path)
+
+        with self.__lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO sidecars (path, kind, sidecar_path) VALUES (?, ?, ?)",
+                (path, kind, os.path.abspath(sidecar_path))
+            )
+            self.__count_write()
+
+    def record_search(self, path: str, file_tags: dict):
+        # the document is only rewritten when its fingerprint changed, so re-indexing costs what changed
+        path = self.__ensure_file(path)
+        document = Catalog.search_document(file_tags)
+        fingerprint = hashlib.blake2b(document.encode(), digest_size=16).hexdigest()
+
+        with self.__lock:
+            row = self.connection.execute(
+                "SELECT id, fingerprint FROM search_documents WHERE path = ?",
+                (path,)
+            ).fetchone()
+
+            if row and row[1] == fingerprint:
+                return False
+
+            if row:
+                document_id = row[0]
+                self.connection.execute(
+                    "UPDATE search_documents SET fingerprint = ? WHERE id = ?",
+                    (fingerprint, document_id)
+                )
+                self.connection.execute("DELETE FROM search WHERE rowid = ?", (document_id,))
+            else:
+                document_id = self.connection.execute(
+                    "INSERT INTO search_documents (path, fingerprint) VALUES (?, ?)",
+                    (path, fingerprint)
+                ).lastrowid
+
+            self.connection.execute("INSERT INTO search (rowid, document) VALUES (?, ?)", (document_id, document))
+            self.__count_write()
+
+        return True
+
+    def is_searchable(self, path: str):
+        with self.__lock:
+            return self.connection.execute(
+                "SELECT 1 FROM search_documents WHERE path = ?",
+                (os.path.abspath(path),)
+            ).fetchone() is not None
+
+    def search(self, match: str, limit: int = None):
+        sql = f"""
+            SELECT {', '.join(f"files.{column}" for column in Catalog.file_columns[:-1])}
+            FROM search
+            JOIN search_documents ON search_documents.id = search.rowid
+            JOIN files ON files.path = search_documents.path
+            WHERE search MATCH ?
+            ORDER BY search.rank
+        """
+
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+
+        yield from self.__fetch(sql, (match,))
+
+    @staticmethod
+    def search_document(file_tags: dict):
+        return "\n".join(f"{tag} {value}" for tag, value in sorted(file_tags.items()))
+
+    def query(self, where: list[str], parameters: list[typing.Any], limit: int = None):
+        sql = f"SELECT {', '.join(Catalog.file_columns[:-1])} FROM files"
+
+        if where:
+            sql += f" WHERE {' AND '.join(where)}"
+
+        sql += " ORDER BY date_time, sequence, path"
+
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+
+        yield from self.__fetch(sql, parameters)
+
+    def __fetch(self, sql: str, parameters: typing.Sequence[typing.Any]):
+        # the lock is only held while fetching, so a caller that stops iterating never keeps it
+        with self.__lock:
+            cursor = self.connection.execute(sql, parameters)
+
+        while True:
+            with self.__lock:
+                rows = cursor.fetchmany(Config.catalog_fetch_size)
+
+            if not rows:
+                break
+
+            yield from rows
+
+    def __ensure_file(self, path: str):
+        path = os.path.abspath(path)
+
+        with self.__lock:
+            if not self.connection.execute("SELECT 1 FROM files WHERE path = ?", (path,)).fetchone():
+                self.record_file(path)
+
+        return path
+
+    def __count_write(self):
+        self.__num_pending += 1
+
+        if self.__num_pending >= self.commit_interval:
+            self.connection.execute("COMMIT")
+            self.connection.execute("BEGIN")
+            self.__num_pending = 0
+
+    @staticmethod
+    def __file_row(path: str, digest: str = None):
+        file_name = os.path.basename(path)
+
+        try:
+            file_name_object = FileName.from_string(file_name)
+            initials, date_time, sequence, _, rating, original = file_name_object.to_fields()
+            initials, style = initials.upper(), file_name_object.style.name
+        except FileNameTypeError:
+            # unformatted files are still catalogued, they just cannot be queried by their name chunks
+            initials, date_time, sequence, style, rating, original = None, None, None, None, None, None
+
+        try:
+            stat = os.stat(path)
+            size, mtime_ns = stat.st_size, stat.st_mtime_ns
+        except OSError:
+            size, mtime_ns = None, None
+
+        return (
+            path,
+            os.path.dirname(path),
+            file_name,
+            Util.split_extension(file_name)[1].upper(),
+            initials,
+            date_time,
+            sequence,
+            style,
+            rating,
+            original,
+            size,
+            mtime_ns,
+            digest,
+            time.time()
+        )
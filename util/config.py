@@ -1,9 +1,37 @@
+import os
+
 from entities.rating import Rating
 from entities.style import Style
 
 
 class Config:
     exiftool_executable_path = "/usr/local/bin/exiftool"
+    exiftool_pool_size = min(os.cpu_count() or 1, 4)
+    exiftool_batch_size = 256
+    process_pool_workers = os.cpu_count() or 1
+    process_chunk_size = 2048
+    # below this many items the cost of starting worker processes outweighs the parallel speedup
+    process_pool_threshold = 8192
+    pipeline_queue_size = 64
+    pipeline_workers = exiftool_pool_size
+    writer_max_workers = 4
+    watch_poll_interval = 1.0
+    watch_settle_seconds = 2.0
+    writer_max_pending = 32
+    # names held in memory per sorted run before the run is spilled to a temporary file
+    list_sort_run_size = 200_000
+    list_write_buffer_size = 1024 * 1024
+    # transfers wait on disks rather than the interpreter so a few more threads than cores still help
+    yank_workers = 4
+    transfer_chunk_size = 1024 * 1024
+    # bytes read from each end of a file for the cheap content fingerprint
+    content_fingerprint_sample_size = 64 * 1024
+    # kept next to outputs that depend on settings, outputs older than it were generated with other settings
+    settings_stamp_name = ".pthree-settings"
+    catalog_path = os.path.join(os.path.expanduser("~"), ".local", "share", "pthree", "catalog.sqlite3")
+    # writes are committed in batches so a large rename or texif run does not pay for a transaction per file
+    catalog_commit_interval = 500
+    catalog_fetch_size = 1000
     file_name_delimiter = '-'
     file_name_date_format = f"%Y%m%d{file_name_delimiter}%H%M%S"
     file_name_date_length = 15
@@ -14,3 +42,6 @@ class Config:
     file_name_style_default = Style.none.name
     file_name_rating_default = Rating.none.name
     file_name_original_default = "ORIGINAL"
+
+    # extensions are ordered from cheapest to most expensive to read metadata from
+    sibling_extension_preference = ["JPG", "JPEG", "HIF", "HEIC", "TIF", "TIFF", "DNG", "RAF"]
@@ -1,6 +1,7 @@
 class Tags:
     JSONFormat = "J"
     HTMLDump = "HTMLDump"
+    SourceFile = "SourceFile"
     FileName = "FileName"
     FileType = "FileType"
     DateTimeOriginal = "DateTimeOriginal"
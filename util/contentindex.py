@@ -0,0 +1,231 @@
+import hashlib
+import json
+import os
+import threading
+import typing
+
+from util.config import Config
+from util.transfer import Transfer
+
+
+class ContentIndex:
+    version = 1
+
+    file_name = "content-index.json"
+
+    json_key_version = "version"
+    json_key_files = "files"
+    json_key_size = "size"
+    json_key_mtime = "mtime_ns"
+    json_key_fingerprint = "fingerprint"
+    json_key_digest = "digest"
+
+    ignored_file_names = {file_name, Transfer.manifest_file_name}
+
+    def __init__(self, directory: str, entries: dict[str, dict] = None):
+        self.directory = directory
+        # file name to its size and modification time, the fingerprint and digest are filled in when first needed
+        self.entries = {} if entries is None else entries
+        self.sizes: dict[int, set[str]] = {}
+        self.__lock = threading.Lock()
+        # sizes and fingerprints of sources that are being checked and transferred right now
+        self.__claims: set[tuple[int, str]] = set()
+        self.__claims_changed = threading.Condition()
+
+        for file_name, entry in self.entries.items():
+            self.sizes.setdefault(entry[ContentIndex.json_key_size], set()).add(file_name)
+
+    @staticmethod
+    def open(directory: str):
+        content_index = ContentIndex(directory, ContentIndex.load_entries(directory))
+        content_index.refresh()
+
+        return content_index
+
+    @staticmethod
+    def load_entries(directory: str):
+        path = os.path.join(directory, ContentIndex.file_name)
+
+        try:
+            with open(path) as index_file:
+                index_json = json.load(index_file)
+
+            if index_json[ContentIndex.json_key_version] == ContentIndex.version:
+                return index_json[ContentIndex.json_key_files]
+        except (OSError, ValueError, KeyError, TypeError):
+            # a missing or unreadable index is rebuilt from the directory, it only ever caches hashes
+            pass
+
+        return {}
+
+    @staticmethod
+    def cached_hashes(entry: typing.Optional[dict], size: int, mtime_ns: int):
+        # hashes are only trusted while the file still has the size and modification time they were taken at
+        if not entry or entry[ContentIndex.json_key_size] != size or entry[ContentIndex.json_key_mtime] != mtime_ns:
+            return None, None
+
+        return entry.get(ContentIndex.json_key_fingerprint), entry.get(ContentIndex.json_key_digest)
+
+    def refresh(self):
+        # only stats are compared here, files that changed lose their cached hashes and are hashed again on demand
+        present_file_names = set()
+
+        with os.scandir(self.directory) as directory_entries:
+            for directory_entry in directory_entries:
+                if not ContentIndex.is_indexed(directory_entry.name) or not directory_entry.is_file():
+                    continue
+
+                present_file_names.add(directory_entry.name)
+                stat = directory_entry.stat()
+                entry = self.entries.get(directory_entry.name)
+
+                if entry and entry[ContentIndex.json_key_size] == stat.st_size \
+                        and entry[ContentIndex.json_key_mtime] == stat.st_mtime_ns:
+                    continue
+
+                self.__set_entry(directory_entry.name, stat)
+
+        for file_name in set(self.entries).difference(present_file_names):
+            self.__remove_entry(file_name)
+
+    def find_duplicate(self, path: str):
+        # size comes from a stat, the head and tail fingerprint is a small read and the full digest runs last
+        size = os.path.getsize(path)
+
+        with self.__lock:
+            candidates = sorted(self.sizes.get(size, ()))
+
+        if not candidates:
+            return None
+
+        fingerprint = ContentIndex.fingerprint(path, size)
+        candidates = [
+            candidate for candidate in candidates
+            if self.__cached(candidate, ContentIndex.json_key_fingerprint) == fingerprint
+        ]
+
+        if not candidates:
+            return None
+
+        digest = Transfer.file_digest(path)
+
+        for candidate in candidates:
+            if self.__cached(candidate, ContentIndex.json_key_digest) == digest:
+                return candidate
+
+        return None
+
+    def claim(self, path: str):
+        # identical sources in one run would all miss the index before any of them is added, so a source waits while
+        # another one that may share its content is in flight and is then checked against what that one added
+        size = os.path.getsize(path)
+        claim = size, ContentIndex.fingerprint(path, size)
+
+        with self.__claims_changed:
+            while claim in self.__claims:
+                self.__claims_changed.wait()
+
+            self.__claims.add(claim)
+
+        return claim
+
+    def release(self, claim: tuple[int, str]):
+        with self.__claims_changed:
+            self.__claims.discard(claim)
+            self.__claims_changed.notify_all()
+
+    def add(self, file_name: str, digest: str = None):
+        stat = os.stat(os.path.join(self.directory, file_name))
+
+        with self.__lock:
+            self.__set_entry(file_name, stat)
+
+            if digest:
+                self.entries[file_name][ContentIndex.json_key_digest] = digest
+
+    def remember(self, file_name: str, size: int, mtime_ns: int, fingerprint: str = None, digest: str = None):
+        # hashes worked out elsewhere are kept if they describe the file as the index last saw it
+        with self.__lock:
+            entry = self.entries.get(file_name)
+
+            if not entry or entry[ContentIndex.json_key_size] != size or entry[ContentIndex.json_key_mtime] != mtime_ns:
+                return
+
+            if fingerprint:
+                entry[ContentIndex.json_key_fingerprint] = fingerprint
+            if digest:
+                entry[ContentIndex.json_key_digest] = digest
+
+    def save(self):
+        path = os.path.join(self.directory, ContentIndex.file_name)
+        temporary_path = f"{path}.tmp"
+
+        with self.__lock, open(temporary_path, "w") as index_file:
+            json.dump(
+                {
+                    ContentIndex.json_key_version: ContentIndex.version,
+                    ContentIndex.json_key_files: dict(sorted(self.entries.items()))
+                },
+                index_file
+            )
+
+        os.replace(temporary_path, path)
+
+        return path
+
+    def __cached(self, file_name: str, key: str):
+        with self.__lock:
+            entry = self.entries.get(file_name)
+            value = entry.get(key) if entry else None
+
+        if value is None and entry:
+            path = os.path.join(self.directory, file_name)
+
+            try:
+                if key == ContentIndex.json_key_fingerprint:
+                    value = ContentIndex.fingerprint(path, entry[ContentIndex.json_key_size])
+                else:
+                    value = Transfer.file_digest(path)
+            except OSError:
+                return None
+
+            with self.__lock:
+                entry[key] = value
+
+        return value
+
+    def __set_entry(self, file_name: str, stat: os.stat_result):
+        self.__remove_entry(file_name)
+
+        self.entries[file_name] = {
+            ContentIndex.json_key_size: stat.st_size,
+            ContentIndex.json_key_mtime: stat.st_mtime_ns,
+            ContentIndex.json_key_fingerprint: None,
+            ContentIndex.json_key_digest: None
+        }
+        self.sizes.setdefault(stat.st_size, set()).add(file_name)
+
+    def __remove_entry(self, file_name: str):
+        entry = self.entries.pop(file_name, None)
+
+        if entry:
+            self.sizes[entry[ContentIndex.json_key_size]].discard(file_name)
+
+    @staticmethod
+    def is_indexed(file_name: str):
+        return not file_name.startswith(".") and file_name not in ContentIndex.ignored_file_names
+
+    @staticmethod
+    def fingerprint(path: str, size: int, sample_size: int = Config.content_fingerprint_sample_size):
+        # the size is mixed in so that a short file never shares a fingerprint with the head of a longer one
+        digest = hashlib.blake2b(size.to_bytes(8, "big"), digest_size=16)
+
+        with open(path, "rb") as file:
+            if size <= sample_size * 2:
+                digest.update(file.read())
+            else:
+                digest.update(file.read(sample_size))
+                file.seek(-sample_size, os.SEEK_END)
+                digest.update(file.read(sample_size))
+
+        return digest.hexdigest()
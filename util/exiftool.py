@@ -1,11 +1,19 @@
 import os
+import queue
+import re
 import subprocess
+import typing
+from concurrent.futures import ThreadPoolExecutor
 
 from util.config import Config
 
 
 class ExifTool(object):
+    files_created_pattern = re.compile(r"(\d+) (?:image|output) files? created")
+
     sentinel = "{ready}\n"
+    sentinel_bytes = sentinel.encode("utf-8")
+    read_buffer_size = 64 * 1024
 
     def __init__(self, executable=Config.exiftool_executable_path):
         self.executable = executable
@@ -24,18 +32,127 @@ class ExifTool(object):
         self.process.stdin.write("-stay_open\nFalse\n")
         self.process.stdin.flush()
 
-    def execute_with_extension(self, extension: str, *args):
-        return self.execute("-ext", extension, *args)
+    def execute_with_extension(self, extension: typing.Union[str, list[str]], *args):
+        return self.execute(*ExifTool.extension_args(extension), *args)
+
+    @staticmethod
+    def parse_files_created(output: str):
+        return sum(int(match) for match in ExifTool.files_created_pattern.findall(output))
+
+    @staticmethod
+    def extension_args(extension: typing.Union[str, list[str]]):
+        extensions = [extension] if isinstance(extension, str) else extension
+        extension_args = []
+
+        for extension_single in extensions:
+            extension_args.extend(["-ext", extension_single])
+
+        return extension_args
 
     def execute(self, *args):
+        return b"".join(self.execute_stream(*args)).decode("utf-8")
+
+    def execute_stream_with_extension(self, extension: typing.Union[str, list[str]], *args):
+        return self.execute_stream(*ExifTool.extension_args(extension), *args)
+
+    def execute_stream(self, *args):
+        # yields raw output chunks as they arrive, the rest of the response is drained if the caller stops early
+        # so that the next command does not read stale output
+        self.__send(args)
+
+        fd = self.process.stdout.fileno()
+        sentinel_length = len(ExifTool.sentinel_bytes)
+        buffer = bytearray(ExifTool.read_buffer_size)
+        buffer_view = memoryview(buffer)
+        pending = b""
+
+        try:
+            while True:
+                num_bytes_read = os.readv(fd, [buffer])
+                pending += buffer_view[:num_bytes_read]
+
+                if not num_bytes_read:
+                    body = pending
+                    pending = b""
+                elif pending.endswith(ExifTool.sentinel_bytes):
+                    body = pending[:-sentinel_length]
+                    pending = b""
+                else:
+                    # hold back enough bytes that a sentinel split across reads is still detected
+                    body = pending[:-sentinel_length]
+                    pending = pending[-sentinel_length:]
+
+                if body:
+                    yield body
+
+                if not pending:
+                    break
+        finally:
+            while pending and not pending.endswith(ExifTool.sentinel_bytes):
+                num_bytes_read = os.readv(fd, [buffer])
+
+                if not num_bytes_read:
+                    break
+
+                pending = pending[-sentinel_length:] + buffer_view[:num_bytes_read]
+
+    def execute_to_file(self, path: str, *args):
+        num_bytes_written = 0
+        output_file = None
+
+        try:
+            for body in self.execute_stream(*args):
+                if not output_file:
+                    output_file = open(path, "wb", buffering=0)
+                output_file.write(body)
+                num_bytes_written += len(body)
+        finally:
+            if output_file:
+                output_file.close()
+
+        return num_bytes_written
+
+    def __send(self, args: tuple):
         args = args + ("-execute\n",)
         self.process.stdin.write(str.join("\n", args))
         self.process.stdin.flush()
 
-        output = ""
-        fd = self.process.stdout.fileno()
 
-        while not output.endswith(ExifTool.sentinel):
-            output += os.read(fd, 4096).decode('utf-8')
+class ExifToolPool(object):
+    def __init__(
+            self,
+            size: int = Config.exiftool_pool_size,
+            exiftool: ExifTool = None,
+            executable=Config.exiftool_executable_path
+    ):
+        self.size = max(size, 1)
+        self.borrowed_exiftool = exiftool
+        self.executable = executable
+        self.owned_exiftools: list[ExifTool] = []
+        self.available: queue.Queue[ExifTool] = queue.Queue()
+
+    def __enter__(self):
+        if self.borrowed_exiftool:
+            self.available.put(self.borrowed_exiftool)
+
+        for _ in range(self.size - self.available.qsize()):
+            exiftool = ExifTool(self.executable).__enter__()
+            self.owned_exiftools.append(exiftool)
+            self.available.put(exiftool)
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        for exiftool in self.owned_exiftools:
+            exiftool.__exit__(exc_type, exc_value, traceback)
+
+    def map(self, closure: typing.Callable[[ExifTool, typing.Any], typing.Any], items: list[typing.Any]):
+        def run(item):
+            exiftool = self.available.get()
+            try:
+                return closure(exiftool, item)
+            finally:
+                self.available.put(exiftool)
 
-        return output[:-len(ExifTool.sentinel)]
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            return list(executor.map(run, items))
@@ -1,7 +1,13 @@
+import codecs
+import heapq
+import itertools
 import json
 import os
+import re
 import shutil
+import tempfile
 import traceback
+import typing
 from typing import TextIO
 
 import typer
@@ -9,16 +15,19 @@ from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn
 
 from entities.filename import FileNameTypeError
+from util.config import Config
 from util.constants import Tags
 from util.exiftool import ExifTool
 
 
 class Util:
     __valid_file_names: list[str] = []
+    __json_separators_pattern = re.compile(r"[\s,]*")
 
     @staticmethod
     def strip_slashes(directory: str):
-        return directory.strip("/")
+        # only trailing slashes are stripped so that absolute paths such as mounted cards keep their root
+        return directory.rstrip("/") or directory
 
     @staticmethod
     def verify_directory(directory: str):
@@ -31,13 +40,15 @@ class Util:
         return os.path.isdir(directory)
 
     @staticmethod
-    def create_directory_or_abort(directory: str, input_directory: str):
+    def create_directory_or_abort(directory: str, input_directory: str, incremental: bool = False):
         if not os.path.isdir(directory):
             Printer.waiting(f"Creating directory \[{directory}] since it does not exist.")
             os.makedirs(directory)
         else:
             if Util.strip_slashes(directory) == Util.strip_slashes(input_directory):
                 Printer.waiting(f"Using input directory \[{directory}] as output directory...")
+            elif incremental:
+                Printer.waiting(f"Keeping existing directory \[{directory}] for incremental output...")
             else:
                 Printer.warning(f"Directory \[{directory}] already exists!")
                 Printer.prompt_continue_or_abort(f"This will overwrite [{directory}]! Continue?")
@@ -45,31 +56,147 @@ class Util:
                 Util.create_directory_or_abort(directory, input_directory)
 
     @staticmethod
-    def verify_extensions_in_directory(exiftool: ExifTool, extension: str, directory: str = "./"):
-        task_name = f"Verifying files with extension \[{extension}] in directory \[{directory}]...\n"
+    def verify_extensions_in_directory(
+            exiftool: ExifTool,
+            extension: typing.Union[str, list[str]],
+            directory: str = "./"
+    ):
+        pretty_extension = Util.pretty_extension(extension)
+        task_name = f"Verifying files with extension \[{pretty_extension}] in directory \[{directory}]...\n"
         valid_file_names = Util.get_valid_file_names(exiftool, extension, directory, task_name)
         if not valid_file_names:
-            Printer.error_and_abort(f"There are no files with extension \[{extension}] in directory \[{directory}]!")
+            Printer.error_and_abort(
+                f"There are no files with extension \[{pretty_extension}] in directory \[{directory}]!"
+            )
         else:
             return valid_file_names
 
+    @staticmethod
+    def pretty_extension(extension: typing.Union[str, list[str]]):
+        return extension if isinstance(extension, str) else ", ".join(extension)
+
+    @staticmethod
+    def split_extension(file_name: str):
+        file_name_extensionless, extension = os.path.splitext(file_name)
+        return file_name_extensionless, extension[1:]
+
+    @staticmethod
+    def output_path(output_directory: str, file_name: str, extension: str):
+        return f"{os.path.join(output_directory, Util.split_extension(file_name)[0])}.{extension}"
+
+    @staticmethod
+    def scan_file_names(directory: str, extension: typing.Union[str, list[str]]):
+        # lists files by name alone for commands that never look inside them, so no exiftool scan is needed
+        extensions = {extension.upper()} if isinstance(extension, str) else {item.upper() for item in extension}
+
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if Util.split_extension(entry.name)[1].upper() in extensions and entry.is_file():
+                    yield entry.name
+
+    @staticmethod
+    def sort_bounded(items: typing.Iterable[str], run_size: int = Config.list_sort_run_size):
+        # sorts in memory when everything fits in one run, otherwise sorted runs are spilled to disk and merged
+        items = iter(items)
+        run_files = []
+
+        try:
+            while True:
+                run = sorted(itertools.islice(items, run_size))
+
+                if not run_files and len(run) < run_size:
+                    yield from run
+                    return
+
+                if not run:
+                    break
+
+                run_file = tempfile.TemporaryFile("w+", encoding="utf-8", errors="surrogateescape")
+                run_file.writelines(f"{item}\n" for item in run)
+                run_file.seek(0)
+                run_files.append(run_file)
+
+            yield from heapq.merge(*((line[:-1] for line in run_file) for run_file in run_files))
+        finally:
+            for run_file in run_files:
+                run_file.close()
+
+    @staticmethod
+    def filter_by_extension(file_names: list[str], extension: str):
+        return [
+            file_name for file_name in file_names
+            if Util.split_extension(file_name)[1].upper() == extension.upper()
+        ]
+
+    @staticmethod
+    def group_siblings(file_names: list[str]):
+        siblings: dict[str, list[str]] = {}
+
+        for file_name in file_names:
+            file_name_extensionless = Util.split_extension(file_name)[0]
+            siblings.setdefault(file_name_extensionless, []).append(file_name)
+
+        return siblings
+
+    @staticmethod
+    def select_sibling(siblings: list[str]):
+        def preference(file_name: str):
+            extension = Util.split_extension(file_name)[1].upper()
+            if extension in Config.sibling_extension_preference:
+                return Config.sibling_extension_preference.index(extension)
+            return len(Config.sibling_extension_preference)
+
+        return min(siblings, key=preference)
+
+    @staticmethod
+    def is_output_up_to_date(source_path: str, output_path: str, settings_changed_at: float = 0):
+        try:
+            return os.path.getmtime(output_path) >= max(os.path.getmtime(source_path), settings_changed_at)
+        except OSError:
+            return False
+
+    @staticmethod
+    def stamp_settings(directory: str, settings: dict):
+        # the stamp is only rewritten when the settings change, so its modification time is when they last changed
+        # and is taken from the same clock as the outputs it is compared with
+        stamp_path = os.path.join(directory, Config.settings_stamp_name)
+
+        try:
+            with open(stamp_path) as stamp_file:
+                if json.load(stamp_file) == settings:
+                    return os.path.getmtime(stamp_path)
+        except (OSError, ValueError):
+            pass
+
+        with open(stamp_path, "w") as stamp_file:
+            json.dump(settings, stamp_file)
+
+        return os.path.getmtime(stamp_path)
+
     @staticmethod
     def num_files_in_directory(path: str):
         return len([name for name in os.listdir(path) if os.path.isfile(os.path.join(path, name))])
 
     @staticmethod
-    def get_valid_file_names(exiftool: ExifTool, extension: str, directory: str = "./", task_name: str = None):
+    def get_valid_file_names(
+            exiftool: ExifTool,
+            extension: typing.Union[str, list[str]],
+            directory: str = "./",
+            task_name: str = None
+    ):
         if not Util.__valid_file_names:
             with Printer.progress_spinner() as progress:
-                message = f"Getting files with extension \[{extension}] in directory \[{directory}]...\n" \
+                message = f"Getting files with extension \[{Util.pretty_extension(extension)}] " \
+                          f"in directory \[{directory}]...\n" \
                     if not task_name else task_name
                 progress.add_task(message)
                 try:
-                    file_names = Util.deserialize_data(
-                        Util._get_valid_file_names(exiftool, extension, directory),
-                        soft_error=False
-                    )
-                    Util.__valid_file_names = list(map(lambda file_name: file_name[Tags.FileName], file_names))
+                    Util.__valid_file_names = [
+                        file_tags[Tags.FileName] for file_tags in Util.deserialize_stream(
+                            Util._get_valid_file_names(exiftool, extension, directory),
+                            soft_error=False
+                        )
+                    ]
                 except TypeError:
                     Util.__valid_file_names = []
         return Util.__valid_file_names
@@ -97,8 +224,73 @@ class Util:
                 raise TypeError()
 
     @staticmethod
-    def _get_valid_file_names(exiftool: ExifTool, extension: str, directory):
-        return exiftool.execute_with_extension(
+    def deserialize_stream(chunks: typing.Iterable[bytes], soft_error: bool = True):
+        # yields one element of a json array at a time as chunks arrive so that neither the whole text nor the
+        # whole list is ever held in memory
+        decoder = json.JSONDecoder()
+        text_decoder = codecs.getincrementaldecoder("utf-8")()
+        chunks = iter(chunks)
+        text = ""
+        position = 0
+        started = False
+        finished = False
+
+        try:
+            for chunk in chunks:
+                text = text[position:] + text_decoder.decode(chunk)
+                position = 0
+
+                while True:
+                    position = Util.__json_separators_pattern.match(text, position).end()
+
+                    if position == len(text):
+                        break
+
+                    if finished:
+                        raise ValueError(f"Unexpected data after JSON array at position {position}!")
+
+                    if not started:
+                        if text[position] != "[":
+                            raise ValueError("Expected a JSON array!")
+                        started = True
+                        position += 1
+                        continue
+
+                    if text[position] == "]":
+                        finished = True
+                        position += 1
+                        continue
+
+                    try:
+                        element, end = decoder.raw_decode(text, position)
+                    except ValueError:
+                        # the element is split across chunks so wait for more data
+                        break
+
+                    # a number that ends the buffer may still continue in the next chunk, so it waits for what follows
+                    if end == len(text):
+                        break
+
+                    position = end
+                    yield element
+
+            if not started:
+                error_function = Printer.error if soft_error else Printer.error_and_abort
+                error_function("Could not process data since it was empty!")
+            elif not finished:
+                raise ValueError("JSON array was truncated!")
+        except Exception:
+            Printer.error(f"Error while deserializing JSON data!")
+            traceback.print_exc()
+            if not soft_error:
+                raise TypeError()
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
+
+    @staticmethod
+    def _get_valid_file_names(exiftool: ExifTool, extension: typing.Union[str, list[str]], directory):
+        return exiftool.execute_stream_with_extension(
             extension,
             f"-{Tags.JSONFormat}",
             f"-{Tags.FileName}",
@@ -108,6 +300,7 @@ class Util:
 
 class Printer:
     console = Console(highlight=False)
+    error_console = Console(stderr=True, highlight=False)
 
     color_title = "[magenta]"
     color_subtitle = "[cyan]"
@@ -195,6 +388,16 @@ class Printer:
             else:
                 Printer.error(f"Skipped processing for {num_files_skipped} file(s)!\n")
 
+    @staticmethod
+    def print_files_up_to_date(num_files_up_to_date: int):
+        if num_files_up_to_date > 0:
+            Printer.waiting(f"Skipped {num_files_up_to_date} file(s) as already up to date.")
+
+    @staticmethod
+    def print_files_duplicate(num_files_duplicate: int):
+        if num_files_duplicate > 0:
+            Printer.waiting(f"Skipped {num_files_duplicate} file(s) whose content is already in the destination.")
+
     @staticmethod
     def divider():
         Printer.console.print(
@@ -0,0 +1,335 @@
+import contextlib
+import queue
+import threading
+import time
+import traceback
+import typing
+from concurrent.futures import ProcessPoolExecutor, Future
+from enum import Enum
+
+from rich.progress import Progress
+
+from util.config import Config
+from util.exiftool import ExifTool, ExifToolPool
+from util.helpers import Printer
+
+
+class StageStatus(str, Enum):
+    processed = "processed"
+    skipped = "skipped"
+    up_to_date = "up_to_date"
+    failed = "failed"
+
+
+class Executor:
+    def __init__(self, workers: int = 1):
+        self.workers = max(workers, 1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+    def open_context(self):
+        return contextlib.nullcontext()
+
+    def call(self, context, closure, item, emit):
+        return closure(context, item, emit)
+
+
+class SerialExecutor(Executor):
+    def __init__(self, context=None):
+        super().__init__(1)
+        self.context = context
+
+    def open_context(self):
+        return contextlib.nullcontext(self.context)
+
+
+class ThreadExecutor(Executor):
+    def __init__(self, workers: int = Config.pipeline_workers, context_factory: typing.Callable = None):
+        super().__init__(workers)
+        self.context_factory = context_factory
+
+    def open_context(self):
+        return self.context_factory() if self.context_factory else contextlib.nullcontext()
+
+
+class ExifToolExecutor(Executor):
+    def __init__(
+            self,
+            exiftool: ExifTool = None,
+            workers: int = Config.exiftool_pool_size,
+            exiftool_pool: ExifToolPool = None
+    ):
+        # a pool that is passed in is already open and stays warm after the executor is done with it
+        super().__init__(min(workers, exiftool_pool.size) if exiftool_pool else workers)
+        self.owns_pool = exiftool_pool is None
+        self.exiftool_pool = ExifToolPool(size=self.workers, exiftool=exiftool) if self.owns_pool else exiftool_pool
+
+    def __enter__(self):
+        if self.owns_pool:
+            self.exiftool_pool.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.owns_pool:
+            self.exiftool_pool.__exit__(exc_type, exc_value, traceback)
+
+    @contextlib.contextmanager
+    def open_context(self):
+        exiftool = self.exiftool_pool.available.get()
+        try:
+            yield exiftool
+        finally:
+            self.exiftool_pool.available.put(exiftool)
+
+
+class ProcessExecutor(Executor):
+    # closures must be picklable module level functions, they receive no context and their emitted items are
+    # sent back to the parent process once the item is done
+    def __init__(self, workers: int = Config.process_pool_workers):
+        super().__init__(workers)
+        self.process_pool = None
+
+    def __enter__(self):
+        # a single worker runs inline since a lone child process only adds pickling overhead
+        if self.workers > 1:
+            self.process_pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.process_pool:
+            self.process_pool.shutdown(wait=True)
+            self.process_pool = None
+
+    def call(self, context, closure, item, emit):
+        status, emitted = self.submit(ProcessExecutor.call_in_process, closure, item).result()
+
+        for emitted_item in emitted:
+            emit(emitted_item)
+
+        return status
+
+    def submit(self, function: typing.Callable, *args):
+        if self.process_pool:
+            return self.process_pool.submit(function, *args)
+
+        future = Future()
+
+        try:
+            future.set_result(function(*args))
+        except Exception as exception:
+            future.set_exception(exception)
+
+        return future
+
+    def map_chunks(
+            self,
+            function: typing.Callable[[list], list],
+            items: list,
+            chunk_size: int = Config.process_chunk_size
+    ):
+        # function takes a chunk of items and returns one compact result per item, results keep the item order
+        if not self.process_pool:
+            return function(items)
+
+        futures = [
+            self.process_pool.submit(function, items[index:index + chunk_size])
+            for index in range(0, len(items), chunk_size)
+        ]
+
+        return [result for future in futures for result in future.result()]
+
+    @staticmethod
+    def map_chunks_if_large(
+            function: typing.Callable[[list], list],
+            items: list,
+            threshold: int = Config.process_pool_threshold
+    ):
+        workers = Config.process_pool_workers if len(items) >= threshold else 1
+
+        with ProcessExecutor(workers) as process_executor:
+            return process_executor.map_chunks(function, items)
+
+    @staticmethod
+    def call_in_process(closure, item):
+        emitted = []
+        return closure(None, item, emitted.append), emitted
+
+
+class Stage:
+    def __init__(
+            self,
+            name: str,
+            closure: typing.Callable[[typing.Any, typing.Any, typing.Callable[[typing.Any], None]], StageStatus],
+            executor: Executor = None,
+            label: str = None,
+            total: int = None
+    ):
+        self.name = name
+        self.closure = closure
+        self.executor = executor if executor else SerialExecutor()
+        self.label = label if label else name
+        self.total = total
+        self.counts = {status: 0 for status in StageStatus}
+        self.elapsed = 0.0
+        self.__counts_lock = threading.Lock()
+
+    def count(self, status: StageStatus):
+        with self.__counts_lock:
+            self.counts[status if status else StageStatus.processed] += 1
+
+    @property
+    def num_processed(self):
+        return self.counts[StageStatus.processed]
+
+    @property
+    def num_skipped(self):
+        return self.counts[StageStatus.skipped] + self.counts[StageStatus.failed]
+
+    @property
+    def num_up_to_date(self):
+        return self.counts[StageStatus.up_to_date]
+
+    def run(self, items: typing.Iterable[typing.Any], report: bool = True):
+        with Progress(console=Printer.console, auto_refresh=False) as progress:
+            outputs = Pipeline([self]).run(items, progress)
+
+        if report:
+            self.report()
+
+        return outputs
+
+    def report(self):
+        Printer.waiting(f"{self.name} took {self.elapsed:.2f}s.")
+        Printer.print_files_up_to_date(self.num_up_to_date)
+        Printer.print_files_skipped(self.num_skipped)
+
+
+class Pipeline:
+    __end = object()
+
+    def __init__(self, stages: list[Stage], queue_size: int = Config.pipeline_queue_size):
+        self.stages = stages
+        self.queue_size = queue_size
+
+    def run(self, items: typing.Iterable[typing.Any], progress: Progress = None):
+        outputs = []
+        progress_tasks = [
+            progress.add_task(stage.label, total=stage.total) if progress else None for stage in self.stages
+        ]
+
+        with contextlib.ExitStack() as exit_stack:
+            for stage in self.stages:
+                exit_stack.enter_context(stage.executor)
+
+            if len(self.stages) == 1 and self.stages[0].executor.workers == 1:
+                self.__run_inline(items, outputs, progress, progress_tasks[0])
+            else:
+                self.__run_threaded(items, outputs, progress, progress_tasks)
+
+        return outputs
+
+    def __run_inline(self, items, outputs: list, progress: Progress, progress_task):
+        # single serial stages run on the calling thread so that closures may still prompt the user
+        stage = self.stages[0]
+        start = time.perf_counter()
+
+        with stage.executor.open_context() as context:
+            for item in items:
+                Pipeline.__process_item(stage, context, item, outputs.append)
+
+                if progress:
+                    progress.advance(progress_task)
+                    progress.refresh()
+
+        stage.elapsed = time.perf_counter() - start
+
+    def __run_threaded(self, items, outputs: list, progress: Progress, progress_tasks: list):
+        # bounded queues between stages keep memory flat no matter how many items flow through
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        remaining_workers = [stage.executor.workers for stage in self.stages]
+        stage_starts = [time.perf_counter() for _ in self.stages]
+        remaining_lock = threading.Lock()
+        outputs_lock = threading.Lock()
+
+        def collect(item):
+            with outputs_lock:
+                outputs.append(item)
+
+        def finish_worker(stage_index: int):
+            with remaining_lock:
+                remaining_workers[stage_index] -= 1
+                last_worker = remaining_workers[stage_index] == 0
+
+            if not last_worker:
+                return
+
+            self.stages[stage_index].elapsed = time.perf_counter() - stage_starts[stage_index]
+
+            if stage_index + 1 < len(self.stages):
+                for _ in range(self.stages[stage_index + 1].executor.workers):
+                    queues[stage_index + 1].put(Pipeline.__end)
+
+        def work(stage_index: int):
+            stage = self.stages[stage_index]
+            emit = queues[stage_index + 1].put if stage_index + 1 < len(self.stages) else collect
+
+            try:
+                with contextlib.ExitStack() as exit_stack:
+                    try:
+                        context = exit_stack.enter_context(stage.executor.open_context())
+                        context_opened = True
+                    except Exception:
+                        traceback.print_exc()
+                        context = None
+                        context_opened = False
+
+                    while True:
+                        item = queues[stage_index].get()
+
+                        if item is Pipeline.__end:
+                            break
+
+                        # keep draining when the context failed so upstream stages never block on a full queue
+                        if context_opened:
+                            Pipeline.__process_item(stage, context, item, emit)
+                        else:
+                            stage.count(StageStatus.failed)
+
+                        if progress:
+                            progress.advance(progress_tasks[stage_index])
+                            progress.refresh()
+            finally:
+                finish_worker(stage_index)
+
+        threads = [
+            threading.Thread(target=work, args=(stage_index,), daemon=True)
+            for stage_index, stage in enumerate(self.stages)
+            for _ in range(stage.executor.workers)
+        ]
+
+        for thread in threads:
+            thread.start()
+
+        try:
+            for item in items:
+                queues[0].put(item)
+        finally:
+            for _ in range(self.stages[0].executor.workers):
+                queues[0].put(Pipeline.__end)
+
+        for thread in threads:
+            thread.join()
+
+    @staticmethod
+    def __process_item(stage: Stage, context, item, emit):
+        try:
+            status = stage.executor.call(context, stage.closure, item, emit)
+        except Exception:
+            traceback.print_exc()
+            status = StageStatus.failed
+
+        stage.count(status)
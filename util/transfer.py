@@ -0,0 +1,95 @@
+import hashlib
+import os
+import shutil
+
+from util.config import Config
+
+
+class Transfer:
+    # the manifest uses the b2sum line format so a destination can be checked with b2sum -c
+    manifest_file_name = "checksums.b2"
+    manifest_separator = "  "
+
+    @staticmethod
+    def copy_with_digest(from_path: str, to_path: str, chunk_size: int = Config.transfer_chunk_size):
+        # the digest is fed from the same buffer that is written, so the source is only read once
+        digest = hashlib.blake2b()
+        buffer = bytearray(chunk_size)
+        buffer_view = memoryview(buffer)
+
+        with open(from_path, "rb", buffering=0) as from_file, open(to_path, "wb", buffering=0) as to_file:
+            while num_bytes_read := from_file.readinto(buffer):
+                chunk = buffer_view[:num_bytes_read]
+                digest.update(chunk)
+
+                while chunk:
+                    chunk = chunk[to_file.write(chunk):]
+
+            os.fsync(to_file.fileno())
+
+        shutil.copystat(from_path, to_path)
+
+        return digest.hexdigest()
+
+    @staticmethod
+    def move_with_digest(from_path: str, to_path: str):
+        # a move within one device is only a rename, so the data is read once afterwards for its digest
+        if os.stat(from_path).st_dev == os.stat(os.path.dirname(to_path) or ".").st_dev:
+            os.replace(from_path, to_path)
+            return Transfer.file_digest(to_path), False
+
+        return Transfer.copy_with_digest(from_path, to_path), True
+
+    @staticmethod
+    def same_content(path: str, other_path: str):
+        # sizes rule out most different files without reading either of them
+        return os.path.getsize(path) == os.path.getsize(other_path) and \
+            Transfer.file_digest(path) == Transfer.file_digest(other_path)
+
+    @staticmethod
+    def file_digest(path: str, chunk_size: int = Config.transfer_chunk_size, drop_cache: bool = False):
+        digest = hashlib.blake2b()
+        buffer = bytearray(chunk_size)
+        buffer_view = memoryview(buffer)
+
+        with open(path, "rb", buffering=0) as file:
+            # verification should read what reached the disk rather than pages still cached from the write
+            if drop_cache and hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(file.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+            while num_bytes_read := file.readinto(buffer):
+                digest.update(buffer_view[:num_bytes_read])
+
+        return digest.hexdigest()
+
+    @staticmethod
+    def update_manifest(directory: str, digests: dict[str, str]):
+        path = os.path.join(directory, Transfer.manifest_file_name)
+        manifest = Transfer.read_manifest(path)
+        manifest.update(digests)
+
+        temporary_path = f"{path}.tmp"
+
+        with open(temporary_path, "w") as manifest_file:
+            for file_name, digest in sorted(manifest.items()):
+                manifest_file.write(f"{digest}{Transfer.manifest_separator}{file_name}\n")
+
+        os.replace(temporary_path, path)
+
+        return path
+
+    @staticmethod
+    def read_manifest(path: str):
+        manifest = {}
+
+        if not os.path.isfile(path):
+            return manifest
+
+        with open(path) as manifest_file:
+            for line in manifest_file:
+                digest, separator, file_name = line.rstrip("\n").partition(Transfer.manifest_separator)
+
+                if separator:
+                    manifest[file_name] = digest
+
+        return manifest
@@ -0,0 +1,171 @@
+import abc
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+from util.config import Config
+
+
+class Watcher(abc.ABC):
+    def __init__(self, directory: str, settle_seconds: float = Config.watch_settle_seconds):
+        self.directory = directory
+        self.settle_seconds = settle_seconds
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+    @abc.abstractmethod
+    def wait(self, timeout: float):
+        # returns the names of files that are fully written, blocking for at most timeout seconds
+        pass
+
+    def batches(self):
+        # files arriving in a burst, such as a card dump, are grouped until the inbox has been quiet for the
+        # settle period so that each batch shares one pipeline run
+        batch: set[str] = set()
+
+        while True:
+            names = self.wait(self.settle_seconds if batch else Config.watch_poll_interval)
+
+            if names:
+                batch.update(names)
+            elif batch:
+                yield sorted(batch)
+                batch = set()
+
+    @staticmethod
+    def build(directory: str, force_polling: bool = False):
+        if not force_polling and InotifyWatcher.is_supported():
+            try:
+                return InotifyWatcher(directory)
+            except OSError:
+                pass
+
+        return PollingWatcher(directory)
+
+
+class InotifyWatcher(Watcher):
+    in_close_write = 0x00000008
+    in_moved_to = 0x00000080
+    in_cloexec = 0o2000000
+
+    event_header = struct.Struct("iIII")
+    read_size = 64 * 1024
+
+    def __init__(self, directory: str, settle_seconds: float = Config.watch_settle_seconds):
+        super().__init__(directory, settle_seconds)
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = -1
+
+    def __enter__(self):
+        self.fd = self.libc.inotify_init1(InotifyWatcher.in_cloexec)
+
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "Could not initialise inotify!")
+
+        # close write fires once a writer is done and moved to covers tools that write to a temporary name first
+        watch_descriptor = self.libc.inotify_add_watch(
+            self.fd,
+            os.fsencode(self.directory),
+            InotifyWatcher.in_close_write | InotifyWatcher.in_moved_to
+        )
+
+        if watch_descriptor < 0:
+            error_number = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error_number, f"Could not watch directory [{self.directory}]!")
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def wait(self, timeout: float):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+
+        if not readable:
+            return set()
+
+        data = os.read(self.fd, InotifyWatcher.read_size)
+        names = set()
+        offset = 0
+
+        while offset + InotifyWatcher.event_header.size <= len(data):
+            _, mask, _, name_length = InotifyWatcher.event_header.unpack_from(data, offset)
+            offset += InotifyWatcher.event_header.size
+
+            name = data[offset:offset + name_length].rstrip(b"\0")
+            offset += name_length
+
+            if name and mask & (InotifyWatcher.in_close_write | InotifyWatcher.in_moved_to):
+                names.add(os.fsdecode(name))
+
+        return names
+
+    @staticmethod
+    def is_supported():
+        return sys.platform.startswith("linux")
+
+
+class PollingWatcher(Watcher):
+    def __init__(self, directory: str, settle_seconds: float = Config.watch_settle_seconds):
+        super().__init__(directory, settle_seconds)
+        # name to the (size, mtime) seen on the previous scan
+        self.index: dict[str, tuple[int, int]] = {}
+        self.reported: dict[str, tuple[int, int]] = {}
+
+    def __enter__(self):
+        # files already in the inbox are not reported as new
+        self.index = self.__scan()
+        self.reported = dict(self.index)
+        return self
+
+    def wait(self, timeout: float):
+        time.sleep(timeout)
+
+        index = self.__scan()
+        now_ns = time.time_ns()
+        settle_ns = int(self.settle_seconds * 1e9)
+        names = set()
+
+        for name, signature in index.items():
+            # a file is only considered fully written once its size and mtime stop changing for the settle period
+            if self.reported.get(name) == signature or self.index.get(name) != signature:
+                continue
+
+            if now_ns - signature[1] < settle_ns:
+                continue
+
+            names.add(name)
+            self.reported[name] = signature
+
+        self.reported = {name: signature for name, signature in self.reported.items() if name in index}
+        self.index = index
+
+        return names
+
+    def __scan(self):
+        index = {}
+
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file():
+                            stat = entry.stat()
+                            index[entry.name] = (stat.st_size, stat.st_mtime_ns)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+
+        return index
@@ -0,0 +1,47 @@
+import threading
+import typing
+from concurrent.futures import ThreadPoolExecutor, Future
+
+from util.config import Config
+
+
+class FileWriter(object):
+    def __init__(self, max_workers: int = Config.writer_max_workers, max_pending: int = Config.writer_max_pending):
+        self.max_workers = max_workers
+        self.pending = threading.BoundedSemaphore(max_pending)
+        self.failed_paths: list[str] = []
+        self.__failed_lock = threading.Lock()
+
+    def __enter__(self):
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pthree-writer")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.executor.shutdown(wait=True)
+
+    def write(self, path: str, content: typing.Union[str, bytes]):
+        # blocks when too many writes are queued so that rendered content cannot pile up in memory
+        self.pending.acquire()
+
+        try:
+            future = self.executor.submit(FileWriter.write_once, path, content)
+        except Exception:
+            self.pending.release()
+            raise
+
+        future.add_done_callback(lambda done: self.__on_done(path, done))
+
+    @staticmethod
+    def write_once(path: str, content: typing.Union[str, bytes]):
+        data = memoryview(content.encode("utf-8") if isinstance(content, str) else content)
+
+        with open(path, "wb", buffering=0) as output_file:
+            while data:
+                data = data[output_file.write(data):]
+
+    def __on_done(self, path: str, future: Future):
+        self.pending.release()
+
+        if future.exception() is not None:
+            with self.__failed_lock:
+                self.failed_paths.append(path)